@@ -0,0 +1,278 @@
+"""
+Alertas de stock bajo y sugerencias de compra por proveedor.
+
+La cola `alertas_stock` (mantenida por triggers sobre inventario y productos, ver queries.py)
+contiene las combinaciones producto/sucursal con cantidad por debajo de `stock_minimo`; el
+índice parcial `idx_productos_bajo_minimo` cubre los productos bajo el mínimo en total.
+
+Las sugerencias se calculan para todo el catálogo en una pasada: tres consultas agregadas
+(alertas, demanda diaria de los últimos días y proveedor de cada producto) y el cálculo de
+cantidades vectorizado con NumPy, sin consultas por producto.
+
+    python alertas.py sugerencias --dias 30 --plazo 7 --cobertura 14 --out sugerencias.csv
+    python alertas.py productos
+    python alertas.py refrescar
+"""
+import argparse
+import csv
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+from database import obtener_session, obtener_session_lectura
+
+DIAS_HISTORIA = 30
+PLAZO_ENTREGA_DIAS = 7
+DIAS_COBERTURA = 14
+FACTOR_SERVICIO = 1.65 # z para ~95% de nivel de servicio
+
+COLUMNAS_SUGERENCIAS = [
+    'Proveedor', 'CodigoProducto', 'NombreProducto', 'Sucursal', 'Cantidad', 'StockMinimo',
+    'DemandaDiaria', 'StockSeguridad', 'PuntoReorden', 'CantidadSugerida',
+]
+
+# --- Cola de alertas ---
+
+def refrescar_alertas():
+    """
+    Reconstruye la cola de alertas con dos sentencias sobre todo el inventario. Los triggers la
+    mantienen al día; esto sirve para bases existentes o después de cargas masivas sin triggers.
+    Retorna la cantidad de alertas activas, o None si hubo un error.
+    """
+    session = obtener_session()
+    try:
+        session.execute(text("""
+            DELETE FROM alertas_stock a
+            WHERE NOT EXISTS (
+                SELECT 1 FROM inventario i JOIN productos p ON p.id = i.producto_id
+                WHERE i.producto_id = a.producto_id AND i.sucursal_id = a.sucursal_id
+                  AND COALESCE(i.cantidad, 0) < p.stock_minimo
+            )
+        """))
+        session.execute(text("""
+            INSERT INTO alertas_stock (producto_id, sucursal_id, cantidad, stock_minimo, fecha_alerta, fecha_actualizacion)
+            SELECT i.producto_id, i.sucursal_id, COALESCE(i.cantidad, 0), p.stock_minimo, NOW(), NOW()
+            FROM inventario i JOIN productos p ON p.id = i.producto_id
+            WHERE COALESCE(i.cantidad, 0) < p.stock_minimo
+            ON CONFLICT (producto_id, sucursal_id) DO UPDATE
+            SET cantidad = EXCLUDED.cantidad,
+                stock_minimo = EXCLUDED.stock_minimo,
+                fecha_actualizacion = NOW()
+        """))
+        total = session.execute(text("SELECT COUNT(*) FROM alertas_stock")).scalar()
+        session.commit()
+        print(f"✅ Cola de alertas reconstruida: {total} combinaciones producto/sucursal bajo el mínimo.")
+        return total
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error al reconstruir las alertas de stock: {e}")
+        return None
+    finally:
+        session.close()
+
+def productos_bajo_minimo():
+    """Productos activos con stock total por debajo del mínimo (resuelto con el índice parcial)."""
+    session = obtener_session_lectura()
+    try:
+        return session.execute(text("""
+            SELECT id, codigo, nombre, stock, stock_minimo
+            FROM productos
+            WHERE stock < stock_minimo AND activo
+            ORDER BY stock_minimo - stock DESC, id
+        """)).all()
+    except Exception as e:
+        print(f"❌ Error al consultar productos bajo el mínimo: {e}")
+        return None
+    finally:
+        session.close()
+
+# --- Carga de datos (una consulta por conjunto, no por producto) ---
+
+def _cargar_alertas(session):
+    return session.execute(text("""
+        SELECT a.producto_id, a.sucursal_id, a.cantidad, a.stock_minimo,
+               p.codigo, p.nombre, s.nombre
+        FROM alertas_stock a
+        JOIN productos p ON p.id = a.producto_id
+        JOIN sucursales s ON s.id = a.sucursal_id
+        WHERE p.activo
+        ORDER BY a.producto_id, a.sucursal_id
+    """)).all()
+
+def _cargar_demanda(session, desde):
+    """Unidades vendidas y suma de cuadrados de las unidades diarias, solo de los pares en alerta."""
+    return session.execute(text("""
+        WITH diaria AS (
+            SELECT dv.producto_id, v.sucursal_id, v.fecha::date AS dia, SUM(dv.cantidad) AS unidades
+            FROM ventas v
+            JOIN detalle_ventas dv ON dv.venta_id = v.id
+            WHERE v.fecha >= :desde
+              AND (dv.producto_id, v.sucursal_id) IN (SELECT producto_id, sucursal_id FROM alertas_stock)
+            GROUP BY 1, 2, 3
+        )
+        SELECT producto_id, sucursal_id, SUM(unidades), SUM(unidades * unidades)
+        FROM diaria
+        GROUP BY 1, 2
+    """), {'desde': desde}).all()
+
+def _cargar_proveedores(session):
+    """
+    Un proveedor activo por producto en alerta: al que se le compró más recientemente y, si
+    nunca se le compró a ninguno, el de menor ID en producto_proveedor.
+    """
+    return session.execute(text("""
+        WITH ultima_compra AS (
+            SELECT c.proveedor_id, dc.producto_id, MAX(c.fecha) AS fecha
+            FROM compras c
+            JOIN detalle_compras dc ON dc.compra_id = c.id
+            WHERE dc.producto_id IN (SELECT producto_id FROM alertas_stock)
+            GROUP BY 1, 2
+        )
+        SELECT DISTINCT ON (pp.producto_id) pp.producto_id, pr.id, pr.nombre
+        FROM producto_proveedor pp
+        JOIN proveedores pr ON pr.id = pp.proveedor_id AND pr.activo
+        LEFT JOIN ultima_compra u ON u.proveedor_id = pp.proveedor_id AND u.producto_id = pp.producto_id
+        WHERE pp.producto_id IN (SELECT producto_id FROM alertas_stock)
+        ORDER BY pp.producto_id, u.fecha DESC NULLS LAST, pr.id
+    """)).all()
+
+# --- Cálculo vectorizado ---
+
+def _buscar(claves_ordenadas, claves):
+    """Posición de cada clave en `claves_ordenadas` y máscara de las que existen."""
+    if len(claves_ordenadas) == 0:
+        return np.zeros(len(claves), dtype=np.int64), np.zeros(len(claves), dtype=bool)
+    posiciones = np.minimum(np.searchsorted(claves_ordenadas, claves), len(claves_ordenadas) - 1)
+    return posiciones, claves_ordenadas[posiciones] == claves
+
+def calcular_cantidades(cantidad, stock_minimo, unidades, unidades_cuadrado, dias,
+                        plazo_entrega=PLAZO_ENTREGA_DIAS, dias_cobertura=DIAS_COBERTURA, factor_servicio=FACTOR_SERVICIO):
+    """
+    Calcula, para arreglos alineados por producto/sucursal:
+      demanda diaria media y su desvío (los días sin ventas cuentan como cero),
+      stock de seguridad = z * desvío * sqrt(plazo),
+      punto de reorden = max(stock mínimo, demanda * plazo + seguridad),
+      cantidad sugerida = punto de reorden + demanda * cobertura - cantidad actual (redondeada hacia arriba).
+    Retorna (demanda, seguridad, punto_reorden, sugerida).
+    """
+    demanda = unidades / dias
+    varianza = np.maximum((unidades_cuadrado - dias * demanda ** 2) / max(dias - 1, 1), 0)
+    seguridad = factor_servicio * np.sqrt(varianza) * np.sqrt(plazo_entrega)
+    punto_reorden = np.maximum(stock_minimo, demanda * plazo_entrega + seguridad)
+    sugerida = np.ceil(np.maximum(punto_reorden + demanda * dias_cobertura - cantidad, 0)).astype(np.int64)
+    return demanda, seguridad, punto_reorden, sugerida
+
+def sugerencias_compra(dias=DIAS_HISTORIA, plazo_entrega=PLAZO_ENTREGA_DIAS,
+                       dias_cobertura=DIAS_COBERTURA, factor_servicio=FACTOR_SERVICIO):
+    """
+    Sugerencias de compra para todas las alertas activas, agrupadas por proveedor.
+    Retorna un dict {nombre del proveedor: [filas en el orden de COLUMNAS_SUGERENCIAS]},
+    con los productos sin proveedor bajo 'Sin proveedor', o None si hubo un error.
+    """
+    session = obtener_session_lectura()
+    try:
+        alertas = _cargar_alertas(session)
+        if not alertas:
+            return {}
+        demanda = _cargar_demanda(session, datetime.now() - timedelta(days=dias))
+        proveedores = _cargar_proveedores(session)
+    except Exception as e:
+        print(f"❌ Error al cargar datos para las sugerencias de compra: {e}")
+        return None
+    finally:
+        session.close()
+
+    producto = np.fromiter((fila[0] for fila in alertas), dtype=np.int64, count=len(alertas))
+    sucursal = np.fromiter((fila[1] for fila in alertas), dtype=np.int64, count=len(alertas))
+    cantidad = np.fromiter((fila[2] for fila in alertas), dtype=np.float64, count=len(alertas))
+    stock_minimo = np.fromiter((fila[3] for fila in alertas), dtype=np.float64, count=len(alertas))
+
+    # Demanda alineada con las alertas por clave compuesta producto/sucursal
+    base = int(sucursal.max()) + 1
+    unidades = np.zeros(len(alertas))
+    unidades_cuadrado = np.zeros(len(alertas))
+    if demanda:
+        claves = np.array([fila[0] * base + fila[1] for fila in demanda], dtype=np.int64)
+        sumas = np.array([(fila[2], fila[3]) for fila in demanda], dtype=np.float64)
+        orden = np.argsort(claves)
+        posiciones, encontradas = _buscar(claves[orden], producto * base + sucursal)
+        unidades[encontradas] = sumas[orden][posiciones[encontradas], 0]
+        unidades_cuadrado[encontradas] = sumas[orden][posiciones[encontradas], 1]
+
+    demanda_diaria, seguridad, punto_reorden, sugerida = calcular_cantidades(
+        cantidad, stock_minimo, unidades, unidades_cuadrado, dias, plazo_entrega, dias_cobertura, factor_servicio)
+
+    # Proveedor de cada alerta
+    productos_con_proveedor = np.array([fila[0] for fila in proveedores], dtype=np.int64)
+    nombres_proveedor = [fila[2] for fila in proveedores] + ['Sin proveedor']
+    posiciones, encontradas = _buscar(productos_con_proveedor, producto)
+    indice_proveedor = np.where(encontradas, posiciones, len(proveedores))
+
+    # Agrupar por proveedor, de mayor a menor cantidad sugerida dentro de cada uno
+    orden = np.lexsort((-sugerida, indice_proveedor))
+    sugerencias = {}
+    for i in orden:
+        if sugerida[i] <= 0:
+            continue
+        _, _, _, _, codigo, nombre, nombre_sucursal = alertas[i]
+        proveedor = nombres_proveedor[indice_proveedor[i]]
+        sugerencias.setdefault(proveedor, []).append([
+            proveedor, codigo, nombre, nombre_sucursal, int(cantidad[i]), int(stock_minimo[i]),
+            round(float(demanda_diaria[i]), 2), round(float(seguridad[i]), 2),
+            round(float(punto_reorden[i]), 2), int(sugerida[i]),
+        ])
+    return sugerencias
+
+def mostrar_sugerencias(sugerencias):
+    """Imprime las sugerencias agrupadas por proveedor."""
+    if not sugerencias:
+        print("No hay productos por debajo del stock mínimo.")
+        return
+    for proveedor, filas in sugerencias.items():
+        print(f"\n--- {proveedor} ({len(filas)} productos, {sum(fila[-1] for fila in filas)} unidades) ---")
+        for _, codigo, nombre, sucursal, cantidad, minimo, demanda, _, punto, sugerida in filas:
+            print(f"  {codigo:<10} {nombre[:30]:<30} {sucursal[:20]:<20} stock {cantidad:>5} / mín {minimo:>4} "
+                  f"| {demanda:>6.2f} u/día | reorden {punto:>7.1f} | pedir {sugerida:>5}")
+
+def exportar_sugerencias(sugerencias, filename):
+    """Exporta las sugerencias a CSV, una fila por producto y sucursal."""
+    try:
+        with open(filename, 'w', newline='', encoding='utf-8') as archivo:
+            writer = csv.writer(archivo)
+            writer.writerow(COLUMNAS_SUGERENCIAS)
+            for filas in sugerencias.values():
+                writer.writerows(filas)
+        print(f"\n✅ Sugerencias de compra exportadas a '{filename}'")
+        return True
+    except Exception as e:
+        print(f"❌ Error al exportar sugerencias a '{filename}': {e}")
+        return False
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Alertas de stock bajo y sugerencias de compra por proveedor.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    subparsers.add_parser('refrescar', help="Reconstruye la cola de alertas a partir del inventario.")
+    subparsers.add_parser('productos', help="Lista los productos con stock total por debajo del mínimo.")
+    sugerencias = subparsers.add_parser('sugerencias', help="Calcula cantidades a pedir agrupadas por proveedor.")
+    sugerencias.add_argument('--dias', type=int, default=DIAS_HISTORIA, metavar='N', help="Días de ventas para estimar la demanda.")
+    sugerencias.add_argument('--plazo', type=float, default=PLAZO_ENTREGA_DIAS, metavar='DIAS', help="Plazo de entrega del proveedor.")
+    sugerencias.add_argument('--cobertura', type=float, default=DIAS_COBERTURA, metavar='DIAS', help="Días de demanda a cubrir por encima del punto de reorden.")
+    sugerencias.add_argument('--z', type=float, default=FACTOR_SERVICIO, help="Factor de nivel de servicio para el stock de seguridad.")
+    sugerencias.add_argument('--out', metavar='ARCHIVO.csv', help="Exporta las sugerencias a CSV.")
+    args = parser.parse_args()
+
+    if args.comando == 'refrescar':
+        refrescar_alertas()
+    elif args.comando == 'productos':
+        productos = productos_bajo_minimo()
+        for producto in productos or []:
+            print(f"  {producto.codigo:<10} {producto.nombre[:40]:<40} stock {producto.stock:>5} / mín {producto.stock_minimo:>4}")
+        if productos == []:
+            print("No hay productos por debajo del stock mínimo.")
+    else:
+        resultado = sugerencias_compra(args.dias, args.plazo, args.cobertura, args.z)
+        if resultado is not None:
+            mostrar_sugerencias(resultado)
+            if args.out and resultado:
+                exportar_sugerencias(resultado, args.out)
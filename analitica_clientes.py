@@ -0,0 +1,216 @@
+"""
+Analítica de clientes: recencia, frecuencia, valor monetario (RFM) y valor de vida (LTV).
+
+`resumen_clientes` guarda una fila por cliente con los agregados de pedidos (incluidos los
+archivados por archivo.py, desde resumen_pedidos_archivados), facturas y pagos, los puntajes
+RFM (1 a 5, por NTILE sobre todos los clientes con pedidos) y el LTV proyectado. Se actualiza en dos sentencias:
+
+1. Agregados: solo se recalculan los clientes con pedidos, facturas o pagos desde la última
+   actualización (menos un margen), leyendo sus filas por índice de cliente. La primera
+   vez, o con --completo, se recalculan todos en una sola pasada.
+2. Puntajes y LTV: un UPDATE sobre resumen_clientes (una fila por cliente, no por pedido).
+
+    python analitica_clientes.py refrescar
+    python analitica_clientes.py top --n 20 --por ltv
+    python analitica_clientes.py top --segmento 555 --format csv --out campeones.csv
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from database import obtener_session, obtener_session_lectura
+
+MARGEN_HORAS = 24 # Cubre transacciones confirmadas tarde y cambios de estado recientes
+HORIZONTE_ANIOS = 3
+ANTIGUEDAD_MINIMA_DIAS = 90 # Evita proyectar tasas enormes a clientes recién llegados
+
+ORDENES_TOP = {
+    'ltv': 'r.ltv DESC NULLS LAST',
+    'monetario': 'r.monto_pedidos DESC',
+    'frecuencia': 'r.pedidos DESC',
+    'recencia': 'r.ultimo_pedido DESC NULLS LAST',
+}
+
+COLUMNAS_TOP = [
+    'CodigoCliente', 'NombreCliente', 'ApellidoCliente', 'Segmento', 'Pedidos', 'MontoPedidos',
+    'UltimoPedido', 'DiasDesdeUltimoPedido', 'Facturado', 'Pagado', 'LTV',
+]
+
+# Clientes con actividad desde :desde (o todos, en la actualización completa)
+_CLIENTES_CON_ACTIVIDAD = """
+    SELECT cliente_id FROM pedidos WHERE fecha >= :desde
+    UNION
+    SELECT cliente_id FROM facturas WHERE fecha >= :desde
+    UNION
+    SELECT f.cliente_id FROM pagos p JOIN facturas f ON f.id = p.factura_id WHERE p.fecha >= :desde
+"""
+_TODOS_LOS_CLIENTES = "SELECT id AS cliente_id FROM clientes"
+
+_ACTUALIZAR_AGREGADOS = """
+    WITH afectados AS ({afectados}),
+    ped AS (
+        SELECT cliente_id, SUM(pedidos) AS pedidos, SUM(monto) AS monto,
+               MIN(primer_pedido) AS primer_pedido, MAX(ultimo_pedido) AS ultimo_pedido
+        FROM (
+            SELECT cliente_id,
+                   COUNT(*) FILTER (WHERE estado <> 'cancelado') AS pedidos,
+                   COALESCE(SUM(total) FILTER (WHERE estado <> 'cancelado'), 0) AS monto,
+                   MIN(fecha) FILTER (WHERE estado <> 'cancelado') AS primer_pedido,
+                   MAX(fecha) FILTER (WHERE estado <> 'cancelado') AS ultimo_pedido
+            FROM pedidos
+            WHERE cliente_id IN (SELECT cliente_id FROM afectados)
+            GROUP BY cliente_id
+            UNION ALL
+            -- Pedidos ya archivados en Parquet (archivo.py)
+            SELECT cliente_id, pedidos, monto, primer_pedido, ultimo_pedido
+            FROM resumen_pedidos_archivados
+            WHERE cliente_id IN (SELECT cliente_id FROM afectados)
+        ) t
+        GROUP BY cliente_id
+    ),
+    fac AS (
+        SELECT cliente_id, COALESCE(SUM(total) FILTER (WHERE estado <> 'anulada'), 0) AS facturado
+        FROM facturas
+        WHERE cliente_id IN (SELECT cliente_id FROM afectados)
+        GROUP BY cliente_id
+    ),
+    pag AS (
+        SELECT f.cliente_id, SUM(p.monto) AS pagado, MAX(p.fecha) AS ultimo_pago
+        FROM pagos p
+        JOIN facturas f ON f.id = p.factura_id
+        WHERE f.cliente_id IN (SELECT cliente_id FROM afectados)
+        GROUP BY f.cliente_id
+    )
+    INSERT INTO resumen_clientes
+        (cliente_id, pedidos, monto_pedidos, primer_pedido, ultimo_pedido, facturado, pagado, ultimo_pago, fecha_actualizacion)
+    SELECT a.cliente_id, COALESCE(ped.pedidos, 0), COALESCE(ped.monto, 0), ped.primer_pedido, ped.ultimo_pedido,
+           COALESCE(fac.facturado, 0), COALESCE(pag.pagado, 0), pag.ultimo_pago, :ahora
+    FROM afectados a
+    LEFT JOIN ped ON ped.cliente_id = a.cliente_id
+    LEFT JOIN fac ON fac.cliente_id = a.cliente_id
+    LEFT JOIN pag ON pag.cliente_id = a.cliente_id
+    ON CONFLICT (cliente_id) DO UPDATE
+    SET pedidos = EXCLUDED.pedidos,
+        monto_pedidos = EXCLUDED.monto_pedidos,
+        primer_pedido = EXCLUDED.primer_pedido,
+        ultimo_pedido = EXCLUDED.ultimo_pedido,
+        facturado = EXCLUDED.facturado,
+        pagado = EXCLUDED.pagado,
+        ultimo_pago = EXCLUDED.ultimo_pago,
+        fecha_actualizacion = EXCLUDED.fecha_actualizacion
+"""
+
+# Puntajes relativos a todos los clientes con pedidos; solo se escriben las filas que cambian
+_ACTUALIZAR_PUNTAJES = """
+    WITH puntajes AS (
+        SELECT cliente_id,
+               NTILE(5) OVER (ORDER BY ultimo_pedido) AS r_score,
+               NTILE(5) OVER (ORDER BY pedidos) AS f_score,
+               NTILE(5) OVER (ORDER BY monto_pedidos) AS m_score,
+               -- LTV: gasto anual promedio desde el primer pedido, proyectado al horizonte
+               ROUND(
+                   monto_pedidos / (GREATEST(CURRENT_DATE - primer_pedido::date, :antiguedad_minima) / 365.25)
+                   * :horizonte, 2) AS ltv
+        FROM resumen_clientes
+        WHERE pedidos > 0
+    )
+    UPDATE resumen_clientes r
+    SET r_score = p.r_score,
+        f_score = p.f_score,
+        m_score = p.m_score,
+        segmento = p.r_score::text || p.f_score::text || p.m_score::text,
+        ltv = p.ltv
+    FROM puntajes p
+    WHERE r.cliente_id = p.cliente_id
+      AND (r.r_score, r.f_score, r.m_score, r.ltv) IS DISTINCT FROM (p.r_score, p.f_score, p.m_score, p.ltv)
+"""
+
+_LIMPIAR_SIN_PEDIDOS = """
+    UPDATE resumen_clientes
+    SET r_score = NULL, f_score = NULL, m_score = NULL, segmento = NULL, ltv = NULL
+    WHERE pedidos = 0 AND segmento IS NOT NULL
+"""
+
+def refrescar_resumen(completo=False, margen_horas=MARGEN_HORAS):
+    """
+    Actualiza resumen_clientes. Retorna (clientes recalculados, puntajes modificados), o
+    None si hubo un error.
+    """
+    session = obtener_session()
+    try:
+        ahora = datetime.now()
+        ultima = None if completo else session.execute(text("SELECT MAX(fecha_actualizacion) FROM resumen_clientes")).scalar()
+        if ultima is None:
+            sql = _ACTUALIZAR_AGREGADOS.format(afectados=_TODOS_LOS_CLIENTES)
+            parametros = {'ahora': ahora}
+        else:
+            sql = _ACTUALIZAR_AGREGADOS.format(afectados=_CLIENTES_CON_ACTIVIDAD)
+            parametros = {'ahora': ahora, 'desde': ultima - timedelta(hours=margen_horas)}
+        recalculados = session.execute(text(sql), parametros).rowcount
+        modificados = session.execute(text(_ACTUALIZAR_PUNTAJES), {
+            'antiguedad_minima': ANTIGUEDAD_MINIMA_DIAS, 'horizonte': HORIZONTE_ANIOS,
+        }).rowcount
+        session.execute(text(_LIMPIAR_SIN_PEDIDOS))
+        session.commit()
+        alcance = "completo" if ultima is None else f"desde {parametros['desde']:%Y-%m-%d %H:%M}"
+        print(f"✅ Resumen de clientes actualizado ({alcance}): {recalculados} clientes recalculados, {modificados} puntajes modificados.")
+        return recalculados, modificados
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error al actualizar el resumen de clientes: {e}")
+        return None
+    finally:
+        session.close()
+
+def top_clientes(n=20, por='ltv', segmento=None):
+    """
+    Los `n` mejores clientes según `por` (ltv, monetario, frecuencia o recencia), opcionalmente
+    de un segmento RFM. Retorna una lista de filas en el orden de COLUMNAS_TOP, o None si hubo un error.
+    """
+    session = obtener_session_lectura()
+    try:
+        filtro = "WHERE r.segmento = :segmento" if segmento else "WHERE r.pedidos > 0"
+        return session.execute(text(f"""
+            SELECT c.codigo, c.nombre, c.apellido, r.segmento, r.pedidos, r.monto_pedidos,
+                   r.ultimo_pedido, CURRENT_DATE - r.ultimo_pedido::date, r.facturado, r.pagado, r.ltv
+            FROM resumen_clientes r
+            JOIN clientes c ON c.id = r.cliente_id
+            {filtro}
+            ORDER BY {ORDENES_TOP[por]}, r.cliente_id
+            LIMIT :n
+        """), {'n': n, 'segmento': segmento}).all()
+    except Exception as e:
+        print(f"❌ Error al consultar el ranking de clientes: {e}")
+        return None
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Analítica RFM y valor de vida de los clientes.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    refrescar = subparsers.add_parser('refrescar', help="Actualiza resumen_clientes (incremental por defecto).")
+    refrescar.add_argument('--completo', action='store_true', help="Recalcula todos los clientes.")
+    refrescar.add_argument('--margen-horas', dest='margen_horas', type=float, default=MARGEN_HORAS, metavar='HORAS')
+    top = subparsers.add_parser('top', help="Ranking de clientes.")
+    top.add_argument('--n', type=int, default=20)
+    top.add_argument('--por', choices=ORDENES_TOP, default='ltv')
+    top.add_argument('--segmento', metavar='RFM', help="Ej. 555 para los mejores en las tres dimensiones.")
+    top.add_argument('--format', dest='formato', choices=['csv', 'json', 'parquet', 'xlsx'], help="Exporta el resultado.")
+    top.add_argument('--out', dest='salida', metavar='ARCHIVO')
+    args = parser.parse_args()
+
+    if args.comando == 'refrescar':
+        refrescar_resumen(args.completo, args.margen_horas)
+    else:
+        filas = top_clientes(args.n, args.por, args.segmento)
+        if filas is not None:
+            if args.formato or args.salida:
+                from reports import escribir_resultado, nombre_archivo_reporte
+                formato = args.formato or 'csv'
+                escribir_resultado(args.salida or nombre_archivo_reporte('top_clientes', formato), COLUMNAS_TOP, filas, formato)
+            else:
+                for codigo, nombre, apellido, segmento, pedidos, monto, _, dias, _, _, ltv in filas:
+                    nombre_completo = f"{nombre} {apellido or ''}".strip()
+                    print(f"  {codigo:<10} {nombre_completo[:30]:<30} RFM {segmento or '---'} "
+                          f"| {pedidos:>4} pedidos | ${monto:>12,.2f} | hace {dias} días | LTV ${ltv or 0:>12,.2f}")
@@ -0,0 +1,209 @@
+"""
+Motor analítico embebido: los reportes de reports.py sobre DuckDB y un snapshot en Parquet.
+
+El análisis ad hoc pesado sobre los reportes compite con la operación en PostgreSQL. Este
+módulo exporta a archivos Parquet locales las tablas que usan los tres reportes (ventas,
+detalle_ventas, productos, categorias, inventario, pedidos, clientes, empleados, sucursales)
+y ejecuta las mismas consultas de reports.py con DuckDB, vectorizado y en todos los núcleos.
+
+Las tablas se exportan juntas en una sola transacción REPEATABLE READ, así que el snapshot
+es consistente entre tablas. Cada snapshot va en su propio directorio y el archivo 'actual'
+apunta al último completo; los anteriores se borran dejando CONSERVAR_SNAPSHOTS.
+
+    analitico/20250301T020000/ventas.parquet
+    analitico/20250301T020000/snapshot.json     (momento del snapshot y filas por tabla)
+    analitico/actual                            (nombre del snapshot vigente)
+
+Las consultas no se reescriben: la misma sentencia que arman _consulta_* y _filtrar_* en
+reports.py se compila con el dialecto de PostgreSQL y parámetros posicionales, y DuckDB la
+ejecuta sobre vistas con los mismos nombres de tabla. Los tipos se conservan (NUMERIC como
+DECIMAL con la misma escala, TIMESTAMP sin zona) y NULLS va primero en orden descendente
+como en PostgreSQL, así que el resultado es el mismo que en el primario para el momento del
+snapshot. El texto se ordena byte a byte; si la base usa una colación de idioma, indíquela
+en COLACION_ANALITICA (ej. 'es', requiere la extensión icu de DuckDB).
+
+    python analitico_duckdb.py exportar
+    python analitico_duckdb.py estado
+    python reports.py ventas --desde 2025-01-01 --motor duckdb --format parquet
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from archivo import esquema_arrow
+from database import obtener_engine
+
+DIRECTORIO_ANALITICO = os.environ.get('DIRECTORIO_ANALITICO', 'analitico')
+TABLAS = ('ventas', 'detalle_ventas', 'productos', 'categorias', 'inventario', 'pedidos', 'clientes', 'empleados', 'sucursales')
+FILAS_POR_GRUPO = 100000 # Filas leídas por tanda y por row group de Parquet
+CONSERVAR_SNAPSHOTS = 2 # El anterior queda para consultas que ya lo tenían abierto
+EDAD_MAXIMA_HORAS = 24 # Se avisa si el snapshot vigente es más viejo
+HILOS = int(os.environ.get('HILOS_ANALITICOS', os.cpu_count() or 1))
+COLACION_ANALITICA = os.environ.get('COLACION_ANALITICA')
+COMPRESION = 'zstd'
+
+# Parámetros posicionales (?) como los espera DuckDB; el SQL es el mismo que va al primario
+_DIALECTO = postgresql.dialect(paramstyle='qmark')
+
+def _ruta(*partes):
+    return os.path.join(DIRECTORIO_ANALITICO, *partes)
+
+def snapshot_actual():
+    """Nombre del snapshot vigente, o None si todavía no se exportó ninguno."""
+    try:
+        with open(_ruta('actual'), encoding='utf-8') as archivo:
+            return archivo.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def leer_metadatos(nombre=None):
+    nombre = nombre or snapshot_actual()
+    if nombre is None:
+        return None
+    with open(_ruta(nombre, 'snapshot.json'), encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+# --- Exportación ---
+
+def _exportar_tabla(conn, tabla, destino):
+    """Copia la tabla completa a un Parquet con el esquema de su modelo. Retorna las filas escritas."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    esquema = esquema_arrow(tabla)
+    columnas = ', '.join(f'"{nombre}"' for nombre in esquema.names)
+    filas = 0
+    with pq.ParquetWriter(destino, esquema, compression=COMPRESION) as escritor:
+        # Texto crudo: los TypeDecorator no intervienen y JSON queda como el texto guardado
+        resultado = conn.execute(text(f"SELECT {columnas} FROM {tabla} ORDER BY id"))
+        for tanda in resultado.partitions(FILAS_POR_GRUPO):
+            lote = pa.Table.from_arrays(
+                [pa.array(valores, type=campo.type) for valores, campo in zip(zip(*tanda), esquema)],
+                schema=esquema)
+            escritor.write_table(lote, row_group_size=FILAS_POR_GRUPO)
+            filas += len(tanda)
+    if pq.read_metadata(destino).num_rows != filas:
+        raise RuntimeError(f"El archivo {destino} no tiene las filas esperadas")
+    return filas
+
+def _publicar(nombre):
+    temporal = _ruta('actual.tmp')
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        archivo.write(nombre)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, _ruta('actual'))
+
+def _limpiar_anteriores(vigente):
+    snapshots = sorted(nombre for nombre in os.listdir(DIRECTORIO_ANALITICO)
+                       if os.path.isdir(_ruta(nombre)) and not nombre.endswith('.tmp'))
+    for nombre in snapshots[:-CONSERVAR_SNAPSHOTS]:
+        if nombre != vigente:
+            shutil.rmtree(_ruta(nombre), ignore_errors=True)
+
+def exportar():
+    """
+    Exporta un snapshot consistente de TABLAS y lo publica como vigente.
+    Retorna el nombre del snapshot, o None si hubo un error.
+    """
+    nombre = datetime.now().strftime('%Y%m%dT%H%M%S')
+    temporal = _ruta(nombre + '.tmp')
+    try:
+        os.makedirs(temporal, exist_ok=True)
+        inicio = time.perf_counter()
+        filas = {}
+        with obtener_engine().connect().execution_options(isolation_level='REPEATABLE READ', stream_results=True) as conn:
+            momento = conn.execute(text("SELECT now()::timestamp")).scalar()
+            for tabla in TABLAS:
+                filas[tabla] = _exportar_tabla(conn, tabla, os.path.join(temporal, f"{tabla}.parquet"))
+                print(f"  {tabla}: {filas[tabla]} filas")
+            conn.rollback()
+        with open(os.path.join(temporal, 'snapshot.json'), 'w', encoding='utf-8') as archivo:
+            json.dump({'momento': momento.isoformat(), 'filas': filas,
+                       'duracion_segundos': round(time.perf_counter() - inicio, 3)}, archivo, indent=2)
+        os.replace(temporal, _ruta(nombre))
+        _publicar(nombre)
+        _limpiar_anteriores(nombre)
+        print(f"✅ Snapshot analítico '{nombre}' exportado ({sum(filas.values())} filas, {time.perf_counter() - inicio:.1f} s).")
+        return nombre
+    except Exception as e:
+        shutil.rmtree(temporal, ignore_errors=True)
+        print(f"❌ Error al exportar el snapshot analítico: {e}")
+        return None
+
+# --- Consultas ---
+
+_conexion = None # (nombre del snapshot, conexión DuckDB)
+_conexion_lock = threading.Lock()
+
+def _conectar(nombre):
+    import duckdb
+    conexion = duckdb.connect(':memory:', config={'threads': HILOS})
+    # Igual que PostgreSQL: NULLS LAST en ascendente y NULLS FIRST en descendente
+    conexion.execute("SET default_null_order = 'nulls_last_on_asc_first_on_desc'")
+    if COLACION_ANALITICA:
+        conexion.execute(f"SET default_collation = '{COLACION_ANALITICA}'")
+    for tabla in TABLAS:
+        ruta = os.path.abspath(_ruta(nombre, f"{tabla}.parquet")).replace("'", "''")
+        conexion.execute(f"CREATE VIEW {tabla} AS SELECT * FROM read_parquet('{ruta}')")
+    return conexion
+
+def obtener_conexion():
+    """Conexión DuckDB (una por proceso) sobre el snapshot vigente; se renueva si se publicó otro."""
+    global _conexion
+    nombre = snapshot_actual()
+    if nombre is None:
+        raise RuntimeError("No hay snapshot analítico; ejecute 'python analitico_duckdb.py exportar'.")
+    with _conexion_lock:
+        if _conexion is None or _conexion[0] != nombre:
+            if _conexion is not None:
+                _conexion[1].close()
+            _conexion = (nombre, _conectar(nombre))
+            momento = datetime.fromisoformat(leer_metadatos(nombre)['momento'])
+            edad = (datetime.now() - momento).total_seconds() / 3600
+            print(f"Motor DuckDB: snapshot del {momento:%Y-%m-%d %H:%M:%S}.")
+            if edad > EDAD_MAXIMA_HORAS:
+                print(f"⚠️ El snapshot analítico tiene {edad:.0f} horas.")
+        # Un cursor por llamada: la conexión puede compartirse entre hilos
+        return _conexion[1].cursor()
+
+def leer_filas(statement, clase):
+    """
+    Equivalente a filas.leer_filas sobre el snapshot: compila la sentencia de reports.py y la
+    ejecuta en DuckDB. Retorna una lista de instancias de `clase`.
+    """
+    compilada = statement.compile(dialect=_DIALECTO)
+    parametros = [compilada.params[nombre] for nombre in compilada.positiontup]
+    cursor = obtener_conexion()
+    try:
+        return [clase(*fila) for fila in cursor.execute(compilada.string, parametros).fetchall()]
+    finally:
+        cursor.close()
+
+def mostrar_estado():
+    nombre = snapshot_actual()
+    if nombre is None:
+        print("No hay snapshot analítico exportado.")
+        return
+    metadatos = leer_metadatos(nombre)
+    print(f"Snapshot vigente: {nombre} (momento {metadatos['momento']}, exportado en {metadatos['duracion_segundos']} s)")
+    for tabla, filas in metadatos['filas'].items():
+        tamano = os.path.getsize(_ruta(nombre, f"{tabla}.parquet"))
+        print(f"  {tabla:<16} {filas:>12} filas {tamano / 1024 / 1024:>10.1f} MB")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Snapshot en Parquet y motor DuckDB para los reportes.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    subparsers.add_parser('exportar', help="Exporta un snapshot consistente de las tablas de los reportes.")
+    subparsers.add_parser('estado', help="Muestra el snapshot vigente.")
+    args = parser.parse_args()
+
+    if args.comando == 'exportar':
+        raise SystemExit(0 if exportar() else 1)
+    mostrar_estado()
@@ -1,12 +1,44 @@
-from database import Session, engine
+import argparse
+import csv
+import json
+import sys
+from operator import attrgetter
+
+ENTIDADES_LISTABLES = ('productos', 'clientes', 'empleados')
+
+def construir_parser():
+    """Construye el parser de argumentos de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        prog='app',
+        description="Gestión de productos, clientes y empleados. Sin argumentos abre el menú interactivo.",
+    )
+    parser.add_argument('--metricas-puerto', dest='metricas_puerto', type=int, metavar='PUERTO', help="Sirve métricas Prometheus en http://127.0.0.1:PUERTO/metrics mientras corre.")
+    entidades = parser.add_subparsers(dest='entidad')
+    for entidad in ENTIDADES_LISTABLES:
+        acciones = entidades.add_parser(entidad, help=f"Operaciones sobre {entidad}.").add_subparsers(dest='accion', required=True)
+        listar = acciones.add_parser('list', help=f"Lista todos los {entidad} paginando por ID.")
+        listar.add_argument('--page-size', dest='tamano_pagina', type=int, default=1000, metavar='N', help="Filas leídas por consulta (1000 por defecto).")
+        listar.add_argument('--format', dest='formato', choices=('csv', 'jsonl'), default='csv', help="Formato de salida (csv por defecto).")
+        listar.add_argument('--out', dest='salida', metavar='ARCHIVO', help="Archivo de salida (por defecto, la salida estándar).")
+        importar = acciones.add_parser('import', help=f"Importa (inserta o actualiza por código) {entidad} desde un CSV o XLSX.")
+        importar.add_argument('archivo', help="Archivo .csv o .xlsx con encabezados.")
+        importar.add_argument('--lote', dest='tamano_lote', type=int, default=5000, metavar='N', help="Filas por lote (5000 por defecto).")
+        importar.add_argument('--rechazos', dest='ruta_rechazos', metavar='ARCHIVO', help="CSV de filas rechazadas (por defecto, <archivo>_rechazos.csv).")
+    return parser
+
+# Igual que en reports.py: los argumentos se analizan antes de importar SQLAlchemy y los modelos
+if __name__ == '__main__':
+    _ARGUMENTOS = construir_parser().parse_args()
+
+from database import obtener_session, obtener_session_lectura
 from database import (
    
     Categoria, Producto, Proveedor, Cliente, Pedido, DetallePedido, Servicio,
     Empleado, Departamento, Puesto, Factura, Pago, Venta, DetalleVenta, Sucursal,
-    Inventario, MovimientoInventario,
-    
-    VistaProductoDetalle, VistaClienteResumen, VistaEmpleadoResumen
+    Inventario, MovimientoInventario
 )
+from filas import FilaProducto, FilaCliente, FilaEmpleado, columnas_de, consulta_vista, leer_filas, listar_vista
+import cache_referencia
 from datetime import datetime, date
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
@@ -14,7 +46,11 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 def get_session():
     """Retorna una nueva sesión de SQLAlchemy."""
-    return Session()
+    return obtener_session()
+
+def get_read_session():
+    """Retorna una sesión de solo lectura para los listados (réplica si hay una disponible)."""
+    return obtener_session_lectura()
 
 def clear_screen():
     """Limpia la consola."""
@@ -50,7 +86,11 @@ def crud_productos():
         try:
             if choice == '1':
                 print_header("LISTADO DE PRODUCTOS")
-                productos_detalle = session.query(VistaProductoDetalle).all()
+                read_session = get_read_session()
+                try:
+                    productos_detalle = listar_vista(read_session, FilaProducto)
+                finally:
+                    read_session.close()
                 if not productos_detalle:
                     print("No hay productos registrados.")
                 else:
@@ -75,8 +115,8 @@ def crud_productos():
                     press_any_key_to_continue()
                     continue
 
-                # Seleccionar Categoría
-                categorias = session.query(Categoria).all()
+                # Seleccionar Categoría (desde la caché de datos de referencia)
+                categorias = cache_referencia.listar('categorias')
                 if not categorias:
                     print("No hay categorías. Crea una antes de añadir productos.")
                     press_any_key_to_continue()
@@ -87,7 +127,7 @@ def crud_productos():
                 
                 try:
                     categoria_id = int(input("ID de Categoría: "))
-                    categoria_obj = session.query(Categoria).filter_by(id=categoria_id).first()
+                    categoria_obj = cache_referencia.obtener('categorias', categoria_id)
                     if not categoria_obj:
                         print("Categoría no encontrada.")
                         press_any_key_to_continue()
@@ -104,7 +144,7 @@ def crud_productos():
                     precio=precio,
                     stock=stock,
                     stock_minimo=stock_minimo,
-                    categoria=categoria_obj,
+                    categoria_id=categoria_obj.id,
                     fecha_creacion=datetime.now()
                 )
                 session.add(nuevo_producto)
@@ -121,7 +161,7 @@ def crud_productos():
                     continue
                 producto_id = int(producto_id_str)
                 
-                producto_a_actualizar = session.query(Producto).filter_by(id=producto_id).first()
+                producto_a_actualizar = session.get(Producto, producto_id)
                 if not producto_a_actualizar:
                     print("Producto no encontrado.")
                     press_any_key_to_continue()
@@ -155,16 +195,16 @@ def crud_productos():
                 # Opcional: Actualizar Categoría
                 update_cat = input("¿Desea actualizar la categoría? (s/n): ").lower()
                 if update_cat == 's':
-                    categorias = session.query(Categoria).all()
+                    categorias = cache_referencia.listar('categorias')
                     if categorias:
                         print("\nCategorías disponibles:")
                         for cat in categorias:
                             print(f"{cat.id}. {cat.nombre}")
                         try:
                             nueva_categoria_id = int(input("Nuevo ID de Categoría: "))
-                            nueva_categoria_obj = session.query(Categoria).filter_by(id=nueva_categoria_id).first()
+                            nueva_categoria_obj = cache_referencia.obtener('categorias', nueva_categoria_id)
                             if nueva_categoria_obj:
-                                producto_a_actualizar.categoria = nueva_categoria_obj
+                                producto_a_actualizar.categoria_id = nueva_categoria_obj.id
                             else:
                                 print("Categoría no encontrada. Se mantendrá la anterior.")
                         except ValueError:
@@ -186,7 +226,7 @@ def crud_productos():
                     continue
                 producto_id = int(producto_id_str)
                 
-                producto_a_eliminar = session.query(Producto).filter_by(id=producto_id).first()
+                producto_a_eliminar = session.get(Producto, producto_id)
                 if not producto_a_eliminar:
                     print("Producto no encontrado.")
                 else:
@@ -238,7 +278,11 @@ def crud_clientes():
         try:
             if choice == '1':
                 print_header("LISTADO DE CLIENTES")
-                clientes_resumen = session.query(VistaClienteResumen).all()
+                read_session = get_read_session()
+                try:
+                    clientes_resumen = listar_vista(read_session, FilaCliente)
+                finally:
+                    read_session.close()
                 if not clientes_resumen:
                     print("No hay clientes registrados.")
                 else:
@@ -302,7 +346,7 @@ def crud_clientes():
                     continue
                 cliente_id = int(cliente_id_str)
                 
-                cliente_a_actualizar = session.query(Cliente).filter_by(id=cliente_id).first()
+                cliente_a_actualizar = session.get(Cliente, cliente_id)
                 if not cliente_a_actualizar:
                     print("Cliente no encontrado.")
                 else:
@@ -341,7 +385,7 @@ def crud_clientes():
                     continue
                 cliente_id = int(cliente_id_str)
 
-                cliente_a_eliminar = session.query(Cliente).filter_by(id=cliente_id).first()
+                cliente_a_eliminar = session.get(Cliente, cliente_id)
                 if not cliente_a_eliminar:
                     print("Cliente no encontrado.")
                 else:
@@ -393,7 +437,11 @@ def crud_empleados():
         try:
             if choice == '1':
                 print_header("LISTADO DE EMPLEADOS")
-                empleados_resumen = session.query(VistaEmpleadoResumen).all()
+                read_session = get_read_session()
+                try:
+                    empleados_resumen = listar_vista(read_session, FilaEmpleado)
+                finally:
+                    read_session.close()
                 if not empleados_resumen:
                     print("No hay empleados registrados.")
                 else:
@@ -420,8 +468,8 @@ def crud_empleados():
                     press_any_key_to_continue()
                     continue
 
-                # Seleccionar Puesto
-                puestos = session.query(Puesto).all()
+                # Seleccionar Puesto (desde la caché de datos de referencia)
+                puestos = cache_referencia.listar('puestos')
                 if not puestos:
                     print("No hay puestos. Crea uno antes de añadir empleados.")
                     press_any_key_to_continue()
@@ -432,7 +480,7 @@ def crud_empleados():
                 
                 try:
                     puesto_id = int(input("ID de Puesto: "))
-                    puesto_obj = session.query(Puesto).filter_by(id=puesto_id).first()
+                    puesto_obj = cache_referencia.obtener('puestos', puesto_id)
                     if not puesto_obj:
                         print("Puesto no encontrado.")
                         press_any_key_to_continue()
@@ -451,7 +499,7 @@ def crud_empleados():
                     email=email,
                     salario=salario,
                     fecha_ingreso=datetime.now(),
-                    puesto=puesto_obj
+                    puesto_id=puesto_obj.id
                 )
                 session.add(nuevo_empleado)
                 session.commit()
@@ -467,7 +515,7 @@ def crud_empleados():
                     continue
                 empleado_id = int(empleado_id_str)
                 
-                empleado_a_actualizar = session.query(Empleado).filter_by(id=empleado_id).first()
+                empleado_a_actualizar = session.get(Empleado, empleado_id)
                 if not empleado_a_actualizar:
                     print("Empleado no encontrado.")
                 else:
@@ -488,16 +536,16 @@ def crud_empleados():
                     # Opcional: Actualizar Puesto
                     update_puesto = input("¿Desea actualizar el puesto? (s/n): ").lower()
                     if update_puesto == 's':
-                        puestos = session.query(Puesto).all()
+                        puestos = cache_referencia.listar('puestos')
                         if puestos:
                             print("\nPuestos disponibles:")
                             for p in puestos:
                                 print(f"{p.id}. {p.nombre}")
                             try:
                                 nuevo_puesto_id = int(input("Nuevo ID de Puesto: "))
-                                nuevo_puesto_obj = session.query(Puesto).filter_by(id=nuevo_puesto_id).first()
+                                nuevo_puesto_obj = cache_referencia.obtener('puestos', nuevo_puesto_id)
                                 if nuevo_puesto_obj:
-                                    empleado_a_actualizar.puesto = nuevo_puesto_obj
+                                    empleado_a_actualizar.puesto_id = nuevo_puesto_obj.id
                                 else:
                                     print("Puesto no encontrado. Se mantendrá el anterior.")
                             except ValueError:
@@ -518,7 +566,7 @@ def crud_empleados():
                     continue
                 empleado_id = int(empleado_id_str)
 
-                empleado_a_eliminar = session.query(Empleado).filter_by(id=empleado_id).first()
+                empleado_a_eliminar = session.get(Empleado, empleado_id)
                 if not empleado_a_eliminar:
                     print("Empleado no encontrado.")
                 else:
@@ -552,6 +600,63 @@ def crud_empleados():
         finally:
             session.close()
 
+# --- Listados no interactivos ---
+
+# Fila liviana (y con ella, las columnas) que se exporta de cada vista
+LISTADOS = {
+    'productos': FilaProducto,
+    'clientes': FilaCliente,
+    'empleados': FilaEmpleado,
+}
+
+def listar_por_paginas(clase, tamano_pagina):
+    """
+    Recorre una vista por páginas usando paginación por clave (id > último ID visto) en lugar
+    de OFFSET, así cada página cuesta lo mismo sin importar cuán adentro del listado esté.
+    """
+    id_vista = consulta_vista(clase).selected_columns.id
+    read_session = get_read_session()
+    try:
+        ultimo_id = 0
+        while True:
+            pagina = leer_filas(read_session, consulta_vista(clase).where(id_vista > ultimo_id).limit(tamano_pagina), clase)
+            if not pagina:
+                return
+            yield pagina
+            if len(pagina) < tamano_pagina:
+                return
+            ultimo_id = pagina[-1].id
+    finally:
+        read_session.close()
+
+def exportar_listado(entidad, tamano_pagina=1000, formato='csv', salida=None):
+    """Escribe el listado completo de la entidad en CSV o JSON Lines, página por página."""
+    clase = LISTADOS[entidad]
+    columnas = columnas_de(clase)
+    valores = attrgetter(*columnas)
+    archivo = open(salida, 'w', newline='', encoding='utf-8') if salida else sys.stdout
+    try:
+        writer = csv.writer(archivo) if formato == 'csv' else None
+        if writer:
+            writer.writerow(columnas)
+        total = 0
+        for pagina in listar_por_paginas(clase, tamano_pagina):
+            for fila in pagina:
+                if writer:
+                    writer.writerow(['' if valor is None else valor for valor in valores(fila)])
+                else:
+                    archivo.write(json.dumps(dict(zip(columnas, valores(fila))), ensure_ascii=False, default=str) + '\n')
+            total += len(pagina)
+        if salida:
+            print(f"✅ {total} {entidad} exportados a '{salida}'")
+        return True
+    except Exception as e:
+        print(f"❌ Error al listar {entidad}: {e}", file=sys.stderr)
+        return False
+    finally:
+        if salida:
+            archivo.close()
+
 # --- Menú Principal de la Aplicación ---
 
 def main_app_menu():
@@ -581,6 +686,17 @@ def main_app_menu():
             press_any_key_to_continue()
 
 if __name__ == '__main__':
-    print("Iniciando la aplicación de gestión...")
-    print("Asegúrese de haber ejecutado database.py, queries.py e inserts.py previamente.")
-    main_app_menu()
\ No newline at end of file
+    if _ARGUMENTOS.metricas_puerto:
+        import metricas
+        metricas.servir(_ARGUMENTOS.metricas_puerto)
+    if _ARGUMENTOS.entidad is None:
+        print("Iniciando la aplicación de gestión...")
+        print("Asegúrese de haber ejecutado database.py, queries.py e inserts.py previamente.")
+        import notificaciones
+        notificaciones.iniciar()
+        main_app_menu()
+    elif _ARGUMENTOS.accion == 'import':
+        import importacion
+        sys.exit(0 if importacion.importar(_ARGUMENTOS.entidad, _ARGUMENTOS.archivo, _ARGUMENTOS.tamano_lote, _ARGUMENTOS.ruta_rechazos) else 1)
+    else:
+        sys.exit(0 if exportar_listado(_ARGUMENTOS.entidad, _ARGUMENTOS.tamano_pagina, _ARGUMENTOS.formato, _ARGUMENTOS.salida) else 1)
\ No newline at end of file
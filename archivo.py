@@ -0,0 +1,474 @@
+"""
+Archivo de datos fríos: ventas, pedidos y movimientos de inventario antiguos a Parquet.
+
+Las filas con más de HORIZONTE_MESES se copian a archivos Parquet comprimidos (zstd),
+particionados por mes y sucursal (directorios al estilo Hive), y después se borran de PostgreSQL por lotes:
+
+    archivo/ventas/ventas/mes=2023-01/sucursal=3/<uuid>.parquet
+    archivo/ventas/detalle_ventas/mes=2023-01/sucursal=3/<uuid>.parquet
+    archivo/pedidos/pedidos/mes=2023-01/sucursal=0/...      (pedidos no tiene sucursal: 0)
+    archivo/movimientos_inventario/movimientos_inventario/mes=2023-01/sucursal=5/...
+
+Cada mes se lee en una sola transacción REPEATABLE READ (cabeceras y detalles consistentes),
+los archivos se escriben como .tmp y se renombran al cerrarse, y el manifiesto registra el mes
+como 'escrito' antes de borrar. Los borrados van por lotes de ids leídos del propio Parquet, en
+transacciones cortas; si el proceso se interrumpe, la siguiente ejecución retoma los borrados
+pendientes sin volver a escribir. Los movimientos borrados se resumen en
+resumen_movimientos_archivados igual que en snapshots_inventario.compactar_movimientos, y
+los pedidos en resumen_pedidos_archivados (por mes y cliente, para analitica_clientes.py). Los
+pedidos convertidos en ventas o facturas (conversion_pedidos.py) se quedan en PostgreSQL
+mientras alguna los referencie.
+
+Los reportes de ventas y pedidos de reports.py aceptan --archivo para unir las filas
+archivadas cuando el rango de fechas llega antes del horizonte archivado (ventas_archivadas,
+pedidos_archivados). Antes de archivar ventas de un mes se verifica que ventas_diarias_agg
+cubra sus días, para que el cubo de ventas (cubo_ventas.py) no pierda historia.
+
+    python archivo.py archivar --conjunto todos --horizonte-meses 24
+    python archivo.py estado
+    python reports.py ventas --desde 2022-01-01 --hasta 2022-12-31 --archivo
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, select, text
+
+import cache_referencia
+from database import Base, Cliente, Empleado, Producto, obtener_engine
+from filas import FilaPedido, FilaVenta
+
+DIRECTORIO_ARCHIVO = os.environ.get('DIRECTORIO_ARCHIVO', 'archivo')
+MANIFIESTO = 'manifiesto.json'
+HORIZONTE_MESES = 24
+FILAS_POR_GRUPO = 50000 # Filas leídas por tanda y por row group de Parquet
+TAMANO_LOTE_BORRADO = 2000 # Cabeceras borradas por transacción (con sus detalles)
+PAUSA_ENTRE_LOTES = 0.05
+COMPRESION = 'zstd'
+
+# Conjunto archivado: tabla con la fecha, tabla de detalle que se mueve con ella, columna de partición
+# y condición sobre la cabecera (alias h) de las filas que no se archivan
+CONJUNTOS = {
+    'ventas': {'tabla': 'ventas', 'detalle': 'detalle_ventas', 'clave_detalle': 'venta_id', 'sucursal': 'sucursal_id',
+               'conservar': None},
+    # Los pedidos convertidos siguen referenciados por ventas.pedido_id y facturas.pedido_id
+    'pedidos': {'tabla': 'pedidos', 'detalle': 'detalle_pedidos', 'clave_detalle': 'pedido_id', 'sucursal': None,
+                'conservar': "EXISTS (SELECT 1 FROM ventas r WHERE r.pedido_id = h.id)"
+                             " OR EXISTS (SELECT 1 FROM facturas r WHERE r.pedido_id = h.id)"},
+    'movimientos_inventario': {'tabla': 'movimientos_inventario', 'detalle': None, 'clave_detalle': None, 'sucursal': 'sucursal_id',
+                               'conservar': None},
+}
+
+# --- Manifiesto ---
+
+def _ruta(*partes):
+    return os.path.join(DIRECTORIO_ARCHIVO, *partes)
+
+def leer_manifiesto():
+    """{conjunto: {'YYYY-MM': {'estado': 'escrito'|'borrado', 'archivos': [...], 'filas': n}}}"""
+    try:
+        with open(_ruta(MANIFIESTO), encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except FileNotFoundError:
+        return {}
+
+def _guardar_manifiesto(manifiesto):
+    os.makedirs(DIRECTORIO_ARCHIVO, exist_ok=True)
+    temporal = _ruta(MANIFIESTO + '.tmp')
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False, indent=2)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, _ruta(MANIFIESTO))
+
+def _limpiar_temporales():
+    """Elimina archivos .tmp de escrituras interrumpidas (nunca llegaron al manifiesto)."""
+    for raiz, _, archivos in os.walk(DIRECTORIO_ARCHIVO):
+        for nombre in archivos:
+            if nombre.endswith('.parquet.tmp'):
+                os.remove(os.path.join(raiz, nombre))
+
+def _siguiente_mes(mes):
+    return date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+
+def horizonte_archivado(conjunto):
+    """Primer día posterior al último mes archivado del conjunto, o None si no hay archivo."""
+    meses = leer_manifiesto().get(conjunto, {})
+    if not meses:
+        return None
+    return _siguiente_mes(datetime.strptime(max(meses), '%Y-%m').date())
+
+def necesita_archivo(conjunto, desde):
+    """True si un rango que empieza en `desde` (None = sin límite) llega a datos archivados."""
+    horizonte = horizonte_archivado(conjunto)
+    return horizonte is not None and (desde is None or _como_fecha(desde) < horizonte)
+
+def _como_fecha(valor):
+    return valor.date() if isinstance(valor, datetime) else valor
+
+# --- Escritura ---
+
+def esquema_arrow(tabla):
+    """Esquema Arrow de una tabla, a partir de su modelo en database.py."""
+    import pyarrow as pa
+    campos = []
+    for columna in Base.metadata.tables[tabla].columns:
+        tipo = columna.type
+        if isinstance(tipo, Integer):
+            tipo_arrow = pa.int64()
+        elif isinstance(tipo, Numeric):
+            tipo_arrow = pa.decimal128(tipo.precision or 38, tipo.scale if tipo.scale is not None else 10)
+        elif isinstance(tipo, DateTime):
+            tipo_arrow = pa.timestamp('us')
+        elif isinstance(tipo, Date):
+            tipo_arrow = pa.date32()
+        elif isinstance(tipo, Boolean):
+            tipo_arrow = pa.bool_()
+        else:
+            tipo_arrow = pa.string()
+        campos.append(pa.field(columna.name, tipo_arrow))
+    return pa.schema(campos)
+
+class _EscritorParticiones:
+    """Escribe filas ordenadas por partición: un archivo Parquet por (mes, sucursal) y ejecución."""
+
+    def __init__(self, conjunto, tabla, mes):
+        self.conjunto, self.tabla, self.mes = conjunto, tabla, mes
+        self.esquema = esquema_arrow(tabla)
+        self.columnas = self.esquema.names
+        self.archivos = []
+        self._sucursal = None
+        self._escritor = None
+        self._buffer = []
+
+    def agregar(self, sucursal, fila):
+        if sucursal != self._sucursal:
+            self._cerrar_actual()
+            self._abrir(sucursal)
+        self._buffer.append({columna: fila[columna] for columna in self.columnas})
+        if len(self._buffer) >= FILAS_POR_GRUPO:
+            self._volcar()
+
+    def _abrir(self, sucursal):
+        import pyarrow.parquet as pq
+        directorio = _ruta(self.conjunto, self.tabla, f"mes={self.mes:%Y-%m}", f"sucursal={sucursal}")
+        os.makedirs(directorio, exist_ok=True)
+        final = os.path.join(directorio, f"{uuid.uuid4().hex}.parquet")
+        self._sucursal = sucursal
+        self._actual = {'tabla': self.tabla, 'sucursal': sucursal, 'ruta': os.path.relpath(final, DIRECTORIO_ARCHIVO), 'filas': 0}
+        self._escritor = pq.ParquetWriter(final + '.tmp', self.esquema, compression=COMPRESION)
+
+    def _volcar(self):
+        import pyarrow as pa
+        if self._buffer:
+            self._escritor.write_table(pa.Table.from_pylist(self._buffer, schema=self.esquema), row_group_size=FILAS_POR_GRUPO)
+            self._actual['filas'] += len(self._buffer)
+            self._buffer = []
+
+    def _cerrar_actual(self):
+        import pyarrow.parquet as pq
+        if self._escritor is None:
+            return
+        self._volcar()
+        self._escritor.close()
+        final = _ruta(self._actual['ruta'])
+        os.replace(final + '.tmp', final)
+        if pq.read_metadata(final).num_rows != self._actual['filas']:
+            raise RuntimeError(f"El archivo {final} no tiene las filas esperadas")
+        self.archivos.append(self._actual)
+        self._escritor = None
+
+    def cerrar(self):
+        self._cerrar_actual()
+        return self.archivos
+
+def _escribir_mes(conjunto, mes):
+    """Escribe a Parquet las filas del mes. Retorna los archivos escritos (lista vacía si no había filas)."""
+    definicion = CONJUNTOS[conjunto]
+    tabla, detalle = definicion['tabla'], definicion['detalle']
+    sucursal = f"COALESCE(h.{definicion['sucursal']}, 0)" if definicion['sucursal'] else '0'
+    conservar = f"AND NOT ({definicion['conservar']})" if definicion['conservar'] else ''
+    rango = {'desde': mes, 'hasta': _siguiente_mes(mes)}
+    archivos = []
+    with obtener_engine().connect().execution_options(isolation_level='REPEATABLE READ', stream_results=True) as conn:
+        consultas = [(tabla, f"""
+            SELECT h.*, {sucursal} AS particion FROM {tabla} h
+            WHERE h.fecha >= :desde AND h.fecha < :hasta {conservar}
+            ORDER BY particion, h.id
+        """)]
+        if detalle:
+            consultas.append((detalle, f"""
+                SELECT d.*, {sucursal} AS particion FROM {detalle} d
+                JOIN {tabla} h ON h.id = d.{definicion['clave_detalle']}
+                WHERE h.fecha >= :desde AND h.fecha < :hasta {conservar}
+                ORDER BY particion, d.id
+            """))
+        for nombre_tabla, consulta in consultas:
+            escritor = _EscritorParticiones(conjunto, nombre_tabla, mes)
+            resultado = conn.execute(text(consulta), rango).mappings()
+            for filas in resultado.partitions(FILAS_POR_GRUPO):
+                for fila in filas:
+                    escritor.agregar(fila['particion'], fila)
+            archivos += escritor.cerrar()
+        conn.rollback()
+    return archivos
+
+# --- Borrado ---
+
+def _ids_archivados(archivos, tabla):
+    import pyarrow.parquet as pq
+    ids = []
+    for archivo in archivos:
+        if archivo['tabla'] == tabla:
+            ids += pq.read_table(_ruta(archivo['ruta']), columns=['id']).column('id').to_pylist()
+    return sorted(ids)
+
+def _borrar(conjunto, ids, tamano_lote):
+    """Borra de PostgreSQL las cabeceras archivadas (y sus detalles) en transacciones cortas."""
+    from snapshots_inventario import _CANTIDAD_CON_SIGNO
+    definicion = CONJUNTOS[conjunto]
+    borradas = 0
+    for inicio in range(0, len(ids), tamano_lote):
+        lote = {'ids': ids[inicio:inicio + tamano_lote]}
+        with obtener_engine().begin() as conn:
+            if conjunto == 'movimientos_inventario':
+                # Igual que la compactación: stock_en_fecha sigue pudiendo reconstruir el pasado
+                conn.execute(text(f"""
+                    INSERT INTO resumen_movimientos_archivados
+                        (periodo, producto_id, sucursal_id, tipo, cantidad_neta, movimientos,
+                         fecha_desde, fecha_hasta, ultimo_movimiento_id, fecha_compactacion)
+                    SELECT date_trunc('month', fecha)::date, producto_id, sucursal_id, tipo,
+                           SUM({_CANTIDAD_CON_SIGNO}), COUNT(*), MIN(fecha), MAX(fecha), MAX(id), NOW()
+                    FROM movimientos_inventario
+                    WHERE id = ANY(:ids)
+                    GROUP BY 1, 2, 3, 4
+                """), lote)
+            elif conjunto == 'pedidos':
+                # analitica_clientes.py suma estos totales a los pedidos vivos de cada cliente
+                conn.execute(text("""
+                    INSERT INTO resumen_pedidos_archivados
+                        (periodo, cliente_id, pedidos, monto, primer_pedido, ultimo_pedido, fecha_archivado)
+                    SELECT date_trunc('month', fecha)::date, cliente_id, COUNT(*), SUM(total), MIN(fecha), MAX(fecha), NOW()
+                    FROM pedidos
+                    WHERE id = ANY(:ids) AND estado <> 'cancelado'
+                    GROUP BY 1, 2
+                    ON CONFLICT (periodo, cliente_id) DO UPDATE
+                    SET pedidos = resumen_pedidos_archivados.pedidos + EXCLUDED.pedidos,
+                        monto = resumen_pedidos_archivados.monto + EXCLUDED.monto,
+                        primer_pedido = LEAST(resumen_pedidos_archivados.primer_pedido, EXCLUDED.primer_pedido),
+                        ultimo_pedido = GREATEST(resumen_pedidos_archivados.ultimo_pedido, EXCLUDED.ultimo_pedido),
+                        fecha_archivado = EXCLUDED.fecha_archivado
+                """), lote)
+            if definicion['detalle']:
+                conn.execute(text(f"DELETE FROM {definicion['detalle']} WHERE {definicion['clave_detalle']} = ANY(:ids)"), lote)
+            borradas += conn.execute(text(f"DELETE FROM {definicion['tabla']} WHERE id = ANY(:ids)"), lote).rowcount
+        time.sleep(PAUSA_ENTRE_LOTES)
+    return borradas
+
+def _rollup_cubre_mes(mes):
+    """True si ventas_diarias_agg tiene todos los días con ventas del mes."""
+    with obtener_engine().connect() as conn:
+        faltantes = conn.execute(text("""
+            SELECT COUNT(*) FROM (
+                SELECT DISTINCT fecha::date AS dia FROM ventas WHERE fecha >= :desde AND fecha < :hasta
+                EXCEPT
+                SELECT DISTINCT dia FROM ventas_diarias_agg WHERE dia >= :desde AND dia < :hasta
+            ) s
+        """), {'desde': mes, 'hasta': _siguiente_mes(mes)}).scalar()
+    return faltantes == 0
+
+def archivar(conjunto, horizonte_meses=HORIZONTE_MESES, tamano_lote=TAMANO_LOTE_BORRADO, forzar=False):
+    """
+    Archiva y borra los meses completos anteriores al horizonte. Retorna la cantidad de
+    cabeceras borradas de PostgreSQL, o None si hubo un error.
+    """
+    definicion = CONJUNTOS[conjunto]
+    hoy = date.today()
+    indice_corte = hoy.year * 12 + hoy.month - 1 - horizonte_meses
+    corte = date(indice_corte // 12, indice_corte % 12 + 1, 1)
+    try:
+        _limpiar_temporales()
+        manifiesto = leer_manifiesto()
+        meses_conjunto = manifiesto.setdefault(conjunto, {})
+        total = 0
+
+        # Borrados pendientes de una ejecución interrumpida
+        for clave, registro in sorted(meses_conjunto.items()):
+            if registro['estado'] == 'escrito':
+                print(f"  Retomando borrado de {conjunto} {clave}...")
+                total += _borrar(conjunto, _ids_archivados(registro['archivos'], definicion['tabla']), tamano_lote)
+                registro['estado'] = 'borrado'
+                _guardar_manifiesto(manifiesto)
+
+        with obtener_engine().connect() as conn:
+            meses = [fila[0].date() for fila in conn.execute(text(f"""
+                SELECT DISTINCT date_trunc('month', fecha) FROM {definicion['tabla']} WHERE fecha < :corte ORDER BY 1
+            """), {'corte': corte})]
+        for mes in meses:
+            if conjunto == 'ventas' and not forzar and not _rollup_cubre_mes(mes):
+                print(f"⚠️ ventas_diarias_agg no cubre {mes:%Y-%m}; se omite (python cubo_ventas.py refrescar, o --forzar).")
+                continue
+            archivos = _escribir_mes(conjunto, mes)
+            if not archivos:
+                continue
+            registro = meses_conjunto.setdefault(f"{mes:%Y-%m}", {'estado': 'borrado', 'archivos': [], 'filas': 0})
+            registro['archivos'] += archivos
+            registro['filas'] += sum(a['filas'] for a in archivos if a['tabla'] == definicion['tabla'])
+            registro['estado'] = 'escrito'
+            _guardar_manifiesto(manifiesto)
+
+            ids = _ids_archivados(archivos, definicion['tabla'])
+            borradas = _borrar(conjunto, ids, tamano_lote)
+            registro['estado'] = 'borrado'
+            _guardar_manifiesto(manifiesto)
+            total += borradas
+            print(f"  {conjunto} {mes:%Y-%m}: {len(ids):,} archivadas, {borradas:,} borradas, {len(archivos)} archivos")
+
+        print(f"✅ Archivo de {conjunto} terminado: {total:,} filas movidas a '{DIRECTORIO_ARCHIVO}' (anteriores al {corte:%Y-%m-%d}).")
+        return total
+    except ImportError:
+        print("❌ El archivo en Parquet requiere pyarrow (pip install pyarrow).")
+        return None
+    except Exception as e:
+        print(f"❌ Error al archivar {conjunto}: {e}")
+        return None
+
+# --- Lectura ---
+
+def _leer(conjunto, tabla, filtro, desde=None, hasta=None, sucursal_id=None):
+    """
+    Filas archivadas de una tabla que cumplen `filtro` (expresión de pyarrow.dataset), como
+    dicts. Solo se leen los archivos del manifiesto (un .parquet huérfano de una ejecución
+    interrumpida no duplica filas), descartando antes por mes y sucursal.
+    """
+    import pyarrow.dataset as ds
+    archivos = [
+        _ruta(archivo['ruta'])
+        for mes, registro in leer_manifiesto().get(conjunto, {}).items()
+        if (desde is None or mes >= f"{desde:%Y-%m}") and (hasta is None or mes <= f"{hasta:%Y-%m}")
+        for archivo in registro['archivos']
+        if archivo['tabla'] == tabla and (sucursal_id is None or archivo['sucursal'] == sucursal_id)
+    ]
+    if not archivos:
+        return []
+    return ds.dataset(archivos, format='parquet').to_table(filter=filtro).to_pylist()
+
+def _nombres(session, columnas, ids):
+    if not ids:
+        return {}
+    return {fila[0]: fila[1:] for fila in session.execute(select(*columnas).where(columnas[0].in_(ids)))}
+
+def _momento(valor):
+    """Fecha u hora como datetime; una fecha vale su medianoche, igual que al compararla en PostgreSQL."""
+    return valor if isinstance(valor, datetime) else datetime.combine(valor, datetime.min.time())
+
+def _rango(ds, desde, hasta):
+    filtro = ds.scalar(True)
+    if desde is not None:
+        filtro &= ds.field('fecha') >= _momento(desde)
+    if hasta is not None:
+        filtro &= ds.field('fecha') <= _momento(hasta)
+    return filtro
+
+def ventas_archivadas(session, start_date=None, end_date=None, empleado_id=None, sucursal_id=None, min_total_venta=None, max_total_venta=None):
+    """Filas de reporte (FilaVenta) de las ventas archivadas que cumplen los mismos filtros que el reporte."""
+    import pyarrow.dataset as ds
+    filtro = _rango(ds, start_date, end_date)
+    if empleado_id:
+        filtro &= ds.field('empleado_id') == empleado_id
+    if min_total_venta is not None:
+        filtro &= ds.field('total') >= min_total_venta
+    if max_total_venta is not None:
+        filtro &= ds.field('total') <= max_total_venta
+    ventas = {v['id']: v for v in _leer('ventas', 'ventas', filtro, start_date, end_date, sucursal_id or None)}
+    if not ventas:
+        return []
+    detalles = _leer('ventas', 'detalle_ventas', ds.field('venta_id').isin(list(ventas)), start_date, end_date, sucursal_id or None)
+
+    empleados = _nombres(session, (Empleado.id, Empleado.nombre, Empleado.apellido), {v['empleado_id'] for v in ventas.values()})
+    productos = _nombres(session, (Producto.id, Producto.nombre), {d['producto_id'] for d in detalles})
+    filas = []
+    for d in sorted(detalles, key=lambda d: d['id']): # Orden de DetalleVenta.id, como el reporte
+        venta = ventas[d['venta_id']]
+        sucursal = cache_referencia.obtener('sucursales', venta['sucursal_id'])
+        empleado, producto = empleados.get(venta['empleado_id']), productos.get(d['producto_id'])
+        if sucursal is None or empleado is None or producto is None:
+            continue # Igual que los JOIN del reporte
+        filas.append(FilaVenta(venta['id'], venta['fecha'], venta['total'], sucursal.nombre, empleado[0], empleado[1],
+                               producto[0], d['cantidad'], d['precio_unitario'], d['subtotal']))
+    return filas
+
+def pedidos_archivados(session, cliente_id=None, empleado_id=None, estado_pedido=None, min_total_pedido=None, max_total_pedido=None, start_date=None, end_date=None):
+    """Filas de reporte (FilaPedido) de los pedidos archivados que cumplen los mismos filtros que el reporte."""
+    import pyarrow.dataset as ds
+    filtro = _rango(ds, start_date, end_date)
+    if cliente_id:
+        filtro &= ds.field('cliente_id') == cliente_id
+    if empleado_id:
+        filtro &= ds.field('empleado_id') == empleado_id
+    if estado_pedido:
+        filtro &= ds.field('estado') == estado_pedido
+    if min_total_pedido is not None:
+        filtro &= ds.field('total') >= min_total_pedido
+    if max_total_pedido is not None:
+        filtro &= ds.field('total') <= max_total_pedido
+    pedidos = _leer('pedidos', 'pedidos', filtro, start_date, end_date)
+    clientes = _nombres(session, (Cliente.id, Cliente.nombre, Cliente.apellido, Cliente.email), {p['cliente_id'] for p in pedidos})
+    empleados = _nombres(session, (Empleado.id, Empleado.nombre, Empleado.apellido), {p['empleado_id'] for p in pedidos})
+    filas = []
+    for p in pedidos:
+        cliente, empleado = clientes.get(p['cliente_id']), empleados.get(p['empleado_id'])
+        if cliente is None or empleado is None:
+            continue
+        filas.append(FilaPedido(p['numero'], p['fecha'], p['total'], p['estado'], cliente[0], cliente[1], cliente[2], empleado[0], empleado[1]))
+    return filas
+
+def combinar(calientes, archivadas, clave, fecha):
+    """
+    Une las filas de PostgreSQL con las archivadas, sin repetir las que estén en ambos lados
+    (un mes escrito cuyo borrado no terminó), en el orden del reporte: fecha descendente y
+    `clave` ascendente. El orden es estable, así que las líneas de una venta siguen por detalle.
+    """
+    vistas = {getattr(fila, clave) for fila in calientes}
+    filas = calientes + [fila for fila in archivadas if getattr(fila, clave) not in vistas]
+    filas.sort(key=lambda fila: getattr(fila, clave))
+    filas.sort(key=lambda fila: getattr(fila, fecha), reverse=True)
+    return filas
+
+# --- Estado ---
+
+def mostrar_estado():
+    manifiesto = leer_manifiesto()
+    if not manifiesto:
+        print(f"No hay datos archivados en '{DIRECTORIO_ARCHIVO}'.")
+        return
+    print(f"{'Conjunto':<24} {'Meses':>6} {'Desde':>8} {'Hasta':>8} {'Filas':>12} {'Archivos':>9} {'MB':>9}  Pendientes")
+    for conjunto, meses in sorted(manifiesto.items()):
+        if not meses:
+            continue
+        archivos = [a for registro in meses.values() for a in registro['archivos']]
+        tamano = sum(os.path.getsize(_ruta(a['ruta'])) for a in archivos if os.path.exists(_ruta(a['ruta'])))
+        pendientes = [mes for mes, registro in meses.items() if registro['estado'] != 'borrado']
+        print(f"{conjunto:<24} {len(meses):>6} {min(meses):>8} {max(meses):>8} {sum(r['filas'] for r in meses.values()):>12,} "
+              f"{len(archivos):>9} {tamano / 1e6:>9.1f}  {', '.join(pendientes) or '-'}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Archivo de ventas, pedidos y movimientos antiguos en Parquet.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    archivado = subparsers.add_parser('archivar', help="Mueve a Parquet los meses anteriores al horizonte.")
+    archivado.add_argument('--conjunto', choices=list(CONJUNTOS) + ['todos'], default='todos')
+    archivado.add_argument('--horizonte-meses', dest='horizonte_meses', type=int, default=HORIZONTE_MESES, help="Meses que se conservan en PostgreSQL.")
+    archivado.add_argument('--lote', type=int, default=TAMANO_LOTE_BORRADO, help="Filas borradas por transacción.")
+    archivado.add_argument('--forzar', action='store_true', help="Archiva ventas aunque el rollup diario no cubra el mes.")
+    subparsers.add_parser('estado', help="Resumen de lo archivado.")
+    args = parser.parse_args()
+
+    if args.comando == 'estado':
+        mostrar_estado()
+    else:
+        conjuntos = list(CONJUNTOS) if args.conjunto == 'todos' else [args.conjunto]
+        resultados = [archivar(conjunto, args.horizonte_meses, args.lote, args.forzar) for conjunto in conjuntos]
+        raise SystemExit(0 if all(r is not None for r in resultados) else 1)
@@ -0,0 +1,67 @@
+"""
+Benchmark del tiempo de arranque de los scripts de línea de comandos.
+
+Cada comando se ejecuta en un proceso nuevo (como lo hace cron) varias veces y se
+reportan el mínimo y la mediana del tiempo de pared. No necesita una base de datos:
+mide importaciones y análisis de argumentos, que es lo que pagan las ejecuciones cortas.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.arranque --repeticiones 20
+    python -m benchmarks.arranque --importtime reports   # módulos más lentos de importar
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMANDOS = {
+    'python (vacío)': [sys.executable, '-c', 'pass'],
+    'import database': [sys.executable, '-c', 'import database'],
+    'import reports': [sys.executable, '-c', 'import reports'],
+    'import app': [sys.executable, '-c', 'import app'],
+    'import inserts': [sys.executable, '-c', 'import inserts'],
+    'python -m reports --help': [sys.executable, '-m', 'reports', '--help'],
+}
+
+def medir(comando, repeticiones):
+    """Retorna la lista de tiempos (segundos) de ejecutar el comando en procesos nuevos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run(comando, cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+def mostrar_importtime(modulo, limite=15):
+    """Muestra los módulos con mayor tiempo acumulado de importación (python -X importtime)."""
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        cwd=RAIZ, capture_output=True, text=True, check=True,
+    )
+    filas = []
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith('import time:') or 'cumulative' in linea:
+            continue
+        propio, acumulado, nombre = [parte.strip() for parte in linea[len('import time:'):].split('|')]
+        filas.append((int(acumulado), int(propio), nombre))
+    print(f"\n{'Acumulado (ms)':>15} {'Propio (ms)':>12}  Módulo")
+    for acumulado, propio, nombre in sorted(filas, reverse=True)[:limite]:
+        print(f"{acumulado / 1000:>15.1f} {propio / 1000:>12.1f}  {nombre}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mide el tiempo de arranque de los scripts del proyecto.")
+    parser.add_argument('--repeticiones', type=int, default=10, help="Ejecuciones por comando.")
+    parser.add_argument('--importtime', metavar='MODULO', help="Desglosa el tiempo de importación de un módulo.")
+    args = parser.parse_args()
+
+    if args.importtime:
+        mostrar_importtime(args.importtime)
+    else:
+        print(f"{'Comando':<28} {'Mínimo (ms)':>12} {'Mediana (ms)':>13}")
+        for nombre, comando in COMANDOS.items():
+            tiempos = medir(comando, args.repeticiones)
+            print(f"{nombre:<28} {min(tiempos) * 1000:>12.1f} {statistics.median(tiempos) * 1000:>13.1f}")
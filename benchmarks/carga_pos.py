@@ -0,0 +1,378 @@
+"""
+Generador de carga de punto de venta contra una base PostgreSQL local.
+
+Simula N terminales por sucursal, cada una en su propio hilo y conexión, que registran
+ventas (venta + detalles), pedidos (pedido + detalles) y compras (compra + detalles) según
+una mezcla configurable y con un tiempo de espera entre operaciones. Los detalles disparan
+los triggers de queries.py (movimientos, inventario, stock, alertas y totales), así que la
+carga mide el esquema completo.
+
+Al terminar reporta:
+  * transacciones por segundo sostenidas (total y por intervalo),
+  * latencias por operación y por sentencia (percentiles e histograma),
+  * deadlocks, reintentos y errores por código SQLSTATE,
+  * costo de cada función de trigger (diferencia de pg_stat_user_functions; requiere
+    track_functions = 'pl', que se intenta activar por sesión si el usuario es superusuario),
+  * con --diagnosticar-bloqueos, filas en disputa y deadlocks (ver diagnostico_bloqueos.py).
+
+Con --driver psycopg los detalles de cada operación se envían en modo pipeline (executemany
+de psycopg 3), en un solo viaje de ida y vuelta en lugar de uno por línea.
+
+Escribe datos reales: usar una base descartable (por ejemplo la que crea generador.py).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.carga_pos --terminales 4 --duracion 60 --mezcla venta=70,pedido=20,compra=10
+    python -m benchmarks.carga_pos --terminales 8 --pensar 0 --ordenar-lineas
+    python -m benchmarks.carga_pos --terminales 8 --pensar 0 --diagnosticar-bloqueos --bloqueos-out bloqueos.json
+    python -m benchmarks.carga_pos --terminales 4 --driver psycopg
+"""
+import argparse
+import itertools
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import DBAPIError
+
+from database import DATABASE_URL, DB_DRIVER, DRIVERS, codigo_sqlstate, opciones_driver, url_con_driver
+
+MEZCLA_POR_DEFECTO = 'venta=70,pedido=20,compra=10'
+BORDES_HISTOGRAMA_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+CODIGOS_REINTENTABLES = {'40P01': 'deadlock', '40001': 'serialización'}
+
+# Sentencia que dispara cada función de trigger (las de inventario se disparan anidadas
+# desde los detalles de ventas y compras, así que su tiempo ya está incluido en ellos)
+SENTENCIA_DE_TRIGGER = {
+    'record_venta_inventario_movement': 'venta.detalle',
+    'update_pedido_total': 'pedido.detalle',
+    'update_compra_total': 'compra.detalle',
+    'record_compra_inventario_movement': 'compra.detalle',
+    'update_producto_total_stock': '(inventario)',
+    'sync_alerta_stock_inventario': '(inventario)',
+}
+
+# --- Datos de referencia ---
+
+def cargar_datos(engine, max_sucursales=None):
+    """Lee una vez los IDs que usan las terminales. Retorna un dict, o None si falta algo."""
+    with engine.connect() as conn:
+        sucursales = conn.execute(text("SELECT id FROM sucursales ORDER BY id")).scalars().all()
+        datos = {
+            'sucursales': sucursales[:max_sucursales] if max_sucursales else sucursales,
+            'empleados': conn.execute(text("SELECT id FROM empleados WHERE activo")).scalars().all(),
+            'clientes': conn.execute(text("SELECT id FROM clientes WHERE activo")).scalars().all(),
+            'proveedores': conn.execute(text("SELECT id FROM proveedores WHERE activo")).scalars().all(),
+            'precios': dict(conn.execute(text("SELECT id, precio FROM productos WHERE activo")).all()),
+            'con_stock': defaultdict(list),
+            'por_proveedor': defaultdict(list),
+        }
+        for sucursal_id, producto_id in conn.execute(text("SELECT sucursal_id, producto_id FROM inventario WHERE cantidad > 0")):
+            if producto_id in datos['precios']:
+                datos['con_stock'][sucursal_id].append(producto_id)
+        for proveedor_id, producto_id in conn.execute(text("SELECT proveedor_id, producto_id FROM producto_proveedor")):
+            if producto_id in datos['precios']:
+                datos['por_proveedor'][proveedor_id].append(producto_id)
+    faltantes = [clave for clave in ('sucursales', 'empleados', 'clientes', 'proveedores', 'precios') if not datos[clave]]
+    if faltantes:
+        print(f"❌ La base no tiene datos suficientes para la carga (faltan: {', '.join(faltantes)}). Ejecute generador.py primero.")
+        return None
+    datos['productos'] = list(datos['precios'])
+    return datos
+
+# --- Operaciones ---
+
+def _ejecutar(conn, tiempos, clave, sql, parametros):
+    """Ejecuta una sentencia y acumula su duración (ms) bajo `clave`."""
+    inicio = time.perf_counter()
+    resultado = conn.execute(text(sql), parametros)
+    tiempos[clave] = tiempos.get(clave, 0.0) + (time.perf_counter() - inicio) * 1000
+    return resultado
+
+def _lineas(productos, precios, rng, config):
+    """Entre 1 y config.lineas productos distintos con cantidad y precio."""
+    elegidos = rng.sample(productos, min(len(productos), rng.randint(1, config.lineas)))
+    if config.ordenar_lineas:
+        # Mismo orden de bloqueo de filas en todas las terminales: evita ciclos entre transacciones
+        elegidos.sort()
+    lineas = []
+    for producto_id in elegidos:
+        cantidad = rng.randint(1, 3)
+        precio = precios[producto_id]
+        lineas.append({'producto': producto_id, 'cantidad': cantidad, 'precio': precio, 'subtotal': precio * cantidad})
+    return lineas
+
+def _venta(conn, datos, sucursal_id, rng, tiempos, config, numero):
+    lineas = _lineas(datos['con_stock'].get(sucursal_id) or datos['productos'], datos['precios'], rng, config)
+    venta_id = _ejecutar(conn, tiempos, 'venta.cabecera', """
+        INSERT INTO ventas (fecha, total, empleado_id, sucursal_id)
+        VALUES (NOW(), :total, :empleado, :sucursal) RETURNING id
+    """, {'total': sum(linea['subtotal'] for linea in lineas), 'empleado': rng.choice(datos['empleados']), 'sucursal': sucursal_id}).scalar()
+    _ejecutar(conn, tiempos, 'venta.detalle', """
+        INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, precio_unitario, subtotal)
+        VALUES (:venta, :producto, :cantidad, :precio, :subtotal)
+    """, [dict(linea, venta=venta_id) for linea in lineas])
+
+def _pedido(conn, datos, sucursal_id, rng, tiempos, config, numero):
+    lineas = _lineas(datos['productos'], datos['precios'], rng, config)
+    pedido_id = _ejecutar(conn, tiempos, 'pedido.cabecera', """
+        INSERT INTO pedidos (numero, fecha, total, estado, cliente_id, empleado_id)
+        VALUES (:numero, NOW(), 0, 'pendiente', :cliente, :empleado) RETURNING id
+    """, {'numero': f"LP{numero}", 'cliente': rng.choice(datos['clientes']), 'empleado': rng.choice(datos['empleados'])}).scalar()
+    _ejecutar(conn, tiempos, 'pedido.detalle', """
+        INSERT INTO detalle_pedidos (pedido_id, producto_id, cantidad, precio_unitario, subtotal, descuento)
+        VALUES (:pedido, :producto, :cantidad, :precio, :subtotal, 0)
+    """, [dict(linea, pedido=pedido_id) for linea in lineas])
+
+def _compra(conn, datos, sucursal_id, rng, tiempos, config, numero):
+    proveedor_id = rng.choice(datos['proveedores'])
+    lineas = _lineas(datos['por_proveedor'].get(proveedor_id) or datos['productos'], datos['precios'], rng, config)
+    for linea in lineas:
+        linea['cantidad'] *= 10 # Las compras reponen por bulto
+        linea['subtotal'] = linea['precio'] * linea['cantidad']
+    compra_id = _ejecutar(conn, tiempos, 'compra.cabecera', """
+        INSERT INTO compras (numero, fecha, total, estado, proveedor_id, empleado_id)
+        VALUES (:numero, NOW(), 0, 'recibida', :proveedor, :empleado) RETURNING id
+    """, {'numero': f"LC{numero}", 'proveedor': proveedor_id, 'empleado': rng.choice(datos['empleados'])}).scalar()
+    _ejecutar(conn, tiempos, 'compra.detalle', """
+        INSERT INTO detalle_compras (compra_id, producto_id, cantidad, precio_unitario, subtotal)
+        VALUES (:compra, :producto, :cantidad, :precio, :subtotal)
+    """, [dict(linea, compra=compra_id) for linea in lineas])
+
+OPERACIONES = {'venta': _venta, 'pedido': _pedido, 'compra': _compra}
+
+# --- Métricas ---
+
+class Metricas:
+    """Acumuladores compartidos por las terminales (protegidos por un lock)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias = defaultdict(list) # operación -> ms de la transacción completa
+        self.sentencias = defaultdict(list) # 'venta.detalle', 'commit', ... -> ms
+        self.errores = Counter() # (operación, código) -> cantidad
+        self.reintentos = Counter() # operación -> cantidad
+        self.deadlocks = 0
+        self.confirmadas_intervalo = 0
+
+    def confirmada(self, operacion, duracion_ms, tiempos):
+        with self.lock:
+            self.latencias[operacion].append(duracion_ms)
+            for clave, ms in tiempos.items():
+                self.sentencias[clave].append(ms)
+            self.confirmadas_intervalo += 1
+
+    def fallida(self, operacion, codigo, reintento):
+        with self.lock:
+            if codigo == '40P01':
+                self.deadlocks += 1
+            if reintento:
+                self.reintentos[operacion] += 1
+            else:
+                self.errores[(operacion, codigo)] += 1
+
+    def tomar_intervalo(self):
+        with self.lock:
+            confirmadas, self.confirmadas_intervalo = self.confirmadas_intervalo, 0
+        return confirmadas
+
+def terminal(engine, datos, sucursal_id, indice, config, metricas, detener, midiendo):
+    """Bucle de una terminal: elige operación, la ejecuta en una transacción y espera."""
+    rng = random.Random(config.semilla * 1000 + indice)
+    operaciones, pesos = zip(*config.mezcla.items())
+    prefijo = f"{config.corrida}{indice:03d}"
+    contador = itertools.count(1)
+    with engine.connect() as conn:
+        while not detener.is_set():
+            operacion = rng.choices(operaciones, pesos)[0]
+            numero = f"{prefijo}{next(contador):08d}"
+            for intento in range(config.reintentos + 1):
+                tiempos = {}
+                inicio = time.perf_counter()
+                try:
+                    transaccion = conn.begin()
+                    OPERACIONES[operacion](conn, datos, sucursal_id, rng, tiempos, config, numero)
+                    inicio_commit = time.perf_counter()
+                    transaccion.commit()
+                    tiempos['commit'] = (time.perf_counter() - inicio_commit) * 1000
+                    if midiendo.is_set():
+                        metricas.confirmada(operacion, (time.perf_counter() - inicio) * 1000, tiempos)
+                    break
+                except DBAPIError as e:
+                    transaccion.rollback()
+                    codigo = codigo_sqlstate(e.orig) or type(e.orig).__name__
+                    reintentar = codigo in CODIGOS_REINTENTABLES and intento < config.reintentos
+                    if midiendo.is_set():
+                        metricas.fallida(operacion, codigo, reintentar)
+                    if not reintentar:
+                        break
+                    time.sleep(rng.uniform(0, 0.005 * 2 ** intento)) # Retroceso exponencial con jitter
+            if config.pensar_ms:
+                detener.wait(rng.expovariate(1000 / config.pensar_ms))
+
+# --- Estadísticas de triggers ---
+
+def _activar_track_functions(engine):
+    """Pide track_functions = 'pl' en cada conexión nueva. Retorna False si no está permitido."""
+    with engine.connect() as conn:
+        if conn.execute(text("SHOW track_functions")).scalar() != 'none':
+            return True
+        try:
+            conn.execute(text("SET track_functions = 'pl'"))
+        except DBAPIError:
+            return False
+
+    @event.listens_for(engine, 'connect')
+    def _configurar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SET track_functions = 'pl'")
+        cursor.close()
+    return True
+
+def estadisticas_funciones(engine):
+    """{función: (llamadas, tiempo total ms, tiempo propio ms)} de pg_stat_user_functions."""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_stat_clear_snapshot()"))
+        return {
+            nombre: (llamadas, total, propio)
+            for nombre, llamadas, total, propio in conn.execute(text(
+                "SELECT funcname, calls, total_time, self_time FROM pg_stat_user_functions"))
+        }
+
+# --- Reporte ---
+
+def _percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+def _histograma(valores, ancho=40):
+    conteos = Counter()
+    for valor in valores:
+        conteos[next((borde for borde in BORDES_HISTOGRAMA_MS if valor < borde), None)] += 1
+    maximo = max(conteos.values())
+    for borde in (*BORDES_HISTOGRAMA_MS, None):
+        etiqueta = f"< {borde} ms" if borde else f">= {BORDES_HISTOGRAMA_MS[-1]} ms"
+        cantidad = conteos.get(borde, 0)
+        print(f"    {etiqueta:>11} {cantidad:>8} {'#' * round(ancho * cantidad / maximo)}")
+
+def mostrar_reporte(metricas, segundos, tps_intervalos, funciones_antes, funciones_despues):
+    total = sum(len(valores) for valores in metricas.latencias.values())
+    print(f"\n=== Resultado: {total} transacciones en {segundos:.0f} s = {total / segundos:.1f} TPS ===")
+    if tps_intervalos:
+        print(f"TPS por intervalo: mín {min(tps_intervalos):.1f} | mediana {statistics.median(tps_intervalos):.1f} | máx {max(tps_intervalos):.1f}")
+
+    print(f"\n{'Operación':<18} {'Confirmadas':>11} {'TPS':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'máx':>8}  (ms)")
+    for operacion, valores in sorted(metricas.latencias.items()):
+        ordenados = sorted(valores)
+        print(f"{operacion:<18} {len(ordenados):>11} {len(ordenados) / segundos:>8.1f} {_percentil(ordenados, 0.5):>8.2f} "
+              f"{_percentil(ordenados, 0.95):>8.2f} {_percentil(ordenados, 0.99):>8.2f} {ordenados[-1]:>8.2f}")
+    for operacion, valores in sorted(metricas.latencias.items()):
+        print(f"\n  Histograma de latencia: {operacion}")
+        _histograma(valores)
+
+    print(f"\n{'Sentencia':<18} {'Ejecuciones':>11} {'media':>8} {'p95':>8} {'total s':>8}")
+    for clave, valores in sorted(metricas.sentencias.items()):
+        ordenados = sorted(valores)
+        print(f"{clave:<18} {len(ordenados):>11} {statistics.fmean(ordenados):>8.2f} {_percentil(ordenados, 0.95):>8.2f} {sum(ordenados) / 1000:>8.1f}")
+
+    if funciones_despues is not None:
+        print(f"\n{'Función de trigger':<36} {'Llamadas':>9} {'total ms':>10} {'propio ms':>10} {'ms/llamada':>10} {'% sentencia':>11}")
+        for nombre in sorted(funciones_despues, key=lambda n: -funciones_despues[n][1]):
+            llamadas, total_ms, propio_ms = (a - b for a, b in zip(funciones_despues[nombre], funciones_antes.get(nombre, (0, 0, 0))))
+            if llamadas <= 0:
+                continue
+            sentencia = SENTENCIA_DE_TRIGGER.get(nombre)
+            tiempo_sentencia = sum(metricas.sentencias.get(sentencia, []))
+            proporcion = f"{100 * total_ms / tiempo_sentencia:>10.0f}%" if tiempo_sentencia else f"{sentencia or '':>11}"
+            print(f"{nombre[:36]:<36} {llamadas:>9} {total_ms:>10.0f} {propio_ms:>10.0f} {total_ms / llamadas:>10.3f} {proporcion}")
+    else:
+        print("\n⚠️ Sin estadísticas de triggers: active track_functions = 'pl' en postgresql.conf o use un superusuario.")
+
+    print(f"\nDeadlocks: {metricas.deadlocks} | Reintentos: {sum(metricas.reintentos.values())} "
+          f"({', '.join(f'{op}: {n}' for op, n in sorted(metricas.reintentos.items())) or 'ninguno'})")
+    if metricas.errores:
+        print("Errores (sin reintento):")
+        for (operacion, codigo), cantidad in metricas.errores.most_common():
+            print(f"    {operacion:<10} {codigo:<24} {cantidad}")
+
+def _mezcla(valor):
+    mezcla = {}
+    for parte in valor.split(','):
+        operacion, _, peso = parte.partition('=')
+        if operacion.strip() not in OPERACIONES:
+            raise argparse.ArgumentTypeError(f"operación desconocida: {operacion} (use {', '.join(OPERACIONES)})")
+        mezcla[operacion.strip()] = float(peso)
+    return mezcla
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Carga sintética de punto de venta contra PostgreSQL.")
+    parser.add_argument('--terminales', type=int, default=2, help="Terminales concurrentes por sucursal.")
+    parser.add_argument('--sucursales', type=int, help="Usa solo las primeras N sucursales.")
+    parser.add_argument('--duracion', type=float, default=60, help="Segundos de medición.")
+    parser.add_argument('--calentamiento', type=float, default=5, help="Segundos iniciales que no se miden.")
+    parser.add_argument('--mezcla', type=_mezcla, default=_mezcla(MEZCLA_POR_DEFECTO), metavar='OP=PESO,...')
+    parser.add_argument('--pensar', dest='pensar_ms', type=float, default=200, help="Espera media entre operaciones (ms, exponencial).")
+    parser.add_argument('--lineas', type=int, default=5, help="Máximo de líneas por venta, pedido o compra.")
+    parser.add_argument('--ordenar-lineas', dest='ordenar_lineas', action='store_true', help="Ordena las líneas por producto (menos deadlocks).")
+    parser.add_argument('--reintentos', type=int, default=3, help="Reintentos ante deadlock o error de serialización.")
+    parser.add_argument('--intervalo', type=float, default=5, help="Segundos entre reportes de progreso.")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--driver', choices=DRIVERS, default=DB_DRIVER, help="Driver de PostgreSQL (por defecto DB_DRIVER).")
+    parser.add_argument('--diagnosticar-bloqueos', dest='diagnosticar', action='store_true', help="Muestrea esperas por bloqueo durante la medición.")
+    parser.add_argument('--bloqueos-out', dest='bloqueos_out', metavar='ARCHIVO.json', help="Guarda el diagnóstico de bloqueos.")
+    config = parser.parse_args()
+    config.corrida = uuid.uuid4().hex[:4].upper() # Prefijo de los números de pedido/compra de esta corrida
+
+    url = url_con_driver(DATABASE_URL, config.driver)
+    engine_referencia = create_engine(url, **opciones_driver(config.driver))
+    datos = cargar_datos(engine_referencia, config.sucursales)
+    if datos is None:
+        raise SystemExit(1)
+    cantidad = config.terminales * len(datos['sucursales'])
+    engine = create_engine(url, pool_size=cantidad, max_overflow=0, **opciones_driver(config.driver))
+    con_funciones = _activar_track_functions(engine)
+
+    metricas = Metricas()
+    detener, midiendo = threading.Event(), threading.Event()
+    hilos = [
+        threading.Thread(target=terminal, args=(engine, datos, sucursal_id, i * config.terminales + t, config, metricas, detener, midiendo), daemon=True)
+        for i, sucursal_id in enumerate(datos['sucursales']) for t in range(config.terminales)
+    ]
+    print(f"Iniciando {cantidad} terminales en {len(datos['sucursales'])} sucursales "
+          f"(mezcla {config.mezcla}, espera media {config.pensar_ms:.0f} ms)...")
+    for hilo in hilos:
+        hilo.start()
+
+    time.sleep(config.calentamiento)
+    funciones_antes = estadisticas_funciones(engine_referencia) if con_funciones else None
+    diagnostico = None
+    if config.diagnosticar:
+        from diagnostico_bloqueos import DiagnosticoBloqueos
+        diagnostico = DiagnosticoBloqueos(engine=engine_referencia).iniciar()
+    midiendo.set()
+    inicio = time.perf_counter()
+    tps_intervalos = []
+    ultimo = inicio
+    while (transcurrido := time.perf_counter() - inicio) < config.duracion:
+        time.sleep(min(config.intervalo, config.duracion - transcurrido))
+        ahora = time.perf_counter()
+        tps_intervalos.append(metricas.tomar_intervalo() / (ahora - ultimo))
+        ultimo = ahora
+        print(f"  [{time.perf_counter() - inicio:>5.0f} s] {tps_intervalos[-1]:.1f} TPS | deadlocks {metricas.deadlocks}")
+    segundos = time.perf_counter() - inicio
+    midiendo.clear()
+    if diagnostico:
+        diagnostico.detener()
+    detener.set()
+    for hilo in hilos:
+        hilo.join()
+
+    time.sleep(1) # Las estadísticas de funciones se publican al terminar cada transacción
+    funciones_despues = estadisticas_funciones(engine_referencia) if con_funciones else None
+    mostrar_reporte(metricas, segundos, tps_intervalos, funciones_antes or {}, funciones_despues)
+    if diagnostico:
+        diagnostico.mostrar()
+        if config.bloqueos_out:
+            diagnostico.guardar(config.bloqueos_out)
@@ -0,0 +1,147 @@
+"""
+Benchmark de psycopg2 contra psycopg 3 (DB_DRIVER) en las mismas cargas de escritura.
+
+Cada driver corre en su propio proceso (DB_DRIVER=psycopg2 / DB_DRIVER=psycopg) y ejecuta,
+en este orden y sobre los mismos datos:
+
+  * siembra: generador.py inserta el dataset de la semilla y escala indicadas
+    (executemany con psycopg2, COPY binario con psycopg 3),
+  * importacion: importacion.py carga un CSV de productos (upsert por lotes),
+  * pos: transacciones de venta secuenciales de benchmarks/carga_pos.py en una conexión
+    (cabecera + detalles; los detalles van en pipeline con psycopg 3).
+
+Los viajes de ida y vuelta dominan cuando el servidor está lejos: para reproducir la
+latencia entre centros de datos apunte DATABASE_URL a un servidor remoto (o agregue
+retardo con tc netem). Borra y vuelve a cargar los datos: usar una base descartable.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.drivers --escala 0.5 --productos 20000 --ventas 500
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PREFIJO_RESULTADO = 'RESULTADO '
+
+def _siembra(config):
+    from generador import construir_dataset, insertar_dataset
+    from inserts import limpiar_datos
+    dataset = construir_dataset(config.semilla, config.escala)
+    limpiar_datos()
+    inicio = time.perf_counter()
+    if not insertar_dataset(dataset):
+        raise RuntimeError("falló la inserción del dataset")
+    return {'segundos': time.perf_counter() - inicio, 'filas': sum(len(filas) for filas in dataset.values())}
+
+def _importacion(config):
+    from importacion import importar
+    from inserts import NOMBRES_CATEGORIAS
+    rng = random.Random(config.semilla)
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8', delete=False) as archivo:
+        writer = csv.writer(archivo)
+        writer.writerow(['codigo', 'nombre', 'precio', 'stock', 'stock_minimo', 'categoria'])
+        for i in range(config.productos):
+            writer.writerow([f"BENCH{i:07d}", f"Producto de prueba {i}", f"{rng.uniform(1, 500):.2f}",
+                             rng.randint(0, 200), rng.randint(1, 20), rng.choice(NOMBRES_CATEGORIAS)])
+    try:
+        inicio = time.perf_counter()
+        resumen = importar('productos', archivo.name)
+        if resumen is None:
+            raise RuntimeError("falló la importación")
+        return {'segundos': time.perf_counter() - inicio, 'filas': resumen['importadas']}
+    finally:
+        os.remove(archivo.name)
+
+def _pos(config):
+    from benchmarks.carga_pos import cargar_datos, _venta
+    from database import obtener_engine
+    engine = obtener_engine()
+    datos = cargar_datos(engine)
+    if datos is None:
+        raise RuntimeError("faltan datos de referencia")
+    rng = random.Random(config.semilla)
+    opciones = argparse.Namespace(lineas=config.lineas, ordenar_lineas=True)
+    latencias = []
+    with engine.connect() as conn:
+        for numero in range(config.ventas):
+            inicio = time.perf_counter()
+            with conn.begin():
+                _venta(conn, datos, rng.choice(datos['sucursales']), rng, {}, opciones, numero)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+    latencias.sort()
+    return {'segundos': sum(latencias) / 1000, 'filas': config.ventas,
+            'p50_ms': statistics.median(latencias), 'p95_ms': latencias[int(len(latencias) * 0.95) - 1]}
+
+CARGAS = {'siembra': _siembra, 'importacion': _importacion, 'pos': _pos}
+
+def ejecutar_hijo(config):
+    """Corre las cargas con el driver de DB_DRIVER e imprime el resultado como JSON."""
+    resultados = {}
+    for nombre in config.cargas:
+        try:
+            resultados[nombre] = CARGAS[nombre](config)
+        except Exception as e:
+            print(f"❌ Error en la carga {nombre}: {e}")
+            resultados[nombre] = None
+    print(PREFIJO_RESULTADO + json.dumps(resultados))
+
+def medir_driver(driver, argv):
+    """Ejecuta las cargas en un proceso nuevo con DB_DRIVER=driver. Retorna {carga: resultado}."""
+    entorno = dict(os.environ, DB_DRIVER=driver)
+    proceso = subprocess.run([sys.executable, '-m', 'benchmarks.drivers', '--hijo', *argv],
+                             cwd=RAIZ, env=entorno, capture_output=True, text=True)
+    for linea in proceso.stdout.splitlines():
+        if linea.startswith(PREFIJO_RESULTADO):
+            return json.loads(linea[len(PREFIJO_RESULTADO):])
+        if linea.startswith('❌'):
+            print(f"  [{driver}] {linea}")
+    print(f"❌ El proceso de {driver} terminó sin resultado (código {proceso.returncode}):\n{proceso.stderr[-2000:]}")
+    return {}
+
+def mostrar(resultados, cargas):
+    print(f"\n{'Carga':<12} {'Driver':<10} {'Filas':>10} {'Segundos':>10} {'Filas/s':>12} {'p50 ms':>8} {'p95 ms':>8}")
+    print("-" * 76)
+    for carga in cargas:
+        for driver, por_carga in resultados.items():
+            r = por_carga.get(carga)
+            if not r:
+                print(f"{carga:<12} {driver:<10} {'error':>10}")
+                continue
+            print(f"{carga:<12} {driver:<10} {r['filas']:>10} {r['segundos']:>10.2f} {r['filas'] / r['segundos']:>12.0f}"
+                  f" {r.get('p50_ms', 0):>8.1f} {r.get('p95_ms', 0):>8.1f}")
+        base, nuevo = (resultados.get(d, {}).get(carga) for d in ('psycopg2', 'psycopg'))
+        if base and nuevo:
+            print(f"{'':<12} {'psycopg 3 es ' + format(base['segundos'] / nuevo['segundos'], '.2f') + 'x':<30}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compara psycopg2 y psycopg 3 en las cargas de escritura.")
+    parser.add_argument('--cargas', type=lambda v: v.split(','), default=list(CARGAS), metavar='siembra,importacion,pos')
+    parser.add_argument('--escala', type=float, default=0.5, help="Escala del dataset de la siembra (generador.py).")
+    parser.add_argument('--productos', type=int, default=20000, help="Filas del CSV importado.")
+    parser.add_argument('--ventas', type=int, default=500, help="Transacciones de venta secuenciales.")
+    parser.add_argument('--lineas', type=int, default=5, help="Máximo de líneas por venta.")
+    parser.add_argument('--semilla', type=int, default=2025)
+    parser.add_argument('--hijo', action='store_true', help=argparse.SUPPRESS)
+    config = parser.parse_args()
+
+    desconocidas = set(config.cargas) - set(CARGAS)
+    if desconocidas:
+        parser.error(f"cargas desconocidas: {', '.join(sorted(desconocidas))}")
+    if config.hijo:
+        ejecutar_hijo(config)
+        raise SystemExit(0)
+
+    argv = [a for a in sys.argv[1:] if a != '--hijo']
+    resultados = {}
+    for driver in ('psycopg2', 'psycopg'):
+        print(f"Midiendo {driver}...")
+        resultados[driver] = medir_driver(driver, argv)
+    mostrar(resultados, config.cargas)
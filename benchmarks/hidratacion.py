@@ -0,0 +1,87 @@
+"""
+Benchmark de hidratación de filas: instancias ORM vs. Row de SQLAlchemy vs. filas con __slots__.
+
+Usa una base SQLite en memoria con una tabla que imita vista_productos_detalle, así que
+no necesita PostgreSQL. Para cada estrategia mide el mejor tiempo de varias corridas y,
+con tracemalloc, la memoria que retiene el resultado y el pico durante la carga.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.hidratacion --filas 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from decimal import Decimal
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from database import BaseView, VistaProductoDetalle
+from filas import FilaProducto, consulta_vista, leer_filas
+
+def preparar_base(cantidad):
+    """Crea la tabla en SQLite y la llena con `cantidad` productos."""
+    engine = create_engine('sqlite://')
+    BaseView.metadata.create_all(engine, tables=[VistaProductoDetalle.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(VistaProductoDetalle.__table__), [
+            {
+                'id': i, 'codigo': f'PROD{i:06d}', 'nombre_producto': f'Producto {i}',
+                'precio': Decimal(i % 1000) + Decimal('0.99'), 'stock': i % 500,
+                'stock_minimo': 5, 'nombre_categoria': f'Categoría {i % 20}',
+            }
+            for i in range(1, cantidad + 1)
+        ])
+    return engine
+
+def _orm(session):
+    return session.query(VistaProductoDetalle).all()
+
+def _rows(session):
+    tabla = VistaProductoDetalle.__table__
+    columnas = [tabla.c[nombre] for nombre in ('id', 'codigo', 'nombre_producto', 'nombre_categoria', 'precio', 'stock', 'stock_minimo')]
+    return session.execute(select(*columnas).order_by(tabla.c.id)).all()
+
+def _slots(session):
+    return leer_filas(session, consulta_vista(FilaProducto), FilaProducto)
+
+ESTRATEGIAS = {
+    'ORM (Vista*)': _orm,
+    'Row de SQLAlchemy': _rows,
+    'Dataclass con __slots__': _slots,
+}
+
+def medir(engine, funcion, repeticiones):
+    """Retorna (mejor tiempo en s, memoria retenida en bytes, pico en bytes)."""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        with Session(engine) as session:
+            gc.collect()
+            inicio = time.perf_counter()
+            resultado = funcion(session)
+            mejor = min(mejor, time.perf_counter() - inicio)
+            del resultado
+
+    # La memoria se mide en una corrida aparte: tracemalloc hace todo más lento
+    with Session(engine) as session:
+        gc.collect()
+        tracemalloc.start()
+        resultado = funcion(session)
+        retenida, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del resultado
+    return mejor, retenida, pico
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compara el costo de hidratar filas de un listado.")
+    parser.add_argument('--filas', type=int, default=100000, help="Filas del listado.")
+    parser.add_argument('--repeticiones', type=int, default=5, help="Corridas por estrategia (se toma la mejor).")
+    args = parser.parse_args()
+
+    engine = preparar_base(args.filas)
+    print(f"{args.filas} filas\n")
+    print(f"{'Estrategia':<26} {'Tiempo (ms)':>12} {'Memoria (MB)':>13} {'Bytes/fila':>11} {'Pico (MB)':>10}")
+    for nombre, funcion in ESTRATEGIAS.items():
+        tiempo, retenida, pico = medir(engine, funcion, args.repeticiones)
+        print(f"{nombre:<26} {tiempo * 1000:>12.1f} {retenida / 2**20:>13.1f} {retenida / args.filas:>11.0f} {pico / 2**20:>10.1f}")
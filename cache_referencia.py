@@ -0,0 +1,151 @@
+"""
+Caché en memoria, compartida por todo el proceso, de los datos de referencia:
+categorías, puestos, sucursales y departamentos.
+
+Son tablas pequeñas que casi nunca cambian, así que se cargan completas con una
+sola consulta (UNION ALL) y se indexan por ID y por nombre para búsquedas O(1).
+La caché se recarga cuando vence su TTL o cuando cambia su versión, que se
+incrementa automáticamente al confirmar (commit) una sesión del ORM que haya
+escrito en alguna de esas tablas, o cuando otro proceso escribe en ellas
+(LISTEN/NOTIFY, ver notificaciones.py). La escucha la inician solo los procesos de larga
+duración (los menús de app.py y reports.py); en una ejecución corta alcanza con el TTL.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session as OrmSession
+
+import notificaciones
+from database import obtener_session, Categoria, Puesto, Sucursal, Departamento
+
+TTL_SEGUNDOS = 300 # Tiempo máximo antes de recargar aunque nadie haya invalidado la caché
+
+# Tablas cacheadas, indexadas por modelo ORM
+TABLAS_CACHEADAS = {
+    Categoria: 'categorias',
+    Puesto: 'puestos',
+    Sucursal: 'sucursales',
+    Departamento: 'departamentos',
+}
+
+# Fila de referencia inmutable; salario_minimo/maximo solo aplican a puestos
+Referencia = namedtuple('Referencia', ['id', 'nombre', 'activo', 'salario_minimo', 'salario_maximo'])
+
+_CONSULTA_CARGA = text("""
+    SELECT 'categorias' AS tabla, id, nombre, activa AS activo,
+           NULL::numeric AS salario_minimo, NULL::numeric AS salario_maximo
+    FROM categorias
+    UNION ALL
+    SELECT 'puestos', id, nombre, activo, salario_minimo, salario_maximo FROM puestos
+    UNION ALL
+    SELECT 'sucursales', id, nombre, activa, NULL, NULL FROM sucursales
+    UNION ALL
+    SELECT 'departamentos', id, nombre, activo, NULL, NULL FROM departamentos
+    ORDER BY 1, 2
+""")
+
+class CacheReferencia:
+    """Caché versionada con TTL de las tablas de referencia."""
+
+    def __init__(self, ttl=TTL_SEGUNDOS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = 0
+        self._version_cargada = -1
+        self._cargado_en = 0.0
+        self._por_id = {}
+        self._por_nombre = {}
+
+    def invalidar(self):
+        """Incrementa la versión: la próxima lectura recargará los datos."""
+        with self._lock:
+            self._version += 1
+
+    def _asegurar_cargada(self):
+        with self._lock:
+            if self._version_cargada == self._version and time.monotonic() - self._cargado_en < self.ttl:
+                return
+            version = self._version
+
+        # Si alguien invalida mientras se carga, la versión no coincidirá y se volverá a cargar
+        por_id = {tabla: {} for tabla in TABLAS_CACHEADAS.values()}
+        por_nombre = {tabla: {} for tabla in TABLAS_CACHEADAS.values()}
+        session = obtener_session()
+        try:
+            for fila in session.execute(_CONSULTA_CARGA):
+                referencia = Referencia(fila.id, fila.nombre, fila.activo, fila.salario_minimo, fila.salario_maximo)
+                por_id[fila.tabla][fila.id] = referencia
+                por_nombre[fila.tabla][fila.nombre.strip().lower()] = referencia
+        finally:
+            session.close()
+
+        with self._lock:
+            self._por_id, self._por_nombre = por_id, por_nombre
+            self._version_cargada = version
+            self._cargado_en = time.monotonic()
+
+    def obtener(self, tabla, id_):
+        """Retorna la Referencia con ese ID, o None si no existe."""
+        self._asegurar_cargada()
+        return self._por_id[tabla].get(id_)
+
+    def buscar_por_nombre(self, tabla, nombre):
+        """Retorna la Referencia con ese nombre (sin distinguir mayúsculas), o None."""
+        self._asegurar_cargada()
+        return self._por_nombre[tabla].get(nombre.strip().lower())
+
+    def listar(self, tabla):
+        """Retorna todas las referencias de la tabla ordenadas por ID."""
+        self._asegurar_cargada()
+        return list(self._por_id[tabla].values())
+
+# Instancia única para todo el proceso
+cache = CacheReferencia()
+
+def obtener(tabla, id_):
+    return cache.obtener(tabla, id_)
+
+def buscar_por_nombre(tabla, nombre):
+    return cache.buscar_por_nombre(tabla, nombre)
+
+def listar(tabla):
+    return cache.listar(tabla)
+
+def invalidar():
+    cache.invalidar()
+
+# --- Invalidación automática en escrituras a través del ORM ---
+
+_CLAVE_SESION = 'cache_referencia_modificada'
+_NOMBRES_TABLAS = set(TABLAS_CACHEADAS.values())
+
+@event.listens_for(OrmSession, 'after_flush')
+def _detectar_cambios_flush(session, flush_context):
+    # En after_flush las colecciones new/dirty/deleted aún reflejan lo que se escribió
+    for objeto in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(objeto, tuple(TABLAS_CACHEADAS)):
+            session.info[_CLAVE_SESION] = True
+            return
+
+@event.listens_for(OrmSession, 'do_orm_execute')
+def _detectar_cambios_dml(orm_execute_state):
+    # INSERT/UPDATE/DELETE masivos ejecutados con session.execute()
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        tabla = getattr(orm_execute_state.statement, 'table', None)
+        if tabla is not None and getattr(tabla, 'name', None) in _NOMBRES_TABLAS:
+            orm_execute_state.session.info[_CLAVE_SESION] = True
+
+@event.listens_for(OrmSession, 'after_commit')
+def _invalidar_tras_commit(session):
+    if session.info.pop(_CLAVE_SESION, False):
+        cache.invalidar()
+
+@event.listens_for(OrmSession, 'after_rollback')
+def _descartar_tras_rollback(session):
+    session.info.pop(_CLAVE_SESION, None)
+
+# --- Invalidación por escrituras de otros procesos ---
+
+notificaciones.suscribir(_NOMBRES_TABLAS, lambda cambios: cache.invalidar())
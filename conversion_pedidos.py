@@ -0,0 +1,200 @@
+"""
+Conversión masiva de pedidos en ventas y facturas.
+
+Los pedidos en estado 'procesando' se convierten por lotes, cada uno en su propia
+transacción y con sentencias por conjunto (sin objetos del ORM ni una sentencia por fila):
+
+  1. SELECT ... FOR UPDATE SKIP LOCKED toma los siguientes pedidos por id: varios procesos
+     pueden convertir a la vez sin esperarse ni tomar el mismo pedido.
+  2. INSERT INTO ventas ... SELECT desde pedidos, con pedido_id como clave de idempotencia
+     (ON CONFLICT (pedido_id) DO NOTHING): un pedido nunca genera dos ventas.
+  3. INSERT INTO detalle_ventas ... SELECT desde detalle_pedidos, ordenado por producto para
+     que los triggers de inventario bloqueen las filas de stock siempre en el mismo orden.
+  4. INSERT INTO facturas ... SELECT con el 12% de IVA, idempotente igual que las ventas.
+  5. UPDATE pedidos SET estado = 'completado'.
+
+Si el lote falla (stock insuficiente, un número de factura repetido...), se divide en mitades
+con SAVEPOINTs hasta aislar los pedidos culpables, que quedan en 'procesando' y se informan
+con su SQLSTATE; el resto del lote se confirma. Deadlocks y lock_timeout reintentan el lote
+completo. Las columnas pedido_id las agrega la migración 4 (python migraciones.py aplicar).
+
+Los pedidos no tienen sucursal: las ventas se registran en la sucursal indicada (por defecto
+SUC001, o la primera sucursal), que es la que descuenta el stock.
+
+    python conversion_pedidos.py convertir [--sucursal 2] [--lote 1000] [--limite 50000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from database import codigo_sqlstate, obtener_engine
+
+TAMANO_LOTE = 1000
+REINTENTOS = 5
+ESPERA_MAXIMA_REINTENTO = 2.0
+CODIGOS_REINTENTABLES = {'40P01', '55P03', '40001'} # deadlock, lock_not_available, serialization_failure
+PREFIJO_FACTURA = 'FAC-' # FAC-PED000123: no choca con la numeración FAC000123 de las facturas manuales
+
+_BLOQUEAR = text("""
+    SELECT id FROM pedidos
+    WHERE estado = 'procesando' AND id > :ultimo
+    ORDER BY id
+    LIMIT :limite
+    FOR UPDATE SKIP LOCKED
+""")
+
+# La venta se inserta en su propia sentencia (y no en un CTE con los detalles): el trigger
+# BEFORE INSERT de detalle_ventas busca la sucursal en ventas y no vería filas del mismo CTE.
+_INSERTAR_VENTAS = text("""
+    INSERT INTO ventas (fecha, total, empleado_id, sucursal_id, pedido_id)
+    SELECT :ahora, p.total, p.empleado_id, :sucursal_id, p.id
+    FROM pedidos p
+    WHERE p.id = ANY(:ids)
+    ORDER BY p.id
+    ON CONFLICT (pedido_id) DO NOTHING
+    RETURNING id
+""")
+
+_INSERTAR_DETALLES = text("""
+    INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, precio_unitario, subtotal, sucursal_id)
+    SELECT v.id, dp.producto_id, dp.cantidad, dp.precio_unitario, dp.subtotal, v.sucursal_id
+    FROM ventas v
+    JOIN detalle_pedidos dp ON dp.pedido_id = v.pedido_id
+    WHERE v.id = ANY(:ventas)
+    ORDER BY dp.producto_id, v.id
+""")
+
+_INSERTAR_FACTURAS = text(f"""
+    INSERT INTO facturas (numero, fecha, subtotal, impuesto, total, monto_pagado, estado, cliente_id, pedido_id)
+    SELECT '{PREFIJO_FACTURA}' || p.numero, :ahora, p.total, round(p.total * 0.12, 2),
+           p.total + round(p.total * 0.12, 2), 0, 'pendiente', p.cliente_id, p.id
+    FROM pedidos p
+    WHERE p.id = ANY(:ids)
+    ORDER BY p.id
+    ON CONFLICT (pedido_id) DO NOTHING
+""")
+
+_COMPLETAR = text("""
+    UPDATE pedidos SET estado = 'completado'
+    WHERE id = ANY(:ids) AND estado = 'procesando'
+""")
+
+def sucursal_por_defecto(conn):
+    """SUC001, o la primera sucursal si no existe (igual que la migración 1)."""
+    return conn.execute(text("""
+        SELECT COALESCE(
+            (SELECT id FROM sucursales WHERE codigo = 'SUC001' LIMIT 1),
+            (SELECT id FROM sucursales ORDER BY id LIMIT 1))
+    """)).scalar()
+
+def _convertir(conn, ids, sucursal_id):
+    """Las cuatro sentencias por conjunto sobre pedidos ya bloqueados. Retorna (ventas, facturas)."""
+    parametros = {'ids': ids, 'sucursal_id': sucursal_id, 'ahora': datetime.now()}
+    ventas = conn.execute(_INSERTAR_VENTAS, parametros).scalars().all()
+    if ventas:
+        conn.execute(_INSERTAR_DETALLES, {'ventas': ventas})
+    facturas = conn.execute(_INSERTAR_FACTURAS, parametros).rowcount
+    conn.execute(_COMPLETAR, parametros)
+    return len(ventas), facturas
+
+def _convertir_aislando(conn, ids, sucursal_id, fallidos):
+    """
+    Convierte `ids` dentro de un SAVEPOINT. Si falla, lo divide en mitades hasta aislar los
+    pedidos que no se pueden convertir (se anotan en `fallidos`). Retorna (convertidos, ventas, facturas).
+    """
+    try:
+        with conn.begin_nested():
+            ventas, facturas = _convertir(conn, ids, sucursal_id)
+        return len(ids), ventas, facturas
+    except DBAPIError as e:
+        if codigo_sqlstate(e.orig) in CODIGOS_REINTENTABLES:
+            raise
+        if len(ids) == 1:
+            fallidos[ids[0]] = f"[{codigo_sqlstate(e.orig)}] {str(e.orig).strip().splitlines()[0]}"
+            return 0, 0, 0
+    mitad = len(ids) // 2
+    primera = _convertir_aislando(conn, ids[:mitad], sucursal_id, fallidos)
+    segunda = _convertir_aislando(conn, ids[mitad:], sucursal_id, fallidos)
+    return tuple(a + b for a, b in zip(primera, segunda))
+
+def _convertir_lote(engine, ultimo, tamano_lote, sucursal_id):
+    """
+    Bloquea y convierte el siguiente lote en una transacción, reintentando deadlocks y
+    lock_timeout. Retorna (ids, (convertidos, ventas, facturas), fallidos), o None si no quedan pedidos.
+    """
+    for intento in range(1, REINTENTOS + 1):
+        fallidos = {}
+        try:
+            with engine.begin() as conn:
+                ids = conn.execute(_BLOQUEAR, {'ultimo': ultimo, 'limite': tamano_lote}).scalars().all()
+                if not ids:
+                    return None
+                return ids, _convertir_aislando(conn, ids, sucursal_id, fallidos), fallidos
+        except DBAPIError as e:
+            if codigo_sqlstate(e.orig) not in CODIGOS_REINTENTABLES or intento == REINTENTOS:
+                raise
+            espera = random.uniform(0, min(ESPERA_MAXIMA_REINTENTO, 0.05 * 2 ** intento))
+            print(f"  ⚠️ Lote desde el pedido {ultimo + 1} reintentado ({codigo_sqlstate(e.orig)}), intento {intento}.")
+            time.sleep(espera)
+
+def convertir(sucursal_id=None, tamano_lote=TAMANO_LOTE, limite=None):
+    """
+    Convierte los pedidos en 'procesando' en ventas y facturas. Retorna
+    {'convertidos': n, 'ventas': n, 'facturas': n, 'fallidos': {pedido_id: motivo}, 'segundos': s},
+    o None si hubo un error.
+    """
+    engine = obtener_engine()
+    resumen = {'convertidos': 0, 'ventas': 0, 'facturas': 0, 'fallidos': {}, 'segundos': 0.0}
+    try:
+        if sucursal_id is None:
+            with engine.connect() as conn:
+                sucursal_id = sucursal_por_defecto(conn)
+            if sucursal_id is None:
+                print("❌ No hay sucursales registradas.")
+                return None
+        inicio = time.perf_counter()
+        ultimo = 0
+        while limite is None or resumen['convertidos'] + len(resumen['fallidos']) < limite:
+            restantes = tamano_lote if limite is None else min(tamano_lote, limite - resumen['convertidos'] - len(resumen['fallidos']))
+            lote = _convertir_lote(engine, ultimo, restantes, sucursal_id)
+            if lote is None:
+                break
+            ids, (convertidos, ventas, facturas), fallidos = lote
+            ultimo = ids[-1]
+            resumen['convertidos'] += convertidos
+            resumen['ventas'] += ventas
+            resumen['facturas'] += facturas
+            resumen['fallidos'].update(fallidos)
+            transcurrido = time.perf_counter() - inicio
+            print(f"  ... {resumen['convertidos']:,} pedidos convertidos ({resumen['convertidos'] / transcurrido:,.0f} pedidos/s)")
+        resumen['segundos'] = time.perf_counter() - inicio
+
+        tasa = resumen['convertidos'] / resumen['segundos'] if resumen['segundos'] else 0
+        print(f"✅ {resumen['convertidos']:,} pedidos convertidos: {resumen['ventas']:,} ventas y "
+              f"{resumen['facturas']:,} facturas en {resumen['segundos']:.1f} s ({tasa:,.0f} pedidos/s).")
+        if resumen['fallidos']:
+            print(f"⚠️ {len(resumen['fallidos'])} pedidos quedaron en 'procesando':")
+            for pedido_id, motivo in sorted(resumen['fallidos'].items()):
+                print(f"  Pedido {pedido_id}: {motivo}")
+        return resumen
+    except Exception as e:
+        print(f"❌ Error al convertir pedidos: {e}")
+        return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convierte los pedidos en 'procesando' en ventas y facturas.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    convertir_parser = subparsers.add_parser('convertir', help="Convierte por lotes los pedidos en 'procesando'.")
+    convertir_parser.add_argument('--sucursal', type=int, default=None, help="Sucursal de las ventas (por defecto SUC001).")
+    convertir_parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Pedidos por transacción.")
+    convertir_parser.add_argument('--limite', type=int, default=None, help="Máximo de pedidos a procesar.")
+    args = parser.parse_args()
+
+    if args.lote <= 0:
+        parser.error("--lote debe ser mayor que 0")
+    resumen = convertir(args.sucursal, args.lote, args.limite)
+    raise SystemExit(0 if resumen is not None else 1)
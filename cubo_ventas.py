@@ -0,0 +1,303 @@
+"""
+Cubo de ventas: totales de detalle_ventas por cualquier combinación de período (día, semana
+o mes), sucursal, categoría, producto y empleado, con subtotales por ROLLUP, CUBE o GROUPING
+SETS en una sola consulta.
+
+Los días ya cerrados se leen de `ventas_diarias_agg` (una fila por día, sucursal, producto y
+empleado) y solo los días posteriores al último agregado se calculan desde el detalle, así
+que el resultado siempre está al día sin recorrer millones de líneas. Los totales viajan al
+cliente ya agregados.
+
+    python cubo_ventas.py consulta --por periodo sucursal --grano mes --subtotales rollup
+    python cubo_ventas.py consulta --por categoria empleado --conjunto categoria --conjunto empleado --conjunto ""
+    python cubo_ventas.py refrescar
+"""
+import argparse
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, cast, delete, func, insert, literal, select, tuple_, union_all
+
+from database import (obtener_session, obtener_session_lectura, VentaDiariaAgregada,
+                      Venta, DetalleVenta, Producto, Sucursal, Categoria, Empleado)
+
+GRANOS = {'dia': 'day', 'semana': 'week', 'mes': 'month'}
+DIMENSIONES = ('periodo', 'sucursal', 'categoria', 'producto', 'empleado')
+FILTRABLES = ('sucursal', 'categoria', 'producto', 'empleado') # Dimensiones con ID (--filtro)
+SUBTOTALES = ('ninguno', 'rollup', 'cube')
+DIAS_POR_LOTE_ROLLUP = 31
+
+# Columna de la fuente para cada dimensión
+_COLUMNAS = {
+    'periodo': 'periodo',
+    'sucursal': 'sucursal_id',
+    'categoria': 'categoria_id',
+    'producto': 'producto_id',
+    'empleado': 'empleado_id',
+}
+
+# Nombre legible de cada dimensión: (modelo, expresión del nombre)
+_NOMBRES = {
+    'sucursal': (Sucursal, Sucursal.nombre),
+    'categoria': (Categoria, Categoria.nombre),
+    'producto': (Producto, Producto.nombre),
+    'empleado': (Empleado, func.concat_ws(' ', Empleado.nombre, Empleado.apellido)),
+}
+
+# --- Fuentes ---
+
+def _detalle_diario(desde=None, hasta=None, filtros=None):
+    """
+    Detalle de ventas agregado por día, sucursal, producto, categoría y empleado.
+    `desde` es inclusivo y `hasta` exclusivo (datetime).
+    """
+    dia = cast(Venta.fecha, Date)
+    columnas_filtro = {
+        'sucursal': Venta.sucursal_id,
+        'categoria': Producto.categoria_id,
+        'producto': DetalleVenta.producto_id,
+        'empleado': Venta.empleado_id,
+    }
+    consulta = (
+        select(
+            dia.label('dia'), Venta.sucursal_id, DetalleVenta.producto_id, Producto.categoria_id, Venta.empleado_id,
+            func.sum(DetalleVenta.cantidad).label('unidades'),
+            func.sum(DetalleVenta.subtotal).label('importe'),
+            func.count().label('lineas'),
+        )
+        .join_from(DetalleVenta, Venta, DetalleVenta.venta_id == Venta.id)
+        .join(Producto, Producto.id == DetalleVenta.producto_id)
+        .group_by(dia, Venta.sucursal_id, DetalleVenta.producto_id, Producto.categoria_id, Venta.empleado_id)
+    )
+    if desde is not None:
+        consulta = consulta.where(Venta.fecha >= desde)
+    if hasta is not None:
+        consulta = consulta.where(Venta.fecha < hasta)
+    for dimension, valor in (filtros or {}).items():
+        consulta = consulta.where(columnas_filtro[dimension] == valor)
+    return consulta
+
+def _rollup_diario(antes_de, desde=None, hasta=None, filtros=None):
+    """Filas de ventas_diarias_agg anteriores a `antes_de` (date), con las mismas columnas que _detalle_diario."""
+    agg = VentaDiariaAgregada
+    consulta = select(
+        agg.dia, agg.sucursal_id, agg.producto_id, agg.categoria_id, agg.empleado_id,
+        agg.unidades, agg.importe, agg.lineas,
+    ).where(agg.dia < antes_de)
+    if desde is not None:
+        consulta = consulta.where(agg.dia >= desde.date())
+    if hasta is not None:
+        consulta = consulta.where(agg.dia < hasta.date())
+    for dimension, valor in (filtros or {}).items():
+        consulta = consulta.where(getattr(agg, _COLUMNAS[dimension]) == valor)
+    return consulta
+
+def _primer_dia_sin_rollup(session):
+    """Día siguiente al último agregado en ventas_diarias_agg, o None si está vacía."""
+    ultimo = session.execute(select(func.max(VentaDiariaAgregada.dia))).scalar()
+    return ultimo + timedelta(days=1) if ultimo else None
+
+# --- Consulta del cubo ---
+
+def construir_consulta(dimensiones, grano='dia', subtotales='ninguno', conjuntos=None,
+                       desde=None, hasta=None, filtros=None, corte_rollup=None):
+    """
+    Arma el SELECT del cubo.
+    - dimensiones: subconjunto ordenado de DIMENSIONES.
+    - subtotales: 'ninguno', 'rollup' (jerárquico en el orden de las dimensiones) o 'cube'.
+    - conjuntos: lista explícita de GROUPING SETS (tuplas de dimensiones); tiene prioridad sobre `subtotales`.
+    - desde/hasta: datetimes, inclusivo/exclusivo. filtros: {dimensión: id}.
+    - corte_rollup: primer día que no está en ventas_diarias_agg (None = todo desde el detalle).
+    La columna `nivel` es GROUPING(...) de las dimensiones: 0 en las filas de detalle y un bit
+    por cada dimensión sumarizada en las filas de subtotal.
+    """
+    if corte_rollup is None:
+        fuente = _detalle_diario(desde, hasta, filtros)
+    else:
+        inicio_detalle = datetime.combine(corte_rollup, datetime.min.time())
+        fuente = union_all(
+            _rollup_diario(corte_rollup, desde, hasta, filtros),
+            _detalle_diario(max(desde, inicio_detalle) if desde else inicio_detalle, hasta, filtros),
+        )
+    fuente = fuente.subquery('fuente')
+
+    periodo = fuente.c.dia if grano == 'dia' else cast(func.date_trunc(GRANOS[grano], fuente.c.dia), Date)
+    base = select(
+        periodo.label('periodo'), fuente.c.sucursal_id, fuente.c.categoria_id, fuente.c.producto_id,
+        fuente.c.empleado_id, fuente.c.unidades, fuente.c.importe, fuente.c.lineas,
+    ).subquery('base')
+
+    columnas = [base.c[_COLUMNAS[dimension]] for dimension in dimensiones]
+    metricas = [
+        func.sum(base.c.unidades).label('unidades'),
+        func.sum(base.c.importe).label('importe'),
+        func.sum(base.c.lineas).label('lineas'),
+    ]
+    if conjuntos is not None:
+        agrupacion = [func.grouping_sets(*[tuple_(*[base.c[_COLUMNAS[d]] for d in conjunto]) for conjunto in conjuntos])]
+    elif subtotales == 'rollup' and columnas:
+        agrupacion = [func.rollup(*columnas)]
+    elif subtotales == 'cube' and columnas:
+        agrupacion = [func.cube(*columnas)]
+    else:
+        agrupacion = columnas
+    con_subtotales = bool(columnas) and agrupacion is not columnas
+    nivel = func.grouping(*columnas) if con_subtotales else literal(0)
+    agregado = select(*columnas, nivel.label('nivel'), *metricas).group_by(*agrupacion).subquery('agregado')
+
+    # Nombres legibles después de agregar: un join por fila de resultado, no por línea de detalle
+    salida = []
+    desde_tabla = agregado
+    for dimension in dimensiones:
+        columna = agregado.c[_COLUMNAS[dimension]]
+        salida.append(columna)
+        if dimension in _NOMBRES:
+            modelo, nombre = _NOMBRES[dimension]
+            salida.append(nombre.label(dimension))
+            desde_tabla = desde_tabla.outerjoin(modelo, modelo.id == columna)
+    orden = [agregado.c.nivel] + [agregado.c[_COLUMNAS[dimension]] for dimension in dimensiones]
+    return (
+        select(*salida, agregado.c.nivel, agregado.c.unidades, agregado.c.importe, agregado.c.lineas)
+        .select_from(desde_tabla)
+        .order_by(*orden)
+    )
+
+def agregar_ventas(dimensiones, grano='dia', subtotales='ninguno', conjuntos=None,
+                   desde=None, hasta=None, filtros=None, usar_rollup=True):
+    """
+    Ejecuta el cubo y retorna (columnas, filas), o None si hubo un error.
+    `desde` y `hasta` son fechas inclusivas. Ver construir_consulta para el resto de los parámetros.
+    """
+    dimensiones = list(dimensiones)
+    desconocidas = set(dimensiones).union(*(conjuntos or [])) - set(DIMENSIONES)
+    if desconocidas:
+        print(f"❌ Dimensiones no válidas: {', '.join(sorted(desconocidas))}. Use: {', '.join(DIMENSIONES)}")
+        return None
+    no_filtrables = set(filtros or {}) - set(FILTRABLES)
+    if no_filtrables:
+        print(f"❌ No se puede filtrar por: {', '.join(sorted(no_filtrables))}. Use: {', '.join(FILTRABLES)}")
+        return None
+    if conjuntos is not None and any(set(conjunto) - set(dimensiones) for conjunto in conjuntos):
+        print("❌ Cada conjunto de agrupación debe usar solo dimensiones incluidas en el resultado.")
+        return None
+
+    inicio = datetime.combine(desde, datetime.min.time()) if desde else None
+    fin = datetime.combine(hasta + timedelta(days=1), datetime.min.time()) if hasta else None
+    session = obtener_session_lectura()
+    try:
+        corte = _primer_dia_sin_rollup(session) if usar_rollup else None
+        consulta = construir_consulta(dimensiones, grano, subtotales, conjuntos, inicio, fin, filtros, corte)
+        resultado = session.execute(consulta)
+        return list(resultado.keys()), resultado.all()
+    except Exception as e:
+        print(f"❌ Error al consultar el cubo de ventas: {e}")
+        return None
+    finally:
+        session.close()
+
+# --- Tabla de rollup ---
+
+def refrescar_rollup(desde=None, hasta=None, dias_por_lote=DIAS_POR_LOTE_ROLLUP):
+    """
+    Recalcula ventas_diarias_agg para los días entre `desde` y `hasta` (fechas inclusivas).
+    Por defecto continúa desde el día siguiente al último agregado hasta ayer: el día en
+    curso no se agrega porque todavía recibe ventas. Cada lote de días se borra y se vuelve a
+    insertar en una transacción, así que repetir un rango es seguro (útil si se corrigieron
+    ventas antiguas). Retorna las filas insertadas, o None si hubo un error.
+    """
+    session = obtener_session()
+    try:
+        siguiente = _primer_dia_sin_rollup(session)
+        if siguiente is None:
+            primera_venta = session.execute(select(func.min(Venta.fecha))).scalar()
+            if primera_venta is None:
+                print("⚠️ No hay ventas para agregar.")
+                return 0
+            siguiente = primera_venta.date()
+        if desde is None:
+            desde = siguiente
+        elif desde > siguiente:
+            # La consulta del cubo toma del rollup todo lo anterior a su último día: un hueco
+            # dejaría esas ventas fuera de los totales
+            print(f"❌ ventas_diarias_agg no cubre desde el {siguiente}; refresque desde esa fecha o antes.")
+            return None
+        ayer = date.today() - timedelta(days=1)
+        if hasta is None or hasta > ayer:
+            # El día en curso todavía recibe ventas: agregarlo adelantaría el corte del cubo y
+            # las ventas posteriores del día no se contarían nunca
+            if hasta is not None:
+                print(f"⚠️ El rollup llega hasta ayer ({ayer}); se ignora --hasta {hasta}.")
+            hasta = ayer
+
+        total = 0
+        columnas = ['dia', 'sucursal_id', 'producto_id', 'categoria_id', 'empleado_id', 'unidades', 'importe', 'lineas']
+        inicio = desde
+        while inicio <= hasta:
+            fin = min(inicio + timedelta(days=dias_por_lote - 1), hasta)
+            session.execute(delete(VentaDiariaAgregada).where(VentaDiariaAgregada.dia.between(inicio, fin)))
+            detalle = _detalle_diario(datetime.combine(inicio, datetime.min.time()),
+                                      datetime.combine(fin + timedelta(days=1), datetime.min.time()))
+            total += session.execute(insert(VentaDiariaAgregada).from_select(columnas, detalle)).rowcount
+            session.commit()
+            print(f"  ... {inicio} a {fin}: {total} filas agregadas")
+            inicio = fin + timedelta(days=1)
+
+        print(f"✅ Rollup de ventas diarias actualizado del {desde} al {hasta} ({total} filas).")
+        return total
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error al refrescar ventas_diarias_agg: {e}")
+        return None
+    finally:
+        session.close()
+
+def _fecha(valor):
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+def _conjunto(valor):
+    return tuple(parte.strip() for parte in valor.split(',') if parte.strip())
+
+def _filtro(valor):
+    dimension, _, identificador = valor.partition('=')
+    return dimension.strip(), int(identificador)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Totales de ventas por período, sucursal, categoría, producto y empleado.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    consulta = subparsers.add_parser('consulta', help="Consulta el cubo de ventas.")
+    consulta.add_argument('--por', nargs='*', default=[], choices=DIMENSIONES, metavar='DIMENSION',
+                          help=f"Dimensiones del resultado, en orden ({', '.join(DIMENSIONES)}).")
+    consulta.add_argument('--grano', choices=GRANOS, default='dia', help="Granularidad del período.")
+    consulta.add_argument('--subtotales', choices=SUBTOTALES, default='ninguno')
+    consulta.add_argument('--conjunto', action='append', type=_conjunto, metavar='DIM1,DIM2',
+                          help="Conjunto de agrupación explícito (repetible; \"\" para el total general).")
+    consulta.add_argument('--filtro', action='append', type=_filtro, default=[], metavar='DIMENSION=ID',
+                          help="Restringe a un ID (ej. sucursal=2). Repetible.")
+    consulta.add_argument('--desde', type=_fecha, metavar='YYYY-MM-DD')
+    consulta.add_argument('--hasta', type=_fecha, metavar='YYYY-MM-DD')
+    consulta.add_argument('--sin-rollup', action='store_true', help="Calcula todo desde el detalle.")
+    consulta.add_argument('--format', dest='formato', choices=['csv', 'json', 'parquet', 'xlsx'], help="Exporta el resultado.")
+    consulta.add_argument('--out', dest='salida', metavar='ARCHIVO')
+
+    refrescar = subparsers.add_parser('refrescar', help="Actualiza la tabla ventas_diarias_agg.")
+    refrescar.add_argument('--desde', type=_fecha, metavar='YYYY-MM-DD')
+    refrescar.add_argument('--hasta', type=_fecha, metavar='YYYY-MM-DD')
+    refrescar.add_argument('--lote', type=int, default=DIAS_POR_LOTE_ROLLUP, metavar='DIAS', help="Días por transacción.")
+    args = parser.parse_args()
+
+    if args.comando == 'refrescar':
+        refrescar_rollup(args.desde, args.hasta, args.lote)
+    else:
+        resultado = agregar_ventas(args.por, args.grano, args.subtotales, args.conjunto,
+                                   args.desde, args.hasta, dict(args.filtro), not args.sin_rollup)
+        if resultado is not None:
+            columnas, filas = resultado
+            if args.formato or args.salida:
+                from reports import escribir_resultado, nombre_archivo_reporte
+                formato = args.formato or 'csv'
+                escribir_resultado(args.salida or nombre_archivo_reporte('cubo_ventas', formato), columnas, filas, formato)
+            else:
+                print(' | '.join(columnas))
+                for fila in filas:
+                    print(' | '.join('' if valor is None else str(valor) for valor in fila))
+                print(f"\n{len(filas)} filas.")
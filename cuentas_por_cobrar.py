@@ -0,0 +1,153 @@
+"""
+Cuentas por cobrar: conciliación de pagos con facturas y antigüedad de saldos.
+
+`facturas.monto_pagado` y `facturas.estado` se mantienen por trigger con cada pago
+(trg_sync_factura_monto_pagado, ver queries.py). Este módulo agrega:
+
+* conciliar(): el paso diario de 'pendiente' a 'vencida' para las facturas que superan el
+  plazo sin pagarse (con el índice parcial de facturas abiertas) y, con completo=True, el
+  recálculo de todos los montos pagados y estados desde la tabla de pagos en dos sentencias.
+* antiguedad_saldos(): saldos abiertos por cliente en tramos de 0-30, 31-60, 61-90 y más de
+  90 días desde la fecha de la factura.
+
+    python cuentas_por_cobrar.py conciliar [--completo]
+    python cuentas_por_cobrar.py antiguedad [--format csv --out antiguedad.csv]
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from database import obtener_session, obtener_session_lectura
+
+PLAZO_PAGO_DIAS = 30 # Debe coincidir con el intervalo de sync_factura_monto_pagado()
+
+COLUMNAS_ANTIGUEDAD = [
+    'CodigoCliente', 'NombreCliente', 'ApellidoCliente', 'Facturas',
+    'Dias0a30', 'Dias31a60', 'Dias61a90', 'DiasMasDe90', 'SaldoTotal',
+]
+
+_ESTADO_SEGUN_SALDO = """
+    CASE
+        WHEN monto_pagado >= total THEN 'pagada'
+        WHEN fecha < :limite THEN 'vencida'
+        ELSE 'pendiente'
+    END
+"""
+
+def conciliar(completo=False):
+    """
+    Actualiza el estado de las facturas a partir de sus pagos. Retorna un dict con la
+    cantidad de filas afectadas por cada paso, o None si hubo un error.
+    """
+    session = obtener_session()
+    try:
+        limite = datetime.now() - timedelta(days=PLAZO_PAGO_DIAS)
+        resultado = {}
+        if completo:
+            # Corrige montos pagados que se hayan desviado (pagos cargados sin triggers, bases anteriores)
+            resultado['montos_corregidos'] = session.execute(text("""
+                UPDATE facturas f
+                SET monto_pagado = s.pagado
+                FROM (
+                    SELECT f.id, COALESCE(SUM(p.monto), 0) AS pagado
+                    FROM facturas f
+                    LEFT JOIN pagos p ON p.factura_id = f.id
+                    GROUP BY f.id
+                ) s
+                WHERE f.id = s.id AND f.monto_pagado IS DISTINCT FROM s.pagado
+            """)).rowcount
+            resultado['estados_actualizados'] = session.execute(text(f"""
+                UPDATE facturas
+                SET estado = {_ESTADO_SEGUN_SALDO}
+                WHERE estado <> 'anulada' AND estado IS DISTINCT FROM {_ESTADO_SEGUN_SALDO}
+            """), {'limite': limite}).rowcount
+        else:
+            # Los pagos ya actualizaron lo suyo por trigger; solo falta el paso del tiempo
+            resultado['estados_actualizados'] = session.execute(text("""
+                UPDATE facturas
+                SET estado = 'vencida'
+                WHERE estado = 'pendiente' AND fecha < :limite AND monto_pagado < total
+            """), {'limite': limite}).rowcount
+        resultado['sobrepagadas'] = session.execute(text("""
+            SELECT COUNT(*) FROM facturas WHERE monto_pagado > total AND estado <> 'anulada'
+        """)).scalar()
+        session.commit()
+
+        detalle = ", ".join(f"{clave.replace('_', ' ')}: {valor}" for clave, valor in resultado.items())
+        print(f"✅ Conciliación de facturas terminada ({detalle}).")
+        if resultado['sobrepagadas']:
+            print(f"⚠️ {resultado['sobrepagadas']} facturas tienen pagos por encima de su total (saldo a favor del cliente).")
+        return resultado
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error al conciliar facturas y pagos: {e}")
+        return None
+    finally:
+        session.close()
+
+def antiguedad_saldos(cliente_id=None):
+    """
+    Saldos abiertos (total - monto pagado) por cliente y tramo de antigüedad, de mayor a
+    menor saldo. Retorna una lista de filas en el orden de COLUMNAS_ANTIGUEDAD, o None si hubo un error.
+    """
+    session = obtener_session_lectura()
+    try:
+        filtro = "AND f.cliente_id = :cliente_id" if cliente_id else ""
+        return session.execute(text(f"""
+            WITH abiertas AS (
+                SELECT f.cliente_id, f.total - f.monto_pagado AS saldo, CURRENT_DATE - f.fecha::date AS dias
+                FROM facturas f
+                WHERE f.estado IN ('pendiente', 'vencida') AND f.monto_pagado < f.total {filtro}
+            )
+            SELECT c.codigo, c.nombre, c.apellido, COUNT(*),
+                   COALESCE(SUM(a.saldo) FILTER (WHERE a.dias <= 30), 0),
+                   COALESCE(SUM(a.saldo) FILTER (WHERE a.dias BETWEEN 31 AND 60), 0),
+                   COALESCE(SUM(a.saldo) FILTER (WHERE a.dias BETWEEN 61 AND 90), 0),
+                   COALESCE(SUM(a.saldo) FILTER (WHERE a.dias > 90), 0),
+                   SUM(a.saldo)
+            FROM abiertas a
+            JOIN clientes c ON c.id = a.cliente_id
+            GROUP BY c.id, c.codigo, c.nombre, c.apellido
+            ORDER BY SUM(a.saldo) DESC, c.id
+        """), {'cliente_id': cliente_id}).all()
+    except Exception as e:
+        print(f"❌ Error al calcular la antigüedad de saldos: {e}")
+        return None
+    finally:
+        session.close()
+
+def mostrar_antiguedad(filas):
+    """Imprime la antigüedad de saldos con una fila de totales."""
+    if not filas:
+        print("No hay facturas con saldo pendiente.")
+        return
+    print(f"{'Cliente':<32} {'Fact.':>5} {'0-30':>12} {'31-60':>12} {'61-90':>12} {'+90':>12} {'Total':>13}")
+    for codigo, nombre, apellido, facturas, *tramos in filas:
+        cliente = f"{codigo} {nombre} {apellido or ''}".strip()
+        print(f"{cliente[:32]:<32} {facturas:>5} " + " ".join(f"{monto:>12,.2f}" for monto in tramos[:-1]) + f" {tramos[-1]:>13,.2f}")
+    totales = [sum(fila[i] for fila in filas) for i in range(3, 9)]
+    print(f"{'TOTAL':<32} {totales[0]:>5} " + " ".join(f"{monto:>12,.2f}" for monto in totales[1:-1]) + f" {totales[-1]:>13,.2f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Conciliación de pagos y antigüedad de saldos de las facturas.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    conciliacion = subparsers.add_parser('conciliar', help="Actualiza el estado de las facturas (pendiente/vencida/pagada).")
+    conciliacion.add_argument('--completo', action='store_true', help="Recalcula montos pagados y estados de todas las facturas.")
+    antiguedad = subparsers.add_parser('antiguedad', help="Saldos abiertos por cliente y tramo de antigüedad.")
+    antiguedad.add_argument('--cliente', type=int, metavar='ID')
+    antiguedad.add_argument('--format', dest='formato', choices=['csv', 'json', 'parquet', 'xlsx'], help="Exporta el resultado.")
+    antiguedad.add_argument('--out', dest='salida', metavar='ARCHIVO')
+    args = parser.parse_args()
+
+    if args.comando == 'conciliar':
+        conciliar(args.completo)
+    else:
+        filas = antiguedad_saldos(args.cliente)
+        if filas is not None:
+            if args.formato or args.salida:
+                from reports import escribir_resultado, nombre_archivo_reporte
+                formato = args.formato or 'csv'
+                escribir_resultado(args.salida or nombre_archivo_reporte('antiguedad_saldos', formato), COLUMNAS_ANTIGUEDAD, filas, formato)
+            else:
+                mostrar_antiguedad(filas)
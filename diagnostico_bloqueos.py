@@ -0,0 +1,313 @@
+"""
+Diagnóstico de contención de bloqueos y deadlocks en los triggers de inventario.
+
+Cada detalle de venta bloquea filas de tres tablas en cascada (movimientos_inventario,
+inventario y productos) desde los triggers de queries.py, y los productos populares se
+vuelven filas calientes. Este módulo muestrea pg_stat_activity y pg_locks mientras corre la
+carga y, por cada sesión esperando un bloqueo:
+
+* resuelve la fila en disputa a partir del bloqueo de tupla (relación + ctid) y la describe
+  por sus claves (ej. inventario producto_id=12 sucursal_id=3),
+* atribuye la espera a la función de trigger que escribe esa tabla, recorriendo desde la
+  tabla de la sentencia original los triggers de pg_trigger y las tablas que escribe cada
+  función (pg_proc.prosrc),
+* detecta ciclos en el grafo de pg_blocking_pids (un deadlock es visible hasta que el
+  detector de PostgreSQL lo corta, deadlock_timeout = 1 s por defecto) y guarda el grafo.
+
+Las muestras equivalen a tiempo: cada una representa `intervalo` segundos de espera.
+
+    python diagnostico_bloqueos.py --duracion 60 --intervalo 0.2 --out bloqueos.json
+    python -m benchmarks.carga_pos --terminales 8 --diagnosticar-bloqueos
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from sqlalchemy import text
+
+from database import obtener_engine
+
+INTERVALO_SEGUNDOS = 0.2
+
+# Columnas que identifican una fila de cada tabla en el reporte
+CLAVES_FILA = {
+    'inventario': ('producto_id', 'sucursal_id'),
+    'alertas_stock': ('producto_id', 'sucursal_id'),
+    'productos': ('id', 'codigo'),
+    'pedidos': ('id', 'numero'),
+    'compras': ('id', 'numero'),
+    'facturas': ('id', 'numero'),
+    'ventas': ('id', 'sucursal_id'),
+}
+
+_TABLA_SENTENCIA = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?(\w+)"?', re.IGNORECASE)
+_TABLAS_ESCRITAS = re.compile(r'(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?(\w+)"?', re.IGNORECASE)
+_IDENTIFICADOR = re.compile(r'^\w+$')
+
+_MUESTRA_SQL = """
+    SELECT a.pid, a.wait_event, left(a.query, 300) AS consulta, pg_blocking_pids(a.pid) AS bloqueadores,
+           l.locktype, l.mode, l.granted, l.relation::regclass::text AS tabla, l.page, l.tuple
+    FROM pg_stat_activity a
+    LEFT JOIN pg_locks l ON l.pid = a.pid AND (NOT l.granted OR l.locktype = 'tuple')
+    WHERE a.datname = current_database() AND a.wait_event_type = 'Lock' AND a.pid <> pg_backend_pid()
+"""
+
+def mapa_triggers(conn):
+    """
+    Retorna (triggers, escrituras): {tabla: [funciones de sus triggers]} y {función: {tablas que escribe}}.
+    Las tablas escritas se obtienen del código fuente de cada función.
+    """
+    triggers, escrituras = defaultdict(list), {}
+    for tabla, funcion, fuente in conn.execute(text("""
+        SELECT c.relname, p.proname, p.prosrc
+        FROM pg_trigger t
+        JOIN pg_class c ON c.oid = t.tgrelid
+        JOIN pg_proc p ON p.oid = t.tgfoid
+        WHERE NOT t.tgisinternal
+    """)):
+        triggers[tabla].append(funcion)
+        escrituras[funcion] = {nombre.lower() for nombre in _TABLAS_ESCRITAS.findall(fuente)}
+    return triggers, escrituras
+
+def atribuir(triggers, escrituras, tabla_sentencia, tabla_bloqueada):
+    """
+    Función de trigger que escribe `tabla_bloqueada` en la cascada que dispara una sentencia
+    sobre `tabla_sentencia` (búsqueda en anchura). 'directo' si la sentencia escribe la tabla.
+    """
+    if not tabla_sentencia or not tabla_bloqueada:
+        return 'desconocido'
+    if tabla_sentencia == tabla_bloqueada:
+        return 'directo'
+    pendientes, visitadas = [tabla_sentencia], {tabla_sentencia}
+    while pendientes:
+        tabla = pendientes.pop(0)
+        for funcion in triggers.get(tabla, ()):
+            for escrita in escrituras.get(funcion, ()):
+                if escrita == tabla_bloqueada:
+                    return funcion
+                if escrita not in visitadas:
+                    visitadas.add(escrita)
+                    pendientes.append(escrita)
+    return 'desconocido'
+
+def _ciclos(grafo):
+    """
+    Ciclos simples del grafo de espera {pid: [pids que lo bloquean]}, cada uno como tupla de
+    pids empezando por el menor (cada ciclo se reporta una sola vez).
+    """
+    ciclos = []
+    for inicio in sorted(grafo):
+        pila = [(inicio, [inicio])]
+        while pila:
+            actual, camino = pila.pop()
+            for siguiente in grafo.get(actual, ()):
+                if siguiente == inicio:
+                    ciclos.append(tuple(camino))
+                elif siguiente > inicio and siguiente in grafo and siguiente not in camino:
+                    pila.append((siguiente, camino + [siguiente]))
+    return ciclos
+
+class DiagnosticoBloqueos:
+    """Muestreador de esperas por bloqueo en un hilo propio."""
+
+    def __init__(self, intervalo=INTERVALO_SEGUNDOS, engine=None):
+        self.intervalo = intervalo
+        self.engine = engine or obtener_engine()
+        self.muestras = 0
+        self.esperas = 0 # Sesiones esperando, sumadas sobre todas las muestras
+        self.filas = Counter() # (tabla, descripción de la fila) -> muestras
+        self.funciones = Counter() # (función de trigger, tabla bloqueada) -> muestras
+        self.eventos = Counter() # wait_event (transactionid, tuple, relation...) -> muestras
+        self.bloqueadores = Counter() # consulta de la sesión que bloquea -> muestras
+        self.deadlocks = [] # Grafos de los ciclos detectados
+        self._ciclos_vistos = set()
+        self._deadlocks_inicio = None
+        self._deadlocks_fin = None
+        self._detener = threading.Event()
+        self._hilo = None
+        self.inicio = self.fin = None
+
+    # --- Ciclo de vida ---
+
+    def iniciar(self):
+        self._conn = self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        self._triggers, self._escrituras = mapa_triggers(self._conn)
+        self._deadlocks_inicio = self._contador_deadlocks()
+        self.inicio = time.monotonic()
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join()
+        self.fin = time.monotonic()
+        time.sleep(0.5) # El contador de pg_stat_database se publica con un pequeño retraso
+        self._deadlocks_fin = self._contador_deadlocks()
+        self._conn.close()
+        return self
+
+    def _contador_deadlocks(self):
+        return self._conn.execute(text("""
+            SELECT pg_stat_clear_snapshot(), deadlocks FROM pg_stat_database WHERE datname = current_database()
+        """)).one()[1]
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            inicio = time.monotonic()
+            try:
+                self.muestrear()
+            except Exception as e:
+                print(f"⚠️ Error al muestrear bloqueos: {e}")
+            self._detener.wait(max(0.0, self.intervalo - (time.monotonic() - inicio)))
+
+    # --- Muestreo ---
+
+    def _describir_fila(self, tabla, pagina, tupla):
+        """Claves de la fila en (pagina, tupla) de `tabla`, leídas por ctid."""
+        if not tabla or pagina is None or not _IDENTIFICADOR.match(tabla):
+            return f"{tabla} (sin fila)"
+        claves = CLAVES_FILA.get(tabla, ('id',))
+        fila = self._conn.execute(
+            text(f"SELECT {', '.join(claves)} FROM {tabla} WHERE ctid = CAST(:ctid AS tid)"),
+            {'ctid': f"({pagina},{tupla})"},
+        ).first()
+        if fila is None:
+            return f"ctid ({pagina},{tupla}) ya modificado"
+        return " ".join(f"{clave}={valor}" for clave, valor in zip(claves, fila))
+
+    def muestrear(self):
+        """Toma una muestra de las sesiones que esperan un bloqueo y acumula sus contadores."""
+        sesiones = {}
+        for fila in self._conn.execute(text(_MUESTRA_SQL)).mappings():
+            sesion = sesiones.setdefault(fila['pid'], {
+                'consulta': fila['consulta'], 'evento': fila['wait_event'],
+                'bloqueadores': list(fila['bloqueadores'] or []), 'tabla': None, 'pagina': None, 'tupla': None,
+            })
+            # El bloqueo de tupla (concedido o en espera) identifica la fila; si no hay, la relación esperada
+            if fila['locktype'] == 'tuple' or (fila['tabla'] and sesion['tabla'] is None):
+                sesion['tabla'], sesion['pagina'], sesion['tupla'] = fila['tabla'], fila['page'], fila['tuple']
+
+        consultas_bloqueadoras = {}
+        pids = {pid for sesion in sesiones.values() for pid in sesion['bloqueadores']}
+        if pids:
+            consultas_bloqueadoras = dict(self._conn.execute(
+                text("SELECT pid, left(query, 300) FROM pg_stat_activity WHERE pid = ANY(:pids)"),
+                {'pids': list(pids)},
+            ).all())
+
+        self.muestras += 1
+        self.esperas += len(sesiones)
+        descripciones = {}
+        for pid, sesion in sesiones.items():
+            clave_fila = (sesion['tabla'], sesion['pagina'], sesion['tupla'])
+            if clave_fila not in descripciones:
+                descripciones[clave_fila] = self._describir_fila(*clave_fila)
+            sesion['fila'] = descripciones[clave_fila]
+            coincidencia = _TABLA_SENTENCIA.match(sesion['consulta'] or '')
+            sesion['funcion'] = atribuir(self._triggers, self._escrituras,
+                                         coincidencia.group(1).lower() if coincidencia else None, sesion['tabla'])
+            self.filas[(sesion['tabla'], sesion['fila'])] += 1
+            self.funciones[(sesion['funcion'], sesion['tabla'])] += 1
+            self.eventos[sesion['evento']] += 1
+            for bloqueador in sesion['bloqueadores']:
+                self.bloqueadores[consultas_bloqueadoras.get(bloqueador, '(terminada)')] += 1
+
+        for ciclo in _ciclos({pid: sesion['bloqueadores'] for pid, sesion in sesiones.items()}):
+            if frozenset(ciclo) in self._ciclos_vistos:
+                continue
+            self._ciclos_vistos.add(frozenset(ciclo))
+            self.deadlocks.append({
+                'momento_s': round(time.monotonic() - self.inicio, 2),
+                'sesiones': [
+                    {'pid': pid, 'espera_a': sesiones[pid]['bloqueadores'], 'tabla': sesiones[pid]['tabla'],
+                     'fila': sesiones[pid]['fila'], 'funcion': sesiones[pid]['funcion'], 'consulta': sesiones[pid]['consulta']}
+                    for pid in ciclo
+                ],
+            })
+
+    # --- Resultado ---
+
+    def resumen(self, top=10):
+        """Dict con los contadores principales (serializable a JSON)."""
+        def segundos(muestras):
+            return round(muestras * self.intervalo, 2)
+        return {
+            'duracion_s': round((self.fin or time.monotonic()) - self.inicio, 1),
+            'muestras': self.muestras,
+            'sesiones_esperando_promedio': round(self.esperas / self.muestras, 2) if self.muestras else 0,
+            'filas_en_disputa': [
+                {'tabla': tabla, 'fila': fila, 'muestras': n, 'espera_s': segundos(n)}
+                for (tabla, fila), n in self.filas.most_common(top)
+            ],
+            'por_funcion': [
+                {'funcion': funcion, 'tabla': tabla, 'muestras': n, 'espera_s': segundos(n)}
+                for (funcion, tabla), n in self.funciones.most_common(top)
+            ],
+            'por_evento': dict(self.eventos.most_common()),
+            'bloqueadores': [{'consulta': consulta, 'muestras': n} for consulta, n in self.bloqueadores.most_common(top)],
+            'deadlocks_postgresql': (self._deadlocks_fin - self._deadlocks_inicio) if self._deadlocks_fin is not None else None,
+            'deadlocks_capturados': self.deadlocks,
+        }
+
+    def mostrar(self, top=10):
+        datos = self.resumen(top)
+        print(f"\n=== Contención de bloqueos: {datos['muestras']} muestras en {datos['duracion_s']} s "
+              f"(cada {self.intervalo} s), {datos['sesiones_esperando_promedio']} sesiones esperando en promedio ===")
+        if not self.esperas:
+            print("Sin esperas por bloqueo durante el muestreo.")
+        else:
+            print(f"\n{'Tabla':<16} {'Fila':<40} {'Muestras':>9} {'Espera s':>9}")
+            for fila in datos['filas_en_disputa']:
+                print(f"{str(fila['tabla']):<16} {fila['fila'][:40]:<40} {fila['muestras']:>9} {fila['espera_s']:>9.1f}")
+            print(f"\n{'Función de trigger':<36} {'Tabla':<16} {'Muestras':>9} {'Espera s':>9}")
+            for fila in datos['por_funcion']:
+                print(f"{fila['funcion'][:36]:<36} {str(fila['tabla']):<16} {fila['muestras']:>9} {fila['espera_s']:>9.1f}")
+            print("\nEventos de espera: " + ", ".join(f"{evento}: {n}" for evento, n in datos['por_evento'].items()))
+            print("\nConsultas que más bloquean:")
+            for fila in datos['bloqueadores'][:5]:
+                print(f"  {fila['muestras']:>6}  {' '.join(fila['consulta'].split())[:100]}")
+        print(f"\nDeadlocks según PostgreSQL: {datos['deadlocks_postgresql']} | ciclos capturados en las muestras: {len(self.deadlocks)}")
+        for deadlock in self.deadlocks[:5]:
+            print(f"  a los {deadlock['momento_s']} s:")
+            for sesion in deadlock['sesiones']:
+                print(f"    pid {sesion['pid']} espera a {sesion['espera_a']} en {sesion['tabla']} [{sesion['fila']}] "
+                      f"vía {sesion['funcion']}")
+
+    def guardar(self, filename, top=10):
+        """Guarda el resumen y los grafos de deadlock en JSON."""
+        try:
+            with open(filename, 'w', encoding='utf-8') as archivo:
+                json.dump(self.resumen(top), archivo, ensure_ascii=False, indent=2, default=str)
+            print(f"\n✅ Diagnóstico de bloqueos guardado en '{filename}'")
+            return True
+        except Exception as e:
+            print(f"❌ Error al guardar el diagnóstico en '{filename}': {e}")
+            return False
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Muestrea esperas por bloqueo y deadlocks mientras corre la carga.")
+    parser.add_argument('--duracion', type=float, default=60, help="Segundos de muestreo.")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_SEGUNDOS, help="Segundos entre muestras.")
+    parser.add_argument('--top', type=int, default=10, help="Filas por sección del resumen.")
+    parser.add_argument('--out', metavar='ARCHIVO.json', help="Guarda el resumen y los grafos de deadlock.")
+    args = parser.parse_args()
+
+    diagnostico = DiagnosticoBloqueos(args.intervalo)
+    try:
+        diagnostico.iniciar()
+        print(f"Muestreando bloqueos durante {args.duracion:.0f} s (Ctrl+C para terminar antes)...")
+        time.sleep(args.duracion)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"❌ Error al iniciar el diagnóstico de bloqueos: {e}")
+        raise SystemExit(1)
+    diagnostico.detener()
+    diagnostico.mostrar(args.top)
+    if args.out:
+        diagnostico.guardar(args.out, args.top)
@@ -0,0 +1,150 @@
+"""
+Escrituras masivas con psycopg 3: COPY binario y pipeline.
+
+Con psycopg2 cada sentencia de una transacción es un viaje de ida y vuelta al servidor
+(executemany también: una sentencia por fila). Con DB_DRIVER=psycopg (ver database.py):
+
+  * copiar_filas envía las filas con COPY ... FROM STDIN (FORMAT BINARY): un solo flujo,
+    sin armar SQL ni convertir valores a texto. Los triggers por fila se disparan igual
+    que con INSERT.
+  * upsert_con_copy copia el lote a una tabla temporal y lo aplica con un único
+    INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+  * executemany de psycopg 3 ya envía las filas en modo pipeline (sin esperar cada
+    respuesta), y pipeline() permite agrupar así sentencias sueltas que no dependen del
+    resultado de la anterior.
+
+Los llamadores (generador.py, importacion.py, benchmarks/carga_pos.py) consultan
+copia_binaria_disponible() y conservan su camino de psycopg2 sin cambios.
+
+    conn = session.connection()
+    if escritura_rapida.copia_binaria_disponible(conn):
+        escritura_rapida.copiar_filas(conn, 'detalle_ventas', filas)
+    else:
+        session.execute(insert(DetalleVenta), filas)
+"""
+from contextlib import contextmanager, nullcontext
+from decimal import Decimal
+
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Integer, Numeric, SmallInteger
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.types import TypeDecorator
+
+from database import Base
+
+def _driver(conn):
+    return conn.dialect.driver
+
+def copia_binaria_disponible(conn):
+    """True si la conexión de SQLAlchemy usa psycopg 3 (COPY binario y pipeline)."""
+    return _driver(conn) == 'psycopg'
+
+def conexion_dbapi(conn):
+    """Conexión del driver detrás de una Connection de SQLAlchemy (dentro de su transacción)."""
+    return conn.connection.dbapi_connection
+
+def pipeline(conn):
+    """Context manager: modo pipeline de psycopg 3; con psycopg2 no hace nada."""
+    if copia_binaria_disponible(conn):
+        return conexion_dbapi(conn).pipeline()
+    return nullcontext()
+
+@contextmanager
+def _errores_del_driver(conn, sentencia):
+    """Las llamadas directas al driver fallan como las de SQLAlchemy (DBAPIError con .orig)."""
+    error_base = conn.dialect.loaded_dbapi.Error
+    try:
+        yield
+    except error_base as e:
+        raise DBAPIError.instance(sentencia, None, e, error_base) from e
+
+def _tipo_copia(tipo):
+    """Nombre del tipo de PostgreSQL con el que psycopg 3 codifica la columna en COPY binario."""
+    if isinstance(tipo, TypeDecorator):
+        tipo = tipo.impl
+    # El formato binario exige el tamaño exacto de los enteros; varchar recibe el de text
+    if isinstance(tipo, BigInteger):
+        return 'int8'
+    if isinstance(tipo, SmallInteger):
+        return 'int2'
+    if isinstance(tipo, Integer):
+        return 'int4'
+    if isinstance(tipo, Numeric):
+        return 'numeric'
+    if isinstance(tipo, DateTime):
+        return 'timestamptz' if tipo.timezone else 'timestamp'
+    if isinstance(tipo, Date):
+        return 'date'
+    if isinstance(tipo, Boolean):
+        return 'bool'
+    return 'text'
+
+def _conversores(columnas, dialecto):
+    """Por columna, la misma preparación que haría un INSERT de SQLAlchemy."""
+    conversores = []
+    for columna in columnas:
+        if isinstance(columna.type, TypeDecorator):
+            # Validación y normalización de TipoDNI, TipoEmail, TipoTelefono, etc.
+            conversores.append(lambda valor, tipo=columna.type: tipo.process_bind_param(valor, dialecto))
+        elif isinstance(columna.type, Numeric):
+            conversores.append(lambda valor: Decimal(str(valor)) if isinstance(valor, float) else valor)
+        else:
+            conversores.append(None)
+    return conversores
+
+def _copiar(conn, destino, columnas, filas):
+    nombres = [columna.name for columna in columnas]
+    conversores = _conversores(columnas, conn.dialect)
+    lista = ', '.join(f'"{nombre}"' for nombre in nombres)
+    sentencia = f"COPY {destino} ({lista}) FROM STDIN (FORMAT BINARY)"
+    cursor = conexion_dbapi(conn).cursor()
+    try:
+        with _errores_del_driver(conn, sentencia), cursor.copy(sentencia) as copia:
+            copia.set_types([_tipo_copia(columna.type) for columna in columnas])
+            for fila in filas:
+                valores = [fila.get(nombre) for nombre in nombres]
+                copia.write_row([valor if conversor is None or valor is None else conversor(valor)
+                                 for valor, conversor in zip(valores, conversores)])
+    finally:
+        cursor.close()
+
+def copiar_filas(conn, tabla, filas, columnas=None):
+    """
+    Inserta filas (dicts por nombre de columna) con COPY binario dentro de la transacción
+    de `conn`. Por defecto se copian las columnas del primer dict. Retorna las filas copiadas.
+    """
+    if not filas:
+        return 0
+    definicion = Base.metadata.tables[tabla]
+    columnas = [definicion.c[nombre] for nombre in (columnas or filas[0].keys())]
+    _copiar(conn, tabla, columnas, filas)
+    return len(filas)
+
+def upsert_con_copy(conn, tabla, filas, conflicto, columnas=None, actualizar=None):
+    """
+    Inserta o actualiza filas: COPY binario a una tabla temporal y un solo INSERT ... SELECT
+    ... ON CONFLICT (conflicto) DO UPDATE de las columnas de `actualizar` (por defecto, todas
+    las demás; importacion.py pasa las mismas que su sentencia de psycopg2). Retorna las filas escritas.
+    """
+    if not filas:
+        return 0
+    definicion = Base.metadata.tables[tabla]
+    nombres = list(columnas or filas[0].keys())
+    temporal = f"_copia_{tabla}"
+    lista = ', '.join(f'"{nombre}"' for nombre in nombres)
+    if actualizar is None:
+        actualizar = [nombre for nombre in nombres if nombre != conflicto]
+    asignaciones = ', '.join(f'"{nombre}" = EXCLUDED."{nombre}"' for nombre in actualizar)
+    dbapi = conexion_dbapi(conn)
+    # Solo los tipos de las columnas (sin NOT NULL ni CHECK: los valida el INSERT final)
+    crear = f"CREATE TEMP TABLE {temporal} ON COMMIT DROP AS SELECT {lista} FROM {tabla} WITH NO DATA"
+    with _errores_del_driver(conn, crear):
+        dbapi.execute(crear)
+    _copiar(conn, temporal, [definicion.c[nombre] for nombre in nombres], filas)
+    aplicar = f"""
+        INSERT INTO {tabla} ({lista}) SELECT {lista} FROM {temporal}
+        ON CONFLICT ("{conflicto}") DO UPDATE SET {asignaciones}
+    """
+    with _errores_del_driver(conn, aplicar):
+        escritas = dbapi.execute(aplicar).rowcount
+        dbapi.execute(f"DROP TABLE {temporal}")
+    return escritas
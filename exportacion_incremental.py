@@ -0,0 +1,226 @@
+"""
+Exportación incremental por marca de agua (watermark) para BI.
+
+En lugar de recargar cada noche los reportes completos, este script exporta solo
+las filas nuevas o modificadas desde la última ejecución:
+
+* ventas (con sus detalles): marca de agua (ventas.fecha, ventas.id)
+* movimientos_inventario: marca de agua movimientos_inventario.id
+* inventario: marca de agua (inventario.fecha_actualizacion, inventario.id)
+
+Las filas se agregan (append) a un CSV por extracción. El estado se guarda en un
+archivo JSON junto con el tamaño en bytes de cada CSV: si el proceso se cae entre
+escribir un lote y guardar la marca de agua, la siguiente ejecución trunca el CSV al
+último tamaño confirmado y vuelve a exportar ese lote, sin duplicados ni huecos.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from database import obtener_session_lectura
+
+DIRECTORIO_SALIDA = 'exportacion_incremental'
+ARCHIVO_ESTADO = 'estado.json'
+TAMANO_LOTE = 10000
+# Solo se exportan filas con cierta antigüedad: una transacción que empezó antes pero
+# confirma después podría tener una fecha menor a la marca de agua y se perdería.
+MARGEN_SEGUNDOS = 300
+
+FECHA_INICIAL = '1970-01-01T00:00:00'
+
+EXTRACCIONES = {
+    'ventas': {
+        'archivo': 'ventas_detalle.csv',
+        'columnas': ['venta_id', 'fecha', 'total', 'empleado_id', 'sucursal_id',
+                     'detalle_id', 'producto_id', 'cantidad', 'precio_unitario', 'subtotal'],
+        # El LIMIT se aplica a las ventas (no a las líneas) para no partir una venta entre lotes
+        'consulta': text("""
+            WITH lote AS (
+                SELECT id, fecha, total, empleado_id, sucursal_id
+                FROM ventas
+                WHERE (fecha, id) > (:fecha, :id) AND fecha < :corte
+                ORDER BY fecha, id
+                LIMIT :limite
+            )
+            SELECT v.id AS venta_id, v.fecha, v.total, v.empleado_id, v.sucursal_id,
+                   d.id AS detalle_id, d.producto_id, d.cantidad, d.precio_unitario, d.subtotal
+            FROM lote v
+            LEFT JOIN detalle_ventas d ON d.venta_id = v.id
+            ORDER BY v.fecha, v.id, d.id
+        """),
+        'marca_inicial': {'fecha': FECHA_INICIAL, 'id': 0},
+        'marca': lambda fila: {'fecha': fila.fecha.isoformat(), 'id': fila.venta_id},
+    },
+    'movimientos_inventario': {
+        'archivo': 'movimientos_inventario.csv',
+        'columnas': ['id', 'fecha', 'tipo', 'cantidad', 'motivo', 'producto_id', 'empleado_id', 'sucursal_id'],
+        'consulta': text("""
+            SELECT id, fecha, tipo, cantidad, motivo, producto_id, empleado_id, sucursal_id
+            FROM movimientos_inventario
+            WHERE id > :id
+            ORDER BY id
+            LIMIT :limite
+        """),
+        'marca_inicial': {'id': 0},
+        'marca': lambda fila: {'id': fila.id},
+        # Por ID no se puede filtrar la fecha en SQL sin saltarse filas: se corta en Python
+        'corte_por_fecha': 'fecha',
+    },
+    'inventario': {
+        'archivo': 'inventario_cambios.csv',
+        'columnas': ['id', 'producto_id', 'sucursal_id', 'cantidad', 'ubicacion', 'fecha_actualizacion'],
+        'consulta': text("""
+            SELECT id, producto_id, sucursal_id, cantidad, ubicacion, fecha_actualizacion
+            FROM inventario
+            WHERE (fecha_actualizacion, id) > (:fecha, :id) AND fecha_actualizacion < :corte
+            ORDER BY fecha_actualizacion, id
+            LIMIT :limite
+        """),
+        'marca_inicial': {'fecha': FECHA_INICIAL, 'id': 0},
+        'marca': lambda fila: {'fecha': fila.fecha_actualizacion.isoformat(), 'id': fila.id},
+    },
+}
+
+# --- Estado persistente (marcas de agua + tamaño confirmado de cada CSV) ---
+
+def _ruta_estado(directorio):
+    return os.path.join(directorio, ARCHIVO_ESTADO)
+
+def cargar_estado(directorio):
+    """Lee el estado guardado; si no existe, retorna un estado vacío."""
+    try:
+        with open(_ruta_estado(directorio), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def guardar_estado(directorio, estado):
+    """Escribe el estado de forma atómica (archivo temporal + fsync + os.replace)."""
+    ruta = _ruta_estado(directorio)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+    # fsync del directorio para que el rename sobreviva a un corte de energía
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(directorio, os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def _preparar_archivo(ruta, columnas, bytes_confirmados):
+    """
+    Deja el CSV en su último tamaño confirmado y retorna ese tamaño.
+    Si el consumidor movió o borró el archivo, se empieza uno nuevo con encabezado. Si el
+    encabezado cambió (se agregaron columnas), el archivo anterior se renombra y se empieza otro.
+    """
+    if os.path.exists(ruta):
+        with open(ruta, 'rb') as f:
+            encabezado = f.readline()
+        if encabezado and encabezado != _a_csv([columnas]):
+            base, extension = os.path.splitext(ruta)
+            anterior = f"{base}.anterior-{datetime.now():%Y%m%d%H%M%S}{extension}"
+            os.replace(ruta, anterior)
+            print(f"⚠️ Cambiaron las columnas de '{ruta}'; el archivo anterior quedó como '{anterior}'.")
+    if not os.path.exists(ruta) or os.path.getsize(ruta) < bytes_confirmados:
+        with open(ruta, 'wb') as f:
+            f.write(_a_csv([columnas]))
+            f.flush()
+            os.fsync(f.fileno())
+        return os.path.getsize(ruta)
+    if os.path.getsize(ruta) > bytes_confirmados:
+        # Restos de un lote escrito por una ejecución que no llegó a guardar su marca de agua
+        with open(ruta, 'r+b') as f:
+            f.truncate(bytes_confirmados)
+            os.fsync(f.fileno())
+    return bytes_confirmados
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return str(valor)
+
+def _a_csv(filas):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for fila in filas:
+        writer.writerow([_valor_csv(v) for v in fila])
+    return buffer.getvalue().encode('utf-8')
+
+# --- Extracción ---
+
+def exportar_extraccion(session, nombre, directorio, estado, tamano_lote=TAMANO_LOTE, margen_segundos=MARGEN_SEGUNDOS):
+    """Exporta por lotes las filas posteriores a la marca de agua de una extracción."""
+    config = EXTRACCIONES[nombre]
+    ruta = os.path.join(directorio, config['archivo'])
+    estado_extraccion = estado.setdefault(nombre, {'marca': dict(config['marca_inicial']), 'bytes': 0})
+    estado_extraccion['bytes'] = _preparar_archivo(ruta, config['columnas'], estado_extraccion['bytes'])
+    corte = datetime.now() - timedelta(seconds=margen_segundos)
+    total = 0
+
+    while True:
+        parametros = dict(estado_extraccion['marca'], corte=corte, limite=tamano_lote)
+        filas = session.execute(config['consulta'], parametros).all()
+        if 'corte_por_fecha' in config:
+            # Detenerse en la primera fila demasiado reciente (sin saltarla)
+            for i, fila in enumerate(filas):
+                if getattr(fila, config['corte_por_fecha']) >= corte:
+                    filas = filas[:i]
+                    break
+        if not filas:
+            break
+
+        # 1) Agregar el lote al CSV y forzarlo a disco
+        with open(ruta, 'ab') as f:
+            f.write(_a_csv([tuple(fila) for fila in filas]))
+            f.flush()
+            os.fsync(f.fileno())
+            bytes_confirmados = f.tell()
+
+        # 2) Solo entonces avanzar la marca de agua (checkpoint)
+        estado_extraccion['marca'] = config['marca'](filas[-1])
+        estado_extraccion['bytes'] = bytes_confirmados
+        estado_extraccion['ultima_exportacion'] = datetime.now().isoformat()
+        guardar_estado(directorio, estado)
+        total += len(filas)
+
+        if len(filas) < tamano_lote and 'corte_por_fecha' not in config:
+            break
+
+    print(f"✅ {nombre}: {total} filas exportadas a '{ruta}'")
+    return total
+
+def exportar_incremental(directorio=DIRECTORIO_SALIDA, extracciones=None, tamano_lote=TAMANO_LOTE, margen_segundos=MARGEN_SEGUNDOS):
+    """Ejecuta las extracciones indicadas (todas por defecto) y retorna {extraccion: filas}."""
+    os.makedirs(directorio, exist_ok=True)
+    estado = cargar_estado(directorio)
+    session = obtener_session_lectura()
+    resultados = {}
+    try:
+        for nombre in extracciones or EXTRACCIONES:
+            resultados[nombre] = exportar_extraccion(session, nombre, directorio, estado, tamano_lote, margen_segundos)
+        return resultados
+    except Exception as e:
+        print(f"❌ Error en la exportación incremental: {e}")
+        return resultados
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Exportación incremental de ventas, movimientos e inventario.")
+    parser.add_argument('--directorio', default=DIRECTORIO_SALIDA, help="Directorio de los CSV y del estado.")
+    parser.add_argument('--extracciones', nargs='*', choices=list(EXTRACCIONES), help="Extracciones a ejecutar (todas por defecto).")
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Filas (o ventas) por lote.")
+    parser.add_argument('--margen', type=int, default=MARGEN_SEGUNDOS, help="Antigüedad mínima en segundos de las filas exportadas.")
+    args = parser.parse_args()
+    exportar_incremental(args.directorio, args.extracciones, args.lote, args.margen)
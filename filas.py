@@ -0,0 +1,110 @@
+"""
+Filas livianas de solo lectura para los listados y los reportes.
+
+Los listados de app.py cargaban instancias ORM completas de las vistas (con seguimiento en
+el identity map) solo para imprimirlas, y los reportes copiaban cada Row a una tupla. Aquí
+cada fila se mapea a una dataclass con __slots__ (sin __dict__ por instancia) a partir de
+las tuplas crudas del cursor, ejecutando la consulta por Core: no hay identity map, ni
+estado de instancia, ni eventos de carga.
+"""
+from dataclasses import dataclass, fields
+from decimal import Decimal
+from datetime import datetime
+from itertools import starmap
+
+from sqlalchemy import select
+
+from database import VistaProductoDetalle, VistaClienteResumen, VistaEmpleadoResumen
+
+@dataclass(slots=True)
+class FilaProducto:
+    id: int
+    codigo: str
+    nombre_producto: str
+    nombre_categoria: str
+    precio: Decimal
+    stock: int
+    stock_minimo: int
+
+@dataclass(slots=True)
+class FilaCliente:
+    id: int
+    codigo: str
+    nombre_completo: str
+    dni: str
+    telefono: str
+    email: str
+
+@dataclass(slots=True)
+class FilaEmpleado:
+    id: int
+    codigo: str
+    nombre_completo: str
+    nombre_puesto: str
+    salario: Decimal
+    email: str
+
+@dataclass(slots=True)
+class FilaVenta:
+    VentaID: int
+    FechaVenta: datetime
+    TotalVenta: Decimal
+    Sucursal: str
+    EmpleadoNombre: str
+    EmpleadoApellido: str
+    Producto: str
+    Cantidad: int
+    PrecioUnitario: Decimal
+    SubtotalDetalle: Decimal
+
+@dataclass(slots=True)
+class FilaInventario:
+    CodigoProducto: str
+    NombreProducto: str
+    Categoria: str
+    CantidadInventario: int
+    StockTotalProducto: int
+    StockMinimoProducto: int
+    Sucursal: str
+    Ubicacion: str
+
+@dataclass(slots=True)
+class FilaPedido:
+    NumeroPedido: str
+    FechaPedido: datetime
+    TotalPedido: Decimal
+    EstadoPedido: str
+    NombreCliente: str
+    ApellidoCliente: str
+    EmailCliente: str
+    NombreEmpleado: str
+    ApellidoEmpleado: str
+
+def columnas_de(clase):
+    """Nombres de los campos de una clase de fila, en orden."""
+    return [campo.name for campo in fields(clase)]
+
+def leer_filas(session, statement, clase):
+    """
+    Ejecuta la sentencia por Core (sin identity map) y retorna una lista de instancias de
+    `clase`. Las columnas de la sentencia deben venir en el mismo orden que sus campos.
+    """
+    resultado = session.connection().execute(statement)
+    return list(starmap(clase, resultado.tuples()))
+
+# --- Listados de las vistas usadas por app.py ---
+
+VISTAS = {
+    FilaProducto: VistaProductoDetalle,
+    FilaCliente: VistaClienteResumen,
+    FilaEmpleado: VistaEmpleadoResumen,
+}
+
+def consulta_vista(clase):
+    """SELECT de las columnas de la vista que corresponden a los campos de la clase, ordenado por ID."""
+    tabla = VISTAS[clase].__table__
+    return select(*[tabla.c[nombre] for nombre in columnas_de(clase)]).order_by(tabla.c.id)
+
+def listar_vista(session, clase):
+    """Retorna todas las filas de la vista asociada a `clase`."""
+    return leer_filas(session, consulta_vista(clase), clase)
@@ -0,0 +1,614 @@
+"""
+Generador determinista y paralelo de datos de prueba.
+
+A diferencia de `inserts.py`, que llama a Faker por cada campo de cada fila, este
+generador construye una sola vez "pools" de valores de Faker con una semilla fija,
+selecciona valores de esos pools con NumPy de forma vectorizada y reparte la
+generación en procesos worker por bloques de IDs disjuntos.
+
+Cada bloque usa su propio generador aleatorio derivado de (semilla, tabla, bloque),
+por lo que el dataset resultante es idéntico para una misma semilla y escala sin
+importar cuántos workers se utilicen. Así las corridas de benchmark son comparables.
+"""
+import argparse
+import hashlib
+import os
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import insert, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+import escritura_rapida
+from database import (
+    obtener_session,
+    Categoria, Puesto, Departamento, Empleado, Sucursal, Proveedor, Producto, Servicio,
+    Cliente, Pedido, DetallePedido, Factura, Pago, Venta, DetalleVenta, Compra, DetalleCompra,
+    Inventario, MovimientoInventario, ProductoProveedor, ClienteServicio, EmpleadoDepartamento
+)
+from inserts import (
+    NOMBRES_CATEGORIAS, NOMBRES_PUESTOS, NOMBRES_DEPARTAMENTOS, CIUDADES, TIPOS_SERVICIOS,
+    ESTADOS_PEDIDO, ESTADOS_FACTURA, METODOS_PAGO, ESTADOS_COMPRA, TIPOS_MOVIMIENTO,
+    MOTIVOS_MOVIMIENTO, calculate_dni_letter, limpiar_datos
+)
+
+# --- Configuración del generador ---
+
+SEMILLA_POR_DEFECTO = 2025
+# Fecha fija de referencia: usar datetime.now() rompería la reproducibilidad entre corridas
+FECHA_REFERENCIA = datetime(2025, 6, 1)
+TAMANO_POOL = 500 # Valores distintos de Faker por cada tipo de campo
+TAMANO_BLOQUE = 10000 # Filas generadas por cada tarea de worker
+TAMANO_LOTE_INSERT = 5000 # Filas por executemany al insertar
+
+# Cantidad de registros por tabla con escala = 1 (mismas proporciones que inserts.py).
+# Categorías, puestos, departamentos y sucursales son catálogos fijos y no escalan.
+CANTIDADES_BASE = {
+    'empleados': 50,
+    'proveedores': 30,
+    'productos': 200,
+    'servicios': 25,
+    'clientes': 100,
+    'pedidos': 150,
+    'facturas': 120,
+    'ventas': 100,
+    'compras': 60,
+    'detalle_pedidos': 400,
+    'pagos': 80,
+    'detalle_ventas': 250,
+    'detalle_compras': 180,
+    'movimientos_inventario': 200,
+    'producto_proveedor': 150,
+    'cliente_servicio': 100,
+    'empleado_departamento': 80,
+}
+
+# Orden de inserción (respeta claves foráneas y el orden de triggers de inserts.py)
+MODELOS = {
+    'categorias': Categoria,
+    'puestos': Puesto,
+    'departamentos': Departamento,
+    'empleados': Empleado,
+    'sucursales': Sucursal,
+    'proveedores': Proveedor,
+    'productos': Producto,
+    'servicios': Servicio,
+    'clientes': Cliente,
+    'pedidos': Pedido,
+    'detalle_pedidos': DetallePedido,
+    'facturas': Factura,
+    'pagos': Pago,
+    'ventas': Venta,
+    'detalle_ventas': DetalleVenta,
+    'compras': Compra,
+    'detalle_compras': DetalleCompra,
+    'inventario': Inventario,
+    'movimientos_inventario': MovimientoInventario,
+    'producto_proveedor': ProductoProveedor,
+    'cliente_servicio': ClienteServicio,
+    'empleado_departamento': EmpleadoDepartamento,
+}
+ORDEN_TABLAS = list(MODELOS)
+
+# Tablas cuyos IDs asignan los triggers (movimientos) o que se insertan con upsert (inventario):
+# no llevan ID explícito para no chocar con las filas que crean los triggers.
+TABLAS_SIN_ID_EXPLICITO = {'inventario', 'movimientos_inventario', 'producto_proveedor', 'cliente_servicio', 'empleado_departamento'}
+
+# --- Pools de valores de Faker ---
+
+def construir_pools(semilla, tamano=TAMANO_POOL):
+    """Construye una sola vez los pools de valores de Faker usados por todos los workers."""
+    from faker import Faker # Importación diferida: Faker tarda en cargar sus proveedores
+    fake = Faker('es_ES')
+    fake.seed_instance(semilla)
+    return {
+        'nombres': [fake.first_name() for _ in range(tamano)],
+        'apellidos': [fake.last_name() for _ in range(tamano)],
+        'empresas': [fake.company() for _ in range(tamano)],
+        'contactos': [fake.name() for _ in range(tamano)],
+        'frases': [fake.catch_phrase() for _ in range(tamano)],
+        'palabras': [fake.word().title() for _ in range(tamano)],
+        'calles': [fake.street_address() for _ in range(tamano)],
+        'ciudades': [fake.city() for _ in range(tamano)],
+        'provincias': [fake.state() for _ in range(tamano)],
+        'codigos_postales': [fake.postcode() for _ in range(tamano)],
+        'direcciones': [fake.address() for _ in range(tamano)],
+        'dominios': [fake.free_email_domain() for _ in range(tamano)],
+        'referencias': [fake.bothify(text='REF-####-????') for _ in range(tamano)],
+        'textos_100': [fake.text(max_nb_chars=100) for _ in range(tamano)],
+        'textos_150': [fake.text(max_nb_chars=150) for _ in range(tamano)],
+        'textos_200': [fake.text(max_nb_chars=200) for _ in range(tamano)],
+        'textos_300': [fake.text(max_nb_chars=300) for _ in range(tamano)],
+    }
+
+# --- Utilidades vectorizadas ---
+
+# Estado de cada proceso worker (se fija en el initializer del pool)
+_ESTADO = {}
+
+def _inicializar_worker(semilla, pools, contexto):
+    _ESTADO['semilla'] = semilla
+    _ESTADO['pools'] = pools
+    _ESTADO['contexto'] = contexto
+
+def _rng(tabla, bloque):
+    """Generador aleatorio independiente para cada (semilla, tabla, bloque)."""
+    return np.random.default_rng([_ESTADO['semilla'], ORDEN_TABLAS.index(tabla), bloque])
+
+def _elegir(rng, pool, n):
+    """Selecciona n valores de un pool con un solo sorteo vectorizado."""
+    indices = rng.integers(0, len(pool), n)
+    return [pool[i] for i in indices]
+
+def _fechas(rng, n, dias_atras, referencia=FECHA_REFERENCIA):
+    """Fechas uniformes en los `dias_atras` días anteriores a la fecha de referencia."""
+    segundos = rng.integers(0, dias_atras * 86400, n)
+    base = np.datetime64(referencia, 's')
+    return (base - segundos.astype('timedelta64[s]')).tolist()
+
+def _telefonos(rng, n):
+    partes = rng.integers(100, 1000, (n, 3))
+    return [f"+502 {a} {b} {c}" for a, b, c in partes]
+
+def _dnis(ids, desplazamiento):
+    """DNIs únicos derivados del ID (biyección módulo 90.000.000)."""
+    numeros = 10000000 + (ids.astype(np.int64) * 7919 + desplazamiento) % 90000000
+    return [f"{numero}{calculate_dni_letter(int(numero))}" for numero in numeros]
+
+def _slug(valor):
+    """Convierte un texto a ASCII en minúsculas apto para la parte local de un email."""
+    valor = unicodedata.normalize('NFKD', valor).encode('ascii', 'ignore').decode('ascii')
+    return ''.join(c for c in valor.lower() if c.isalnum())
+
+def _emails(nombres, apellidos, ids, dominios):
+    return [f"{_slug(n)}.{_slug(a)}.{i}@{d}" for n, a, i, d in zip(nombres, apellidos, ids, dominios)]
+
+def _montos(rng, n, minimo, maximo):
+    return np.round(rng.uniform(minimo, maximo, n), 2)
+
+# --- Generadores por tabla (se ejecutan dentro de los workers) ---
+
+def _generar_empleados(inicio, fin, rng):
+    pools, n_total = _ESTADO['pools'], _ESTADO['contexto']['n']
+    n = fin - inicio
+    ids = np.arange(inicio + 1, fin + 1)
+    nombres = _elegir(rng, pools['nombres'], n)
+    apellidos = _elegir(rng, pools['apellidos'], n)
+    dominios = _elegir(rng, pools['dominios'], n)
+    return [
+        dict(id=int(i), codigo=f"EMP{i:03d}", nombre=nom, apellido=ape, dni=dni, telefono=tel,
+             email=email, salario=int(sal), fecha_ingreso=fecha.date(), activo=bool(act), puesto_id=int(puesto))
+        for i, nom, ape, dni, tel, email, sal, fecha, act, puesto in zip(
+            ids, nombres, apellidos, _dnis(ids, 0), _telefonos(rng, n),
+            _emails(nombres, apellidos, ids, dominios), rng.integers(1000, 5001, n),
+            _fechas(rng, n, 730), rng.integers(0, 2, n), rng.integers(1, n_total['puestos'] + 1, n)
+        )
+    ]
+
+def _generar_proveedores(inicio, fin, rng):
+    pools = _ESTADO['pools']
+    n = fin - inicio
+    ids = np.arange(inicio + 1, fin + 1)
+    return [
+        dict(id=int(i), codigo=f"PROV{i:03d}", nombre=empresa, contacto=contacto, telefono=tel,
+             email=f"contacto{i}@{dominio}",
+             direccion={"calle": calle, "ciudad": ciudad, "codigo_postal": cp},
+             fecha_registro=fecha.date(), activo=True)
+        for i, empresa, contacto, tel, dominio, calle, ciudad, cp, fecha in zip(
+            ids, _elegir(rng, pools['empresas'], n), _elegir(rng, pools['contactos'], n),
+            _telefonos(rng, n), _elegir(rng, pools['dominios'], n), _elegir(rng, pools['calles'], n),
+            _elegir(rng, pools['ciudades'], n), _elegir(rng, pools['codigos_postales'], n),
+            _fechas(rng, n, 365)
+        )
+    ]
+
+def _generar_productos(inicio, fin, rng):
+    pools, n_total = _ESTADO['pools'], _ESTADO['contexto']['n']
+    n = fin - inicio
+    ids = np.arange(inicio + 1, fin + 1)
+    return [
+        dict(id=int(i), codigo=f"PROD{i:06d}", nombre=nombre, descripcion=desc, precio=float(precio),
+             stock=int(stock), stock_minimo=int(minimo), categoria_id=int(cat), fecha_creacion=fecha,
+             activo=bool(act))
+        for i, nombre, desc, precio, stock, minimo, cat, fecha, act in zip(
+            ids, _elegir(rng, pools['frases'], n), _elegir(rng, pools['textos_300'], n),
+            _montos(rng, n, 10.0, 500.0), rng.integers(0, 101, n), rng.integers(5, 16, n),
+            rng.integers(1, n_total['categorias'] + 1, n), _fechas(rng, n, 180), rng.integers(0, 2, n)
+        )
+    ]
+
+def _generar_servicios(inicio, fin, rng):
+    pools = _ESTADO['pools']
+    n = fin - inicio
+    ids = np.arange(inicio + 1, fin + 1)
+    return [
+        dict(id=int(i), codigo=f"SERV{i:03d}", nombre=f"{tipo} {palabra}", descripcion=desc,
+             costo=f"${costo}.{centavos:02d}", duracion=int(duracion), activo=True)
+        for i, tipo, palabra, desc, costo, centavos, duracion in zip(
+            ids, _elegir(rng, TIPOS_SERVICIOS, n), _elegir(rng, pools['palabras'], n),
+            _elegir(rng, pools['textos_200'], n), rng.integers(50, 301, n), rng.integers(0, 100, n),
+            rng.integers(1, 9, n)
+        )
+    ]
+
+def _generar_clientes(inicio, fin, rng):
+    pools = _ESTADO['pools']
+    n = fin - inicio
+    ids = np.arange(inicio + 1, fin + 1)
+    nombres = _elegir(rng, pools['nombres'], n)
+    apellidos = _elegir(rng, pools['apellidos'], n)
+    dominios = _elegir(rng, pools['dominios'], n)
+    # Edad entre 18 y 80 años respecto a la fecha de referencia
+    nacimientos = _fechas(rng, n, 62 * 365, FECHA_REFERENCIA.replace(year=FECHA_REFERENCIA.year - 18))
+    return [
+        dict(id=int(i), codigo=f"CLI{i:06d}", nombre=nom, apellido=ape, dni=dni, telefono=tel, email=email,
+             direccion={"calle": calle, "ciudad": ciudad, "departamento": prov, "codigo_postal": cp},
+             fecha_nacimiento=nac.date(), fecha_registro=reg.date(), activo=True)
+        for i, nom, ape, dni, tel, email, calle, ciudad, prov, cp, nac, reg in zip(
+            ids, nombres, apellidos, _dnis(ids, 4567), _telefonos(rng, n),
+            _emails(nombres, apellidos, ids, dominios), _elegir(rng, pools['calles'], n),
+            _elegir(rng, pools['ciudades'], n), _elegir(rng, pools['provincias'], n),
+            _elegir(rng, pools['codigos_postales'], n), nacimientos, _fechas(rng, n, 730)
+        )
+    ]
+
+def _generar_pedidos(inicio, fin, rng):
+    pools, n_total = _ESTADO['pools'], _ESTADO['contexto']['n']
+    n = fin - inicio
+    ids = np.arange(inicio + 1, fin + 1)
+    con_observaciones = rng.integers(0, 2, n)
+    return [
+        dict(id=int(i), numero=f"PED{i:06d}", fecha=fecha, estado=estado, total=0,
+             observaciones=obs if con_obs else None, cliente_id=int(cli), empleado_id=int(emp))
+        for i, fecha, estado, obs, con_obs, cli, emp in zip(
+            ids, _fechas(rng, n, 90), _elegir(rng, ESTADOS_PEDIDO, n), _elegir(rng, pools['textos_100'], n),
+            con_observaciones, rng.integers(1, n_total['clientes'] + 1, n),
+            rng.integers(1, n_total['empleados'] + 1, n)
+        )
+    ]
+
+def _generar_facturas(inicio, fin, rng):
+    n_total = _ESTADO['contexto']['n']
+    n = fin - inicio
+    ids = np.arange(inicio + 1, fin + 1)
+    subtotales = _montos(rng, n, 100.0, 2000.0)
+    impuestos = np.round(subtotales * 0.12, 2) # 12% IVA Guatemala
+    return [
+        dict(id=int(i), numero=f"FAC{i:06d}", fecha=fecha, subtotal=float(sub), impuesto=float(imp),
+             total=round(float(sub + imp), 2), estado=estado, cliente_id=int(cli))
+        for i, fecha, sub, imp, estado, cli in zip(
+            ids, _fechas(rng, n, 60), subtotales, impuestos, _elegir(rng, ESTADOS_FACTURA, n),
+            rng.integers(1, n_total['clientes'] + 1, n)
+        )
+    ]
+
+def _generar_ventas(inicio, fin, rng):
+    n_total = _ESTADO['contexto']['n']
+    n = fin - inicio
+    ids = np.arange(inicio + 1, fin + 1)
+    # El total se calcula después a partir de los detalles generados
+    return [
+        dict(id=int(i), fecha=fecha, total=0, empleado_id=int(emp), sucursal_id=int(suc))
+        for i, fecha, emp, suc in zip(
+            ids, _fechas(rng, n, 60), rng.integers(1, n_total['empleados'] + 1, n),
+            rng.integers(1, n_total['sucursales'] + 1, n)
+        )
+    ]
+
+def _generar_compras(inicio, fin, rng):
+    n_total = _ESTADO['contexto']['n']
+    n = fin - inicio
+    ids = np.arange(inicio + 1, fin + 1)
+    return [
+        dict(id=int(i), numero=f"COM{i:06d}", fecha=fecha, total=0, estado=estado,
+             proveedor_id=int(prov), empleado_id=int(emp))
+        for i, fecha, estado, prov, emp in zip(
+            ids, _fechas(rng, n, 120), _elegir(rng, ESTADOS_COMPRA, n),
+            rng.integers(1, n_total['proveedores'] + 1, n), rng.integers(1, n_total['empleados'] + 1, n)
+        )
+    ]
+
+def _generar_detalles(inicio, fin, rng, tabla_padre, cant_min, cant_max, factor_precio=1.0):
+    """Genera líneas de detalle (pedidos, ventas o compras) con precios del producto elegido."""
+    contexto = _ESTADO['contexto']
+    n = fin - inicio
+    ids = np.arange(inicio + 1, fin + 1)
+    padres = rng.integers(1, contexto['n'][tabla_padre] + 1, n)
+    productos = rng.integers(1, contexto['n']['productos'] + 1, n)
+    cantidades = rng.integers(cant_min, cant_max + 1, n)
+    precios = np.round(contexto['precios'][productos - 1] * factor_precio, 2)
+    return ids, padres, productos, cantidades, precios
+
+def _generar_detalle_pedidos(inicio, fin, rng):
+    ids, pedidos, productos, cantidades, precios = _generar_detalles(inicio, fin, rng, 'pedidos', 1, 5)
+    descuentos = rng.integers(0, 21, len(ids))
+    subtotales = np.round(cantidades * precios * (1 - descuentos / 100), 2)
+    return [
+        dict(id=int(i), pedido_id=int(ped), producto_id=int(prod), cantidad=int(cant),
+             precio_unitario=float(precio), subtotal=float(sub), descuento=int(desc))
+        for i, ped, prod, cant, precio, sub, desc in zip(ids, pedidos, productos, cantidades, precios, subtotales, descuentos)
+    ]
+
+def _generar_detalle_ventas(inicio, fin, rng):
+    ids, ventas, productos, cantidades, precios = _generar_detalles(inicio, fin, rng, 'ventas', 1, 3)
+    subtotales = np.round(cantidades * precios, 2)
+    return [
+        dict(id=int(i), venta_id=int(ven), producto_id=int(prod), cantidad=int(cant),
+             precio_unitario=float(precio), subtotal=float(sub))
+        for i, ven, prod, cant, precio, sub in zip(ids, ventas, productos, cantidades, precios, subtotales)
+    ]
+
+def _generar_detalle_compras(inicio, fin, rng):
+    ids, compras, productos, cantidades, precios = _generar_detalles(inicio, fin, rng, 'compras', 10, 50, 0.7)
+    subtotales = np.round(cantidades * precios, 2)
+    return [
+        dict(id=int(i), compra_id=int(com), producto_id=int(prod), cantidad=int(cant),
+             precio_unitario=float(precio), subtotal=float(sub))
+        for i, com, prod, cant, precio, sub in zip(ids, compras, productos, cantidades, precios, subtotales)
+    ]
+
+def _generar_pagos(inicio, fin, rng):
+    contexto = _ESTADO['contexto']
+    n = fin - inicio
+    ids = np.arange(inicio + 1, fin + 1)
+    facturas = rng.integers(1, contexto['n']['facturas'] + 1, n)
+    totales = contexto['facturas_total'][facturas - 1]
+    montos = np.round(rng.uniform(np.minimum(50.0, totales), totales), 2)
+    # Fecha del pago entre la fecha de la factura y la fecha de referencia
+    desde = contexto['facturas_fecha'][facturas - 1]
+    rango = (np.datetime64(FECHA_REFERENCIA, 's') - desde).astype(np.int64)
+    fechas = (desde + (rng.random(n) * rango).astype('timedelta64[s]')).tolist()
+    return [
+        dict(id=int(i), numero=f"PAG{i:06d}", fecha=fecha, monto=float(monto), metodo=metodo,
+             referencia=ref, factura_id=int(fac))
+        for i, fecha, monto, metodo, ref, fac in zip(
+            ids, fechas, montos, _elegir(rng, METODOS_PAGO, n), _elegir(rng, _ESTADO['pools']['referencias'], n), facturas
+        )
+    ]
+
+def _generar_inventario(inicio, fin, rng):
+    n_total = _ESTADO['contexto']['n']
+    n = fin - inicio
+    # Una entrada por cada par producto x sucursal, indexada linealmente
+    lineal = np.arange(inicio, fin)
+    productos = lineal // n_total['sucursales'] + 1
+    sucursales = lineal % n_total['sucursales'] + 1
+    pasillos = rng.integers(1, 11, (n, 2))
+    return [
+        dict(producto_id=int(prod), sucursal_id=int(suc), cantidad=int(cant),
+             ubicacion=f"Pasillo {p}-Estante {e}", fecha_actualizacion=fecha)
+        for prod, suc, cant, (p, e), fecha in zip(
+            productos, sucursales, rng.integers(0, 101, n), pasillos, _fechas(rng, n, 365)
+        )
+    ]
+
+def _generar_movimientos_inventario(inicio, fin, rng):
+    n_total = _ESTADO['contexto']['n']
+    n = fin - inicio
+    return [
+        dict(fecha=fecha, tipo=tipo, cantidad=int(cant), motivo=motivo, producto_id=int(prod), empleado_id=int(emp), sucursal_id=int(suc))
+        for fecha, tipo, cant, motivo, prod, emp, suc in zip(
+            _fechas(rng, n, 60), _elegir(rng, TIPOS_MOVIMIENTO, n), rng.integers(1, 21, n),
+            _elegir(rng, MOTIVOS_MOVIMIENTO, n), rng.integers(1, n_total['productos'] + 1, n),
+            rng.integers(1, n_total['empleados'] + 1, n), rng.integers(1, n_total['sucursales'] + 1, n)
+        )
+    ]
+
+GENERADORES = {
+    'empleados': _generar_empleados,
+    'proveedores': _generar_proveedores,
+    'productos': _generar_productos,
+    'servicios': _generar_servicios,
+    'clientes': _generar_clientes,
+    'pedidos': _generar_pedidos,
+    'facturas': _generar_facturas,
+    'ventas': _generar_ventas,
+    'compras': _generar_compras,
+    'detalle_pedidos': _generar_detalle_pedidos,
+    'pagos': _generar_pagos,
+    'detalle_ventas': _generar_detalle_ventas,
+    'detalle_compras': _generar_detalle_compras,
+    'inventario': _generar_inventario,
+    'movimientos_inventario': _generar_movimientos_inventario,
+}
+
+def _generar_bloque(tarea):
+    tabla, bloque, inicio, fin = tarea
+    return GENERADORES[tabla](inicio, fin, _rng(tabla, bloque))
+
+# --- Orquestación ---
+
+def _catalogos_fijos(semilla, pools):
+    """Genera en el proceso principal las tablas de catálogo (pocas filas, nombres fijos)."""
+    _inicializar_worker(semilla, pools, {})
+    rng = _rng('categorias', 0)
+    categorias = [
+        dict(id=i, nombre=nombre, descripcion=desc, activa=bool(act))
+        for i, (nombre, desc, act) in enumerate(zip(
+            NOMBRES_CATEGORIAS, _elegir(rng, pools['textos_200'], len(NOMBRES_CATEGORIAS)),
+            rng.integers(0, 2, len(NOMBRES_CATEGORIAS))), 1)
+    ]
+    rng = _rng('puestos', 0)
+    salarios = rng.integers(800, 2001, len(NOMBRES_PUESTOS))
+    puestos = [
+        dict(id=i, nombre=nombre, descripcion=desc, salario_minimo=int(sal),
+             salario_maximo=int(sal + extra), activo=True)
+        for i, (nombre, desc, sal, extra) in enumerate(zip(
+            NOMBRES_PUESTOS, _elegir(rng, pools['textos_150'], len(NOMBRES_PUESTOS)), salarios,
+            rng.integers(500, 1501, len(NOMBRES_PUESTOS))), 1)
+    ]
+    rng = _rng('departamentos', 0)
+    departamentos = [
+        dict(id=i, codigo=f"DEPT{i:03d}", nombre=nombre, descripcion=desc, presupuesto=int(pres), activo=True)
+        for i, (nombre, desc, pres) in enumerate(zip(
+            NOMBRES_DEPARTAMENTOS, _elegir(rng, pools['textos_100'], len(NOMBRES_DEPARTAMENTOS)),
+            rng.integers(10000, 50001, len(NOMBRES_DEPARTAMENTOS))), 1)
+    ]
+    rng = _rng('sucursales', 0)
+    sucursales = [
+        dict(id=i, codigo=f"SUC{i:03d}", nombre=f"Sucursal {ciudad}", direccion=direccion, telefono=tel,
+             email=f"sucursal{_slug(ciudad)}@empresa.com", activa=True)
+        for i, (ciudad, direccion, tel) in enumerate(zip(
+            CIUDADES, _elegir(rng, pools['direcciones'], len(CIUDADES)), _telefonos(rng, len(CIUDADES))), 1)
+    ]
+    return {'categorias': categorias, 'puestos': puestos, 'departamentos': departamentos, 'sucursales': sucursales}
+
+def _pares_unicos(semilla, tabla, n_a, n_b, cantidad):
+    """Sortea `cantidad` pares (a, b) distintos sin reemplazo, de forma vectorizada."""
+    rng = np.random.default_rng([semilla, ORDEN_TABLAS.index(tabla), 0])
+    lineales = rng.choice(n_a * n_b, size=min(cantidad, n_a * n_b), replace=False)
+    return lineales // n_b + 1, lineales % n_b + 1
+
+def _ejecutar_etapa(tablas, cantidades, semilla, pools, contexto, workers):
+    """Genera las tablas dadas en bloques de IDs disjuntos, en paralelo si workers > 1."""
+    tareas = [
+        (tabla, bloque, inicio, min(inicio + TAMANO_BLOQUE, cantidades[tabla]))
+        for tabla in tablas
+        for bloque, inicio in enumerate(range(0, cantidades[tabla], TAMANO_BLOQUE))
+    ]
+    if workers <= 1:
+        _inicializar_worker(semilla, pools, contexto)
+        resultados = [_generar_bloque(tarea) for tarea in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                                 initargs=(semilla, pools, contexto)) as executor:
+            resultados = list(executor.map(_generar_bloque, tareas))
+    # executor.map conserva el orden de las tareas, por lo que el resultado no depende de los workers
+    dataset = {tabla: [] for tabla in tablas}
+    for (tabla, _, _, _), filas in zip(tareas, resultados):
+        dataset[tabla].extend(filas)
+    return dataset
+
+def construir_dataset(semilla=SEMILLA_POR_DEFECTO, escala=1.0, workers=None):
+    """
+    Construye en memoria el dataset completo como {tabla: [filas]}.
+    Para una misma semilla y escala el resultado es idéntico sin importar el número de workers.
+    """
+    workers = workers or os.cpu_count() or 1
+    pools = construir_pools(semilla)
+    dataset = _catalogos_fijos(semilla, pools)
+
+    cantidades = {tabla: max(1, round(base * escala)) for tabla, base in CANTIDADES_BASE.items()}
+    cantidades.update({tabla: len(filas) for tabla, filas in dataset.items()})
+    cantidades['inventario'] = cantidades['productos'] * cantidades['sucursales']
+    contexto = {'n': cantidades}
+
+    # Etapa 1: entidades que solo dependen de los catálogos fijos
+    dataset.update(_ejecutar_etapa(
+        ['empleados', 'proveedores', 'productos', 'servicios', 'clientes', 'pedidos', 'facturas', 'ventas', 'compras'],
+        cantidades, semilla, pools, contexto, workers
+    ))
+
+    # Etapa 2: detalles y pagos, que necesitan precios de productos y totales/fechas de facturas
+    contexto['precios'] = np.array([p['precio'] for p in dataset['productos']])
+    contexto['facturas_total'] = np.array([f['total'] for f in dataset['facturas']])
+    contexto['facturas_fecha'] = np.array([f['fecha'] for f in dataset['facturas']], dtype='datetime64[s]')
+    dataset.update(_ejecutar_etapa(
+        ['detalle_pedidos', 'pagos', 'detalle_ventas', 'detalle_compras', 'inventario', 'movimientos_inventario'],
+        cantidades, semilla, pools, contexto, workers
+    ))
+
+    # El total de cada venta es la suma de sus detalles (bincount vectorizado)
+    venta_ids = np.array([d['venta_id'] for d in dataset['detalle_ventas']])
+    subtotales = np.array([d['subtotal'] for d in dataset['detalle_ventas']])
+    totales = np.round(np.bincount(venta_ids, weights=subtotales, minlength=cantidades['ventas'] + 1), 2)
+    for venta in dataset['ventas']:
+        venta['total'] = float(totales[venta['id']])
+
+    # Relaciones N:M sin duplicados: se sortean pares distintos, sin consultar la base de datos
+    productos, proveedores = _pares_unicos(semilla, 'producto_proveedor', cantidades['productos'], cantidades['proveedores'], cantidades['producto_proveedor'])
+    dataset['producto_proveedor'] = [dict(producto_id=int(a), proveedor_id=int(b)) for a, b in zip(productos, proveedores)]
+
+    clientes, servicios = _pares_unicos(semilla, 'cliente_servicio', cantidades['clientes'], cantidades['servicios'], cantidades['cliente_servicio'])
+    _inicializar_worker(semilla, pools, contexto)
+    fechas = _fechas(_rng('cliente_servicio', 1), len(clientes), 365)
+    dataset['cliente_servicio'] = [
+        dict(cliente_id=int(a), servicio_id=int(b), fecha_contratacion=f) for a, b, f in zip(clientes, servicios, fechas)
+    ]
+
+    empleados, departamentos = _pares_unicos(semilla, 'empleado_departamento', cantidades['empleados'], cantidades['departamentos'], cantidades['empleado_departamento'])
+    dataset['empleado_departamento'] = [dict(empleado_id=int(a), departamento_id=int(b)) for a, b in zip(empleados, departamentos)]
+
+    return dataset
+
+def huella_dataset(dataset):
+    """Retorna un hash SHA-256 del dataset, útil para verificar que dos corridas son idénticas."""
+    h = hashlib.sha256()
+    for tabla in ORDEN_TABLAS:
+        for fila in dataset.get(tabla, []):
+            h.update(repr(sorted(fila.items())).encode('utf-8'))
+    return h.hexdigest()
+
+def _sincronizar_secuencias(session):
+    """Ajusta las secuencias SERIAL tras insertar con IDs explícitos."""
+    for tabla in ORDEN_TABLAS:
+        if tabla in TABLAS_SIN_ID_EXPLICITO:
+            continue
+        session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {tabla}"
+        ))
+
+def insertar_dataset(dataset, tamano_lote=TAMANO_LOTE_INSERT):
+    """Inserta el dataset por lotes (executemany, o COPY binario con psycopg 3) en una única transacción."""
+    session = obtener_session()
+    try:
+        for tabla in ORDEN_TABLAS:
+            filas = dataset.get(tabla, [])
+            if not filas:
+                continue
+            modelo_tabla = MODELOS[tabla].__table__
+            if tabla == 'inventario':
+                # Las compras ya crearon entradas de inventario por trigger: se actualizan
+                stmt = pg_insert(modelo_tabla)
+                stmt = stmt.on_conflict_do_update(
+                    constraint='uq_producto_sucursal_inventario',
+                    set_=dict(
+                        cantidad=stmt.excluded.cantidad,
+                        ubicacion=stmt.excluded.ubicacion,
+                        fecha_actualizacion=stmt.excluded.fecha_actualizacion
+                    )
+                )
+            else:
+                stmt = insert(modelo_tabla)
+            # Con psycopg 3 las tablas sin upsert van por COPY binario (ver escritura_rapida.py)
+            copiar = tabla != 'inventario' and escritura_rapida.copia_binaria_disponible(session.connection())
+            for i in range(0, len(filas), tamano_lote):
+                if copiar:
+                    escritura_rapida.copiar_filas(session.connection(), tabla, filas[i:i + tamano_lote])
+                else:
+                    session.execute(stmt, filas[i:i + tamano_lote])
+            print(f"✅ {len(filas)} registros insertados en {tabla}")
+
+        _sincronizar_secuencias(session)
+        session.commit()
+        return True
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error al insertar el dataset: {e}")
+        return False
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generador determinista y paralelo de datos de prueba.")
+    parser.add_argument('--semilla', type=int, default=SEMILLA_POR_DEFECTO, help="Semilla para Faker y NumPy.")
+    parser.add_argument('--escala', type=float, default=1.0, help="Multiplicador de la cantidad de registros.")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos worker (por defecto, uno por CPU).")
+    parser.add_argument('--limpiar', action='store_true', help="Elimina los datos existentes antes de insertar.")
+    parser.add_argument('--solo-huella', action='store_true', help="Genera el dataset e imprime su huella sin insertarlo.")
+    args = parser.parse_args()
+
+    inicio = datetime.now()
+    print(f"🔄 Generando dataset (semilla={args.semilla}, escala={args.escala})...")
+    dataset = construir_dataset(args.semilla, args.escala, args.workers)
+    total = sum(len(filas) for filas in dataset.values())
+    print(f"✅ {total} registros generados en {(datetime.now() - inicio).total_seconds():.2f}s")
+    print(f"🔑 Huella del dataset: {huella_dataset(dataset)}")
+
+    if not args.solo_huella:
+        if args.limpiar and not limpiar_datos():
+            print("La limpieza falló. Abortando la inserción.")
+        elif insertar_dataset(dataset):
+            print("🎉 Dataset insertado exitosamente!")
@@ -0,0 +1,314 @@
+"""
+Importación masiva de Productos, Clientes y Empleados desde CSV o Excel (XLSX).
+
+El archivo se lee por lotes (sin cargarlo completo en memoria). Cada lote se valida en
+Python con las mismas reglas de los TypeDecorators (TipoDNI, TipoEmail, TipoTelefono) y
+de los CHECK de las tablas; los nombres de categoría/puesto se resuelven con la caché de
+referencia (una sola consulta para todo el archivo). Las filas válidas se insertan con
+INSERT ... ON CONFLICT (codigo) DO UPDATE en una sola sentencia por lote (con psycopg 3, tras
+un COPY binario a una tabla temporal), y las inválidas se escriben en un archivo de rechazos
+junto con el motivo. Una celda vacía toma el valor por defecto de la columna al insertar,
+pero no pisa el valor guardado de un código que ya existe.
+"""
+import csv
+import itertools
+import os
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.types import TypeDecorator
+
+import cache_referencia
+import escritura_rapida
+from database import obtener_session, Producto, Cliente, Empleado
+
+TAMANO_LOTE = 5000
+
+# Columnas aceptadas por entidad. 'referencia' indica la columna del archivo con el nombre
+# de la categoría/puesto, la tabla cacheada donde se busca y la FK que se completa.
+ENTIDADES = {
+    'productos': {
+        'modelo': Producto,
+        'obligatorias': ['codigo', 'nombre', 'precio'],
+        'opcionales': ['descripcion', 'stock', 'stock_minimo', 'activo'],
+        'referencia': ('categoria', 'categorias', 'categoria_id'),
+    },
+    'clientes': {
+        'modelo': Cliente,
+        'obligatorias': ['codigo', 'nombre', 'dni'],
+        'opcionales': ['apellido', 'telefono', 'email', 'fecha_nacimiento', 'activo'],
+        'referencia': None,
+    },
+    'empleados': {
+        'modelo': Empleado,
+        'obligatorias': ['codigo', 'nombre', 'dni', 'salario'],
+        'opcionales': ['apellido', 'telefono', 'email', 'fecha_ingreso', 'activo'],
+        'referencia': ('puesto', 'puestos', 'puesto_id'),
+    },
+}
+
+_VALORES_VERDADEROS = {'1', 's', 'si', 'sí', 'true', 'verdadero', 'x'}
+_VALORES_FALSOS = {'0', 'n', 'no', 'false', 'falso'}
+_DIALECTO = postgresql.dialect()
+
+class FilaInvalida(ValueError):
+    """Una fila del archivo no cumple las reglas de la entidad."""
+
+# --- Lectura por lotes ---
+
+def _leer_csv(ruta, tamano_lote):
+    with open(ruta, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        numero = itertools.count(2) # La fila 1 es el encabezado
+        while True:
+            lote = [(next(numero), fila) for fila in itertools.islice(reader, tamano_lote)]
+            if not lote:
+                return
+            yield lote
+
+def _leer_xlsx(ruta, tamano_lote):
+    from openpyxl import load_workbook # Solo se carga si el archivo es Excel
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = [str(valor).strip() if valor is not None else '' for valor in next(filas, ())]
+        numero = itertools.count(2)
+        while True:
+            lote = [(next(numero), dict(zip(encabezado, valores))) for valores in itertools.islice(filas, tamano_lote)]
+            if not lote:
+                return
+            yield lote
+    finally:
+        libro.close()
+
+def leer_por_lotes(ruta, tamano_lote=TAMANO_LOTE):
+    """Genera lotes [(numero_de_fila, {columna: valor}), ...] de un CSV o XLSX."""
+    if ruta.lower().endswith(('.xlsx', '.xlsm')):
+        return _leer_xlsx(ruta, tamano_lote)
+    return _leer_csv(ruta, tamano_lote)
+
+# --- Validación ---
+
+def _texto(valor):
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+def _convertir(columna, valor):
+    """Convierte el valor crudo del archivo al tipo de la columna y aplica su validación."""
+    if isinstance(columna.type, TypeDecorator):
+        # Mismas reglas (y normalización) que al guardar a través del ORM
+        return columna.type.process_bind_param(_texto(valor), _DIALECTO)
+    tipo = columna.type.python_type
+    if tipo is str:
+        valor = _texto(valor)
+        if valor is not None and columna.type.length and len(valor) > columna.type.length:
+            raise FilaInvalida(f"'{columna.name}' supera los {columna.type.length} caracteres")
+        return valor
+    if isinstance(valor, str):
+        valor = valor.strip()
+    if valor in (None, ''):
+        return None
+    try:
+        if tipo is Decimal:
+            return Decimal(str(valor))
+        if tipo is int:
+            return int(Decimal(str(valor)))
+        if tipo is bool:
+            texto = str(valor).strip().lower()
+            if texto in _VALORES_VERDADEROS:
+                return True
+            if texto in _VALORES_FALSOS:
+                return False
+            raise ValueError
+        if tipo is date:
+            return valor.date() if isinstance(valor, datetime) else valor if isinstance(valor, date) else date.fromisoformat(valor)
+        if tipo is datetime:
+            return valor if isinstance(valor, datetime) else datetime.fromisoformat(str(valor))
+    except (ValueError, InvalidOperation):
+        raise FilaInvalida(f"valor inválido para '{columna.name}': {valor!r}")
+    return valor
+
+def _verificar_reglas(entidad, registro):
+    """Replica en Python los CHECK de la tabla para rechazar la fila antes de enviarla."""
+    hoy = date.today()
+    if entidad == 'productos':
+        if registro['precio'] is not None and registro['precio'] <= 0:
+            raise FilaInvalida("el precio debe ser mayor que 0")
+        for campo in ('stock', 'stock_minimo'):
+            if registro.get(campo) is not None and registro[campo] < 0:
+                raise FilaInvalida(f"'{campo}' no puede ser negativo")
+    elif entidad == 'clientes':
+        if registro.get('fecha_nacimiento') and registro['fecha_nacimiento'] > hoy:
+            raise FilaInvalida("la fecha de nacimiento no puede ser futura")
+    elif entidad == 'empleados':
+        if registro['salario'] is not None and registro['salario'] < 0:
+            raise FilaInvalida("el salario no puede ser negativo")
+        if registro.get('fecha_ingreso') and registro['fecha_ingreso'] > datetime.now():
+            raise FilaInvalida("la fecha de ingreso no puede ser futura")
+
+def validar_lote(entidad, columnas, lote):
+    """
+    Valida y convierte un lote de filas. Retorna (registros_validos, rechazos), donde cada
+    registro es (numero_de_fila, fila_original, {columna: valor}) y cada rechazo
+    (numero_de_fila, fila_original, motivo).
+    """
+    config = ENTIDADES[entidad]
+    tabla = config['modelo'].__table__
+    validos, rechazos = [], []
+    for numero, fila in lote:
+        try:
+            registro = {}
+            for nombre in columnas:
+                columna = tabla.c[nombre]
+                valor = _convertir(columna, fila.get(nombre))
+                if valor is None:
+                    # Una celda vacía toma el valor por defecto de la columna, si lo tiene (solo al
+                    # insertar: _columnas_actualizadas la deja fuera del UPDATE de un código existente)
+                    if columna.default is not None and columna.default.is_scalar:
+                        valor = columna.default.arg
+                    elif columna.default is not None and columna.default.is_callable:
+                        valor = columna.default.arg(None)
+                    elif nombre in config['obligatorias'] or not columna.nullable:
+                        raise FilaInvalida(f"falta el valor obligatorio '{nombre}'")
+                registro[nombre] = valor
+            if config['referencia']:
+                columna, tabla_ref, fk = config['referencia']
+                nombre_ref = _texto(fila.get(columna))
+                if nombre_ref is None:
+                    raise FilaInvalida(f"falta el valor obligatorio '{columna}'")
+                referencia = cache_referencia.buscar_por_nombre(tabla_ref, nombre_ref)
+                if referencia is None:
+                    raise FilaInvalida(f"{columna} '{nombre_ref}' no existe")
+                registro[fk] = referencia.id
+            _verificar_reglas(entidad, registro)
+            validos.append((numero, fila, registro))
+        except ValueError as e: # Incluye FilaInvalida y los errores de los TypeDecorators
+            rechazos.append((numero, fila, str(e)))
+    return validos, rechazos
+
+def _deduplicar(validos):
+    """
+    ON CONFLICT no puede actualizar dos veces la misma fila en una sentencia: si un código
+    se repite dentro del lote se conserva su última aparición y las anteriores se rechazan.
+    """
+    ultimos = {}
+    rechazos = []
+    for numero, fila, registro in validos:
+        anterior = ultimos.get(registro['codigo'])
+        if anterior:
+            rechazos.append((anterior[0], anterior[1], f"código '{registro['codigo']}' repetido más adelante (fila {numero})"))
+        ultimos[registro['codigo']] = (numero, fila, registro)
+    return list(ultimos.values()), rechazos
+
+# --- Escritura ---
+
+def _columnas_actualizadas(columnas, fila):
+    """
+    Columnas que un código ya existente actualiza: las que la fila trae con valor. Una celda
+    vacía no reemplaza lo guardado (no reactiva un producto ni reinicia su stock).
+    """
+    return tuple(columna for columna in columnas
+                 if columna != 'codigo' and (columna not in fila or _texto(fila.get(columna)) is not None))
+
+def _sentencia_upsert(modelo, actualizar):
+    stmt = pg_insert(modelo.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=['codigo'],
+        set_={columna: stmt.excluded[columna] for columna in actualizar},
+    )
+
+def _escribir_lote(session, modelo, columnas, validos):
+    """
+    Inserta/actualiza el lote con una sentencia por cada conjunto de columnas informadas
+    (normalmente una sola). Si falla (por ejemplo, un DNI o email ya usado por otro código),
+    reintenta fila por fila con SAVEPOINTs para aislar las culpables. Retorna (filas_escritas, rechazos).
+    """
+    grupos = {}
+    for numero, fila, registro in validos:
+        grupos.setdefault(_columnas_actualizadas(columnas, fila), []).append(registro)
+    try:
+        conn = session.connection()
+        for actualizar, registros in grupos.items():
+            if escritura_rapida.copia_binaria_disponible(conn):
+                # psycopg 3: COPY binario a una temporal y un solo INSERT ... ON CONFLICT
+                escritura_rapida.upsert_con_copy(conn, modelo.__tablename__, registros, 'codigo', actualizar=actualizar)
+            else:
+                session.execute(_sentencia_upsert(modelo, actualizar), registros)
+        session.commit()
+        return len(validos), []
+    except DBAPIError:
+        session.rollback()
+
+    escritas, rechazos = 0, []
+    for numero, fila, registro in validos:
+        savepoint = session.begin_nested()
+        try:
+            session.execute(_sentencia_upsert(modelo, _columnas_actualizadas(columnas, fila)), [registro])
+            savepoint.commit()
+            escritas += 1
+        except DBAPIError as e:
+            savepoint.rollback()
+            rechazos.append((numero, fila, str(e.orig).strip().splitlines()[0]))
+    session.commit()
+    return escritas, rechazos
+
+def importar(entidad, ruta, tamano_lote=TAMANO_LOTE, ruta_rechazos=None):
+    """
+    Importa un archivo CSV/XLSX a la entidad indicada ('productos', 'clientes' o 'empleados').
+    Retorna {'leidas': n, 'importadas': n, 'rechazadas': n}, o None si no se pudo importar.
+    """
+    config = ENTIDADES[entidad]
+    ruta_rechazos = ruta_rechazos or f"{os.path.splitext(ruta)[0]}_rechazos.csv"
+    resumen = {'leidas': 0, 'importadas': 0, 'rechazadas': 0}
+    session = obtener_session()
+    archivo_rechazos = None
+    try:
+        columnas = columnas_upsert = writer = None
+        for lote in leer_por_lotes(ruta, tamano_lote):
+            if columnas is None:
+                encabezado = list(lote[0][1].keys())
+                faltantes = [c for c in config['obligatorias'] if c not in encabezado]
+                if config['referencia'] and config['referencia'][0] not in encabezado:
+                    faltantes.append(config['referencia'][0])
+                if faltantes:
+                    print(f"❌ Faltan columnas obligatorias en '{ruta}': {', '.join(faltantes)}")
+                    return None
+                # Solo se escriben (y actualizan) las columnas presentes en el archivo
+                columnas = config['obligatorias'] + [c for c in config['opcionales'] if c in encabezado]
+                columnas_upsert = columnas + ([config['referencia'][2]] if config['referencia'] else [])
+                archivo_rechazos = open(ruta_rechazos, 'w', newline='', encoding='utf-8')
+                writer = csv.writer(archivo_rechazos)
+                writer.writerow(['fila', 'motivo'] + encabezado)
+
+            validos, rechazos = validar_lote(entidad, columnas, lote)
+            validos, repetidos = _deduplicar(validos)
+            escritas, fallidas = _escribir_lote(session, config['modelo'], columnas_upsert, validos) if validos else (0, [])
+
+            for numero, fila, motivo in sorted(rechazos + repetidos + fallidas, key=lambda r: r[0]):
+                writer.writerow([numero, motivo] + ['' if fila.get(c) is None else fila.get(c) for c in encabezado])
+            resumen['leidas'] += len(lote)
+            resumen['importadas'] += escritas
+            resumen['rechazadas'] += len(rechazos) + len(repetidos) + len(fallidas)
+            print(f"  ... {resumen['leidas']} filas leídas, {resumen['importadas']} importadas, {resumen['rechazadas']} rechazadas")
+
+        print(f"✅ Importación de {entidad} terminada: {resumen['importadas']} de {resumen['leidas']} filas importadas.")
+        if resumen['rechazadas']:
+            print(f"⚠️ {resumen['rechazadas']} filas rechazadas, detalle en '{ruta_rechazos}'")
+        elif archivo_rechazos:
+            archivo_rechazos.close()
+            archivo_rechazos = None
+            os.remove(ruta_rechazos)
+        return resumen
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error al importar {entidad} desde '{ruta}': {e}")
+        return None
+    finally:
+        if archivo_rechazos:
+            archivo_rechazos.close()
+        session.close()
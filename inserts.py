@@ -1,13 +1,61 @@
 from sqlalchemy.dialects.postgresql import insert 
-from faker import Faker
 from database import * 
 from database import Inventario 
 import random
 from datetime import datetime, timedelta
 import re 
 
-# Configurar Faker en español
-fake = Faker('es_ES')
+# Configurar Faker en español. La instancia se crea en el primer uso: generador.py
+# importa este módulo solo por sus catálogos y no necesita cargar Faker por ello.
+class _FakerDiferido:
+    _instancia = None
+
+    def __getattr__(self, nombre):
+        if _FakerDiferido._instancia is None:
+            from faker import Faker
+            _FakerDiferido._instancia = Faker('es_ES')
+        return getattr(_FakerDiferido._instancia, nombre)
+
+fake = _FakerDiferido()
+
+# --- Catálogos fijos usados para generar datos de prueba ---
+
+NOMBRES_CATEGORIAS = [
+    'Electrónicos', 'Ropa', 'Hogar', 'Deportes', 'Libros',
+    'Juguetes', 'Automóviles', 'Jardinería', 'Cocina', 'Belleza',
+    'Música', 'Películas', 'Salud', 'Mascotas', 'Oficina',
+    'Construcción', 'Arte', 'Viajes', 'Alimentación', 'Tecnología'
+]
+
+NOMBRES_PUESTOS = [
+    'Gerente General', 'Vendedor', 'Cajero', 'Almacenero', 'Contador',
+    'Desarrollador', 'Diseñador', 'Marketing', 'Recursos Humanos', 'Seguridad',
+    'Limpieza', 'Mantenimiento', 'Recepcionista', 'Supervisor', 'Analista'
+]
+
+NOMBRES_DEPARTAMENTOS = [
+    'Ventas', 'Administración', 'Recursos Humanos', 'Contabilidad', 'Marketing',
+    'Sistemas', 'Logística', 'Compras', 'Atención al Cliente', 'Gerencia'
+]
+
+CIUDADES = ['Guatemala', 'Quetzaltenango', 'Escuintla', 'Mazatenango', 'Cobán', 'Huehuetenango', 'Zacapa', 'Retalhuleu']
+
+TIPOS_SERVICIOS = [
+    'Instalación', 'Mantenimiento', 'Reparación', 'Consultoría', 'Capacitación',
+    'Soporte Técnico', 'Garantía Extendida', 'Configuración', 'Actualización', 'Limpieza'
+]
+
+ESTADOS_PEDIDO = ['pendiente', 'procesando', 'completado', 'cancelado']
+
+ESTADOS_FACTURA = ['pendiente', 'pagada', 'vencida', 'anulada']
+
+METODOS_PAGO = ['efectivo', 'tarjeta', 'transferencia', 'cheque']
+
+ESTADOS_COMPRA = ['pendiente', 'recibida', 'cancelada']
+
+TIPOS_MOVIMIENTO = ['entrada', 'salida', 'ajuste']
+
+MOTIVOS_MOVIMIENTO = ['Venta', 'Compra', 'Devolución', 'Ajuste de inventario', 'Producto dañado', 'Traslado']
 
 def calculate_dni_letter(dni_numbers):
     """Calcula la letra de control para un DNI español."""
@@ -44,13 +92,7 @@ def generar_datos_prueba():
         
         # 1. CATEGORÍAS (20 registros)
         print("📁 Creando categorías...")
-        nombres_categorias = [
-            'Electrónicos', 'Ropa', 'Hogar', 'Deportes', 'Libros',
-            'Juguetes', 'Automóviles', 'Jardinería', 'Cocina', 'Belleza',
-            'Música', 'Películas', 'Salud', 'Mascotas', 'Oficina',
-            'Construcción', 'Arte', 'Viajes', 'Alimentación', 'Tecnología'
-        ]
-        for i, nombre in enumerate(nombres_categorias, 1):
+        for i, nombre in enumerate(NOMBRES_CATEGORIAS, 1):
             categoria = Categoria(
                 nombre=nombre,
                 descripcion=fake.text(max_nb_chars=200),
@@ -63,12 +105,7 @@ def generar_datos_prueba():
         
         # 2. PUESTOS DE TRABAJO (15 registros)
         print("💼 Creando puestos...")
-        nombres_puestos = [
-            'Gerente General', 'Vendedor', 'Cajero', 'Almacenero', 'Contador',
-            'Desarrollador', 'Diseñador', 'Marketing', 'Recursos Humanos', 'Seguridad',
-            'Limpieza', 'Mantenimiento', 'Recepcionista', 'Supervisor', 'Analista'
-        ]
-        for nombre in nombres_puestos:
+        for nombre in NOMBRES_PUESTOS:
             salario_min = random.randint(800, 2000)
             puesto = Puesto(
                 nombre=nombre,
@@ -84,11 +121,7 @@ def generar_datos_prueba():
         
         # 3. DEPARTAMENTOS (10 registros)
         print("🏢 Creando departamentos...")
-        nombres_departamentos = [
-            'Ventas', 'Administración', 'Recursos Humanos', 'Contabilidad', 'Marketing',
-            'Sistemas', 'Logística', 'Compras', 'Atención al Cliente', 'Gerencia'
-        ]
-        for i, nombre in enumerate(nombres_departamentos, 1):
+        for i, nombre in enumerate(NOMBRES_DEPARTAMENTOS, 1):
             departamento = Departamento(
                 codigo=f"DEPT{i:03d}",
                 nombre=nombre,
@@ -124,8 +157,7 @@ def generar_datos_prueba():
         
         # 5. SUCURSALES (8 registros)
         print("🏪 Creando sucursales...")
-        ciudades = ['Guatemala', 'Quetzaltenango', 'Escuintla', 'Mazatenango', 'Cobán', 'Huehuetenango', 'Zacapa', 'Retalhuleu']
-        for i, ciudad in enumerate(ciudades, 1):
+        for i, ciudad in enumerate(CIUDADES, 1):
             sucursal = Sucursal(
                 codigo=f"SUC{i:03d}",
                 nombre=f"Sucursal {ciudad}",
@@ -183,16 +215,12 @@ def generar_datos_prueba():
         
         # 8. SERVICIOS (25 registros)
         print("🔧 Creando servicios...")
-        tipos_servicios = [
-            'Instalación', 'Mantenimiento', 'Reparación', 'Consultoría', 'Capacitación',
-            'Soporte Técnico', 'Garantía Extendida', 'Configuración', 'Actualización', 'Limpieza'
-        ]
         for i in range(25):
             costo_value = fake.random_int(min=50, max=300)
             centavos_value = fake.random_int(min=0, max=99)
             servicio = Servicio(
                 codigo=f"SERV{i+1:03d}",
-                nombre=f"{random.choice(tipos_servicios)} {fake.word().title()}",
+                nombre=f"{random.choice(TIPOS_SERVICIOS)} {fake.word().title()}",
                 descripcion=fake.text(max_nb_chars=200),
                 costo=f"${costo_value}.{centavos_value:02d}",
                 duracion=random.randint(1, 8),
@@ -231,13 +259,12 @@ def generar_datos_prueba():
         
         # 10. PEDIDOS (150 registros)
         print("📋 Creando pedidos...")
-        estados_pedido = ['pendiente', 'procesando', 'completado', 'cancelado']
         for i in range(150):
             total = round(random.uniform(50.0, 1000.0), 2)
             pedido = Pedido(
                 numero=f"PED{i+1:06d}",
                 fecha=fake.date_time_between(start_date='-3M', end_date='now'),
-                estado=random.choice(estados_pedido),
+                estado=random.choice(ESTADOS_PEDIDO),
                 total=total,
                 observaciones=fake.text(max_nb_chars=100) if random.choice([True, False]) else None,
                 cliente_id=random.choice(clientes).id,
@@ -270,7 +297,6 @@ def generar_datos_prueba():
         
         # 12. FACTURAS (120 registros)
         print("🧾 Creando facturas...")
-        estados_factura = ['pendiente', 'pagada', 'vencida', 'anulada']
         for i in range(120):
             subtotal = round(random.uniform(100.0, 2000.0), 2)
             impuesto = round(subtotal * 0.12, 2)  # 12% IVA Guatemala
@@ -281,7 +307,7 @@ def generar_datos_prueba():
                 subtotal=subtotal,
                 impuesto=impuesto,
                 total=total,
-                estado=random.choice(estados_factura),
+                estado=random.choice(ESTADOS_FACTURA),
                 cliente_id=random.choice(clientes).id
             )
             facturas.append(factura)
@@ -291,14 +317,13 @@ def generar_datos_prueba():
         
         # 13. PAGOS (80 registros)
         print("💰 Creando pagos...")
-        metodos_pago = ['efectivo', 'tarjeta', 'transferencia', 'cheque']
         for i in range(80):
             factura = random.choice(facturas)
             pago = Pago(
                 numero=f"PAG{i+1:06d}",
                 fecha=fake.date_time_between(start_date=factura.fecha, end_date='now'),
                 monto=round(random.uniform(50.0, float(factura.total)), 2),
-                metodo=random.choice(metodos_pago),
+                metodo=random.choice(METODOS_PAGO),
                 referencia=fake.bothify(text='REF-####-????'),
                 factura_id=factura.id
             )
@@ -341,13 +366,12 @@ def generar_datos_prueba():
         
         # 16. COMPRAS (60 registros)
         print("🛒 Creando compras...")
-        estados_compra = ['pendiente', 'recibida', 'cancelada']
         for i in range(60):
             compra = Compra(
                 numero=f"COM{i+1:06d}",
                 fecha=fake.date_time_between(start_date='-4M', end_date='now'),
                 total=round(random.uniform(200.0, 5000.0), 2),
-                estado=random.choice(estados_compra),
+                estado=random.choice(ESTADOS_COMPRA),
                 proveedor_id=random.choice(proveedores).id,
                 empleado_id=random.choice(empleados).id
             )
@@ -419,17 +443,16 @@ def generar_datos_prueba():
         
         # 19. MOVIMIENTOS DE INVENTARIO (200 registros)
         print("🔄 Creando movimientos de inventario...")
-        tipos_movimiento = ['entrada', 'salida', 'ajuste']
-        motivos = ['Venta', 'Compra', 'Devolución', 'Ajuste de inventario', 'Producto dañado', 'Traslado']
         
         for i in range(200):
             movimiento = MovimientoInventario(
                 fecha=fake.date_time_between(start_date='-2M', end_date='now'),
-                tipo=random.choice(tipos_movimiento),
+                tipo=random.choice(TIPOS_MOVIMIENTO),
                 cantidad=random.randint(1, 20),
-                motivo=random.choice(motivos),
+                motivo=random.choice(MOTIVOS_MOVIMIENTO),
                 producto_id=random.choice(productos).id,
-                empleado_id=random.choice(empleados).id
+                empleado_id=random.choice(empleados).id,
+                sucursal_id=random.choice(sucursales).id
             )
             session.add(movimiento)
         session.flush()
@@ -448,16 +471,12 @@ def generar_datos_prueba():
             if (producto.id, proveedor.id) in added_producto_proveedor:
                 continue # Ya añadida en esta ejecución
 
+            # Los productos y proveedores se acaban de crear en esta sesión, así que el set
+            # en memoria basta para evitar duplicados sin consultar la base de datos por cada par.
             try:
-                # Intenta encontrar si la relación ya existe en la base de datos (redundante si se limpia bien)
-                existing_rel = session.query(ProductoProveedor).filter_by(
-                    producto_id=producto.id,
-                    proveedor_id=proveedor.id
-                ).first()
-                if not existing_rel:
-                    session.add(ProductoProveedor(producto_id=producto.id, proveedor_id=proveedor.id))
-                    added_producto_proveedor.add((producto.id, proveedor.id))
-                    productos_proveedores_count += 1
+                session.add(ProductoProveedor(producto_id=producto.id, proveedor_id=proveedor.id))
+                added_producto_proveedor.add((producto.id, proveedor.id))
+                productos_proveedores_count += 1
             except Exception as e:
                 print(f"ADVERTENCIA: No se pudo añadir ProductoProveedor {producto.id}-{proveedor.id}: {e}")
                 # Si esto ocurre en el commit final, el rollback total lo manejará
@@ -475,14 +494,9 @@ def generar_datos_prueba():
                 continue
 
             try:
-                existing_rel = session.query(ClienteServicio).filter_by(
-                    cliente_id=cliente.id,
-                    servicio_id=servicio.id
-                ).first()
-                if not existing_rel:
-                    session.add(ClienteServicio(cliente_id=cliente.id, servicio_id=servicio.id, fecha_contratacion=fake.date_time_between(start_date='-1y', end_date='now')))
-                    added_cliente_servicio.add((cliente.id, servicio.id))
-                    clientes_servicios_count += 1
+                session.add(ClienteServicio(cliente_id=cliente.id, servicio_id=servicio.id, fecha_contratacion=fake.date_time_between(start_date='-1y', end_date='now')))
+                added_cliente_servicio.add((cliente.id, servicio.id))
+                clientes_servicios_count += 1
             except Exception as e:
                 print(f"ADVERTENCIA: No se pudo añadir ClienteServicio {cliente.id}-{servicio.id}: {e}")
 
@@ -497,14 +511,9 @@ def generar_datos_prueba():
                 continue
 
             try:
-                existing_rel = session.query(EmpleadoDepartamento).filter_by(
-                    empleado_id=empleado.id,
-                    departamento_id=departamento.id
-                ).first()
-                if not existing_rel:
-                    session.add(EmpleadoDepartamento(empleado_id=empleado.id, departamento_id=departamento.id))
-                    added_empleado_departamento.add((empleado.id, departamento.id))
-                    empleados_departamentos_count += 1
+                session.add(EmpleadoDepartamento(empleado_id=empleado.id, departamento_id=departamento.id))
+                added_empleado_departamento.add((empleado.id, departamento.id))
+                empleados_departamentos_count += 1
             except Exception as e:
                 print(f"ADVERTENCIA: No se pudo añadir EmpleadoDepartamento {empleado.id}-{departamento.id}: {e}")
         
@@ -576,7 +585,7 @@ def limpiar_datos():
         for tabla in tablas_orden:
             # Eliminar todos los registros de la tabla
             session.query(tabla).delete()
-            print(f"✅ Tabla {tabla._tablename_} limpiada")
+            print(f"✅ Tabla {tabla.__tablename__} limpiada")
         
         session.commit() # Un solo commit para toda la limpieza
         print("🎉 Limpieza completada")
@@ -590,7 +599,7 @@ def limpiar_datos():
     finally:
         session.close()
 
-if _name_ == '_main_':
+if __name__ == '__main__':
     print("🚀 Iniciando generación de datos de prueba...")
     
     # Opción para limpiar datos existentes
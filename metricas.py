@@ -0,0 +1,395 @@
+"""
+Métricas de la aplicación y de la base en formato de texto de Prometheus.
+
+Sin dependencias nuevas: un registro mínimo de contadores e histogramas en memoria y
+recolectores que se evalúan en cada lectura. Expone:
+
+* reporte_segundos / reporte_filas_total / reporte_errores_total: duración y filas de
+  cada función de reports.py (decorador medir_reporte).
+* crud_flush_segundos / crud_filas_total: latencia de los flush del ORM por entidad y
+  operación (crear, actualizar, eliminar), es decir, lo que hacen los CRUD de app.py.
+* db_sentencia_segundos: latencia de cada sentencia por tabla y tipo (SELECT, INSERT...).
+* pool_espera_checkout_segundos y pool_conexiones: espera por una conexión del pool y
+  conexiones en uso/libres/desborde de cada engine (database.PoolConEspera).
+* pg_tabla_*, pg_indice_* y pg_funcion_*: escrituras por tabla (incluidas las que hacen los
+  triggers), lecturas secuenciales y por índice, tamaños y costo de las funciones de
+  trigger, leídos de pg_stat_user_tables, pg_stat_user_indexes y pg_stat_user_functions.
+
+Las métricas de la aplicación son del proceso que las registra; el servidor HTTP o el
+archivo para el textfile collector de node_exporter se activan desde ese proceso:
+
+    python metricas.py servir --puerto 9187
+    python metricas.py archivo --out /var/lib/node_exporter/textfile/proyecto.prom --cada 60
+    python reports.py --metricas reportes.prom lote trabajos.yaml
+    python app.py --metricas-puerto 9188
+"""
+import argparse
+import functools
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from database import codigo_sqlstate, engines_activos, estadisticas_cache_compilacion, obtener_engine, observar_espera_pool
+
+PREFIJO = 'proyecto_'
+PUERTO_POR_DEFECTO = 9187
+INTERVALO_BD_SEGUNDOS = 15 # Las estadísticas de PostgreSQL se leen como máximo cada tanto
+
+BUCKETS_SENTENCIAS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_REPORTES = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# --- Registro ---
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ''
+    escapados = (str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for valor in valores)
+    return '{' + ','.join(f'{nombre}="{valor}"' for nombre, valor in zip(nombres, escapados)) + '}'
+
+def _numero(valor):
+    return repr(float(valor)) if valor not in (float('inf'), float('-inf')) else ('+Inf' if valor > 0 else '-Inf')
+
+class Contador:
+    """Contador monótono con etiquetas."""
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre, self.ayuda, self.etiquetas = PREFIJO + nombre, ayuda, tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valor=1, **etiquetas):
+        clave = tuple(etiquetas[nombre] for nombre in self.etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def lineas(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}" for clave, valor in valores]
+
+class Histograma:
+    """Histograma acumulativo (buckets 'le', _sum y _count) con etiquetas."""
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SENTENCIAS):
+        self.nombre, self.ayuda, self.etiquetas = PREFIJO + nombre, ayuda, tuple(etiquetas)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._valores = {} # clave -> [conteos por bucket..., suma]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(etiquetas[nombre] for nombre in self.etiquetas)
+        with self._lock:
+            serie = self._valores.setdefault(clave, [0] * len(self.buckets) + [0.0])
+            for i, borde in enumerate(self.buckets):
+                if valor <= borde:
+                    serie[i] += 1
+                    break
+            serie[-1] += valor
+
+    def lineas(self):
+        with self._lock:
+            valores = sorted((clave, list(serie)) for clave, serie in self._valores.items())
+        lineas = []
+        for clave, serie in valores:
+            acumulado = 0
+            for borde, conteo in zip(self.buckets, serie):
+                acumulado += conteo
+                etiquetas = _etiquetas(self.etiquetas + ('le',), clave + (_numero(borde),))
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(serie[-1])}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acumulado}")
+        return lineas
+
+class Serie:
+    """Métrica calculada en cada lectura: una lista de (valores de etiquetas, valor)."""
+
+    def __init__(self, nombre, ayuda, tipo, etiquetas=()):
+        self.nombre, self.ayuda, self.tipo, self.etiquetas = PREFIJO + nombre, ayuda, tipo, tuple(etiquetas)
+        self.valores = []
+
+    def agregar(self, valor, *etiquetas):
+        self.valores.append((tuple(etiquetas), valor))
+        return self
+
+    def lineas(self):
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}" for clave, valor in self.valores if valor is not None]
+
+_metricas = []
+_recolectores = []
+
+def _registrar(metrica):
+    _metricas.append(metrica)
+    return metrica
+
+REPORTE_SEGUNDOS = _registrar(Histograma('reporte_segundos', "Duración de cada reporte.", ('reporte',), BUCKETS_REPORTES))
+REPORTE_FILAS = _registrar(Contador('reporte_filas_total', "Filas producidas por cada reporte.", ('reporte',)))
+REPORTE_ERRORES = _registrar(Contador('reporte_errores_total', "Reportes que terminaron con error.", ('reporte',)))
+CRUD_SEGUNDOS = _registrar(Histograma('crud_flush_segundos', "Duración de los flush del ORM por entidad y operación.", ('entidad', 'operacion')))
+CRUD_FILAS = _registrar(Contador('crud_filas_total', "Objetos escritos por el ORM por entidad y operación.", ('entidad', 'operacion')))
+SENTENCIA_SEGUNDOS = _registrar(Histograma('db_sentencia_segundos', "Latencia de las sentencias por tabla y tipo.", ('tabla', 'operacion')))
+SENTENCIA_ERRORES = _registrar(Contador('db_errores_total', "Sentencias que fallaron, por código SQLSTATE.", ('sqlstate',)))
+POOL_ESPERA = _registrar(Histograma('pool_espera_checkout_segundos', "Espera por una conexión del pool."))
+
+def recolector(funcion):
+    """Registra una función que retorna una lista de Serie, evaluada en cada lectura."""
+    _recolectores.append(funcion)
+    return funcion
+
+def generar():
+    """Texto de todas las métricas en el formato de exposición de Prometheus."""
+    metricas = list(_metricas)
+    for funcion in _recolectores:
+        try:
+            metricas.extend(funcion())
+        except Exception as e:
+            print(f"⚠️ Error en el recolector de métricas {funcion.__name__}: {e}")
+    lineas = []
+    for metrica in metricas:
+        valores = metrica.lineas()
+        if valores:
+            lineas += [f"# HELP {metrica.nombre} {metrica.ayuda}", f"# TYPE {metrica.nombre} {metrica.tipo}"] + valores
+    return '\n'.join(lineas) + '\n'
+
+# --- Instrumentación ---
+
+def medir_reporte(nombre):
+    """
+    Decorador para las funciones de reporte (que retornan la cantidad de filas, o None si
+    hubo un error): registra duración, filas y errores con la etiqueta reporte=nombre.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            resultado = None
+            try:
+                resultado = funcion(*args, **kwargs)
+                return resultado
+            finally:
+                REPORTE_SEGUNDOS.observar(time.perf_counter() - inicio, reporte=nombre)
+                if isinstance(resultado, int) and not isinstance(resultado, bool):
+                    REPORTE_FILAS.inc(resultado, reporte=nombre)
+                elif resultado is None:
+                    REPORTE_ERRORES.inc(reporte=nombre)
+        return envoltura
+    return decorador
+
+_VERBO = re.compile(r'^\s*(\w+)')
+_TABLA = re.compile(r'\b(?:FROM|INTO|UPDATE|JOIN)\s+(?:ONLY\s+)?"?(\w+)"?', re.IGNORECASE)
+
+@functools.lru_cache(maxsize=4096)
+def clasificar_sentencia(sql):
+    """(tabla, operación) de una sentencia SQL: la primera tabla nombrada y el primer verbo."""
+    verbo, tabla = _VERBO.match(sql), _TABLA.search(sql)
+    return (tabla.group(1).lower() if tabla else '', verbo.group(1).upper() if verbo else 'OTRA')
+
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+def _despues_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get('metricas_inicio')
+    if inicios:
+        tabla, operacion = clasificar_sentencia(statement)
+        SENTENCIA_SEGUNDOS.observar(time.perf_counter() - inicios.pop(), tabla=tabla, operacion=operacion)
+
+def _error_de_sentencia(contexto):
+    inicios = contexto.connection.info.get('metricas_inicio') if contexto.connection is not None else None
+    if inicios:
+        inicios.pop()
+    SENTENCIA_ERRORES.inc(sqlstate=codigo_sqlstate(contexto.original_exception) or type(contexto.original_exception).__name__)
+
+_OPERACIONES_FLUSH = (('new', 'crear'), ('dirty', 'actualizar'), ('deleted', 'eliminar'))
+
+def _antes_del_flush(session, flush_context, instances):
+    objetos = {}
+    for atributo, operacion in _OPERACIONES_FLUSH:
+        for objeto in getattr(session, atributo):
+            if atributo != 'dirty' or session.is_modified(objeto, include_collections=False):
+                clave = (type(objeto).__name__, operacion)
+                objetos[clave] = objetos.get(clave, 0) + 1
+    session.info['metricas_flush'] = (time.perf_counter(), objetos)
+
+def _despues_del_flush(session, flush_context):
+    inicio, objetos = session.info.pop('metricas_flush', (None, {}))
+    if inicio is None:
+        return
+    segundos = time.perf_counter() - inicio
+    for (entidad, operacion), cantidad in objetos.items():
+        CRUD_SEGUNDOS.observar(segundos, entidad=entidad, operacion=operacion)
+        CRUD_FILAS.inc(cantidad, entidad=entidad, operacion=operacion)
+
+_instrumentado = False
+_instrumentar_lock = threading.Lock()
+
+def instrumentar():
+    """Activa (una sola vez) la medición de sentencias, flush del ORM y espera del pool."""
+    global _instrumentado
+    with _instrumentar_lock:
+        if _instrumentado:
+            return
+        event.listen(Engine, 'before_cursor_execute', _antes_de_sentencia)
+        event.listen(Engine, 'after_cursor_execute', _despues_de_sentencia)
+        event.listen(Engine, 'handle_error', _error_de_sentencia)
+        event.listen(Session, 'before_flush', _antes_del_flush)
+        event.listen(Session, 'after_flush_postexec', _despues_del_flush)
+        observar_espera_pool(lambda segundos: POOL_ESPERA.observar(segundos))
+        _instrumentado = True
+
+# --- Recolectores ---
+
+@recolector
+def metricas_pool():
+    conexiones = Serie('pool_conexiones', "Conexiones del pool por estado.", 'gauge', ('engine', 'estado'))
+    tamano = Serie('pool_tamano', "Tamaño configurado del pool.", 'gauge', ('engine',))
+    for nombre, engine in engines_activos().items():
+        pool = engine.pool
+        conexiones.agregar(pool.checkedout(), nombre, 'en_uso').agregar(pool.checkedin(), nombre, 'libre')
+        conexiones.agregar(max(pool.overflow(), 0), nombre, 'desborde')
+        tamano.agregar(pool.size(), nombre)
+    return [conexiones, tamano]
+
+@recolector
+def metricas_cache_compilacion():
+    estadisticas = estadisticas_cache_compilacion()
+    serie = Serie('sqlalchemy_cache_compilacion_total', "Sentencias según el uso de la caché de compilación.", 'counter', ('resultado',))
+    for clave, valor in sorted(estadisticas.items()):
+        if clave != 'tasa_aciertos':
+            serie.agregar(valor, clave.lower())
+    return [serie]
+
+_cache_bd = {'momento': 0.0, 'series': []}
+_cache_bd_lock = threading.Lock()
+
+def _leer_estadisticas_bd():
+    tuplas = Serie('pg_tabla_tuplas_total', "Filas escritas por tabla y operación (incluye triggers).", 'counter', ('tabla', 'operacion'))
+    lecturas = Serie('pg_tabla_lecturas_total', "Recorridos de cada tabla por tipo.", 'counter', ('tabla', 'tipo'))
+    filas = Serie('pg_tabla_filas', "Filas vivas y muertas estimadas.", 'gauge', ('tabla', 'estado'))
+    bytes_tabla = Serie('pg_tabla_bytes', "Tamaño de cada tabla (datos, índices y total con TOAST).", 'gauge', ('tabla', 'parte'))
+    bytes_indice = Serie('pg_indice_bytes', "Tamaño de cada índice.", 'gauge', ('tabla', 'indice'))
+    escaneos_indice = Serie('pg_indice_escaneos_total', "Escaneos de cada índice.", 'counter', ('tabla', 'indice'))
+    llamadas = Serie('pg_funcion_llamadas_total', "Llamadas a funciones PL/pgSQL (triggers incluidos).", 'counter', ('funcion',))
+    segundos = Serie('pg_funcion_segundos_total', "Tiempo propio de cada función PL/pgSQL.", 'counter', ('funcion',))
+    base = Serie('pg_base_eventos_total', "Commits, rollbacks y deadlocks de la base.", 'counter', ('evento',))
+
+    with obtener_engine().connect() as conn:
+        for fila in conn.execute(text("""
+            SELECT relname, n_tup_ins, n_tup_upd, n_tup_hot_upd, n_tup_del, seq_scan, COALESCE(idx_scan, 0) AS idx_scan,
+                   n_live_tup, n_dead_tup, pg_relation_size(relid) AS datos, pg_indexes_size(relid) AS indices,
+                   pg_total_relation_size(relid) AS total
+            FROM pg_stat_user_tables
+        """)).mappings():
+            tabla = fila['relname']
+            for operacion, columna in (('insert', 'n_tup_ins'), ('update', 'n_tup_upd'), ('hot_update', 'n_tup_hot_upd'), ('delete', 'n_tup_del')):
+                tuplas.agregar(fila[columna], tabla, operacion)
+            lecturas.agregar(fila['seq_scan'], tabla, 'secuencial').agregar(fila['idx_scan'], tabla, 'indice')
+            filas.agregar(fila['n_live_tup'], tabla, 'vivas').agregar(fila['n_dead_tup'], tabla, 'muertas')
+            for parte in ('datos', 'indices', 'total'):
+                bytes_tabla.agregar(fila[parte], tabla, parte)
+        for tabla, indice, tamano, escaneos in conn.execute(text("""
+            SELECT relname, indexrelname, pg_relation_size(indexrelid), idx_scan FROM pg_stat_user_indexes
+        """)):
+            bytes_indice.agregar(tamano, tabla, indice)
+            escaneos_indice.agregar(escaneos, tabla, indice)
+        for funcion, cantidad, milisegundos in conn.execute(text("SELECT funcname, calls, self_time FROM pg_stat_user_functions")):
+            llamadas.agregar(cantidad, funcion)
+            segundos.agregar(milisegundos / 1000.0, funcion)
+        fila = conn.execute(text("""
+            SELECT xact_commit, xact_rollback, deadlocks FROM pg_stat_database WHERE datname = current_database()
+        """)).one()
+        base.agregar(fila.xact_commit, 'commit').agregar(fila.xact_rollback, 'rollback').agregar(fila.deadlocks, 'deadlock')
+    return [tuplas, lecturas, filas, bytes_tabla, bytes_indice, escaneos_indice, llamadas, segundos, base]
+
+@recolector
+def metricas_bd():
+    """Estadísticas de PostgreSQL, releídas como máximo cada INTERVALO_BD_SEGUNDOS."""
+    disponible = Serie('pg_recoleccion_exitosa', "1 si la última lectura de estadísticas de PostgreSQL funcionó.", 'gauge')
+    with _cache_bd_lock:
+        if time.monotonic() - _cache_bd['momento'] >= INTERVALO_BD_SEGUNDOS:
+            try:
+                _cache_bd['series'] = _leer_estadisticas_bd()
+                _cache_bd['exitosa'] = 1
+            except Exception as e:
+                print(f"⚠️ No se pudieron leer las estadísticas de PostgreSQL: {e}")
+                _cache_bd['series'], _cache_bd['exitosa'] = [], 0
+            _cache_bd['momento'] = time.monotonic()
+        return _cache_bd['series'] + [disponible.agregar(_cache_bd['exitosa'])]
+
+# --- Exposición ---
+
+class _Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        cuerpo = generar().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass # Sin una línea por cada lectura de Prometheus
+
+def servir(puerto=PUERTO_POR_DEFECTO, direccion='127.0.0.1'):
+    """Inicia el endpoint /metrics en un hilo de fondo y retorna el servidor (o None si falló)."""
+    try:
+        instrumentar()
+        servidor = ThreadingHTTPServer((direccion, puerto), _Manejador)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        print(f"✅ Métricas disponibles en http://{direccion}:{puerto}/metrics")
+        return servidor
+    except Exception as e:
+        print(f"❌ Error al iniciar el servidor de métricas en el puerto {puerto}: {e}")
+        return None
+
+def escribir_archivo(ruta):
+    """
+    Escribe las métricas para el textfile collector de node_exporter (extensión .prom). Se
+    escribe en un temporal y se reemplaza, para que nunca se lea un archivo a medias.
+    """
+    try:
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write(generar())
+        os.replace(temporal, ruta)
+        return True
+    except Exception as e:
+        print(f"❌ Error al escribir las métricas en '{ruta}': {e}")
+        return False
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Exporta métricas de la aplicación y de PostgreSQL en formato Prometheus.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    servidor = subparsers.add_parser('servir', help="Sirve /metrics por HTTP.")
+    servidor.add_argument('--puerto', type=int, default=PUERTO_POR_DEFECTO)
+    servidor.add_argument('--direccion', default='127.0.0.1', help="Interfaz de escucha (127.0.0.1 por defecto).")
+    archivo = subparsers.add_parser('archivo', help="Escribe un archivo .prom para el textfile collector.")
+    archivo.add_argument('--out', dest='salida', required=True, metavar='ARCHIVO.prom')
+    archivo.add_argument('--cada', type=float, metavar='SEGUNDOS', help="Reescribe el archivo periódicamente en lugar de una sola vez.")
+    args = parser.parse_args()
+
+    try:
+        if args.comando == 'servir':
+            if servir(args.puerto, args.direccion) is None:
+                raise SystemExit(1)
+            while True:
+                time.sleep(3600)
+        elif args.cada:
+            while True:
+                escribir_archivo(args.salida)
+                time.sleep(args.cada)
+        elif escribir_archivo(args.salida):
+            print(f"✅ Métricas escritas en '{args.salida}'")
+        else:
+            raise SystemExit(1)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,366 @@
+"""
+Migraciones de esquema versionadas, aplicables sobre una base en uso.
+
+`database.py` (create_all) solo crea tablas que no existen y `queries.py` recrea funciones,
+triggers y vistas; ninguno de los dos sirve para cambiar tablas con datos mientras hay carga.
+Cada migración de MIGRACIONES es una lista de pasos idempotentes que se ejecutan en orden y,
+al terminar todos, se registra en `schema_migraciones`:
+
+* Sql: sentencias cortas (ADD COLUMN sin reescritura, CREATE TRIGGER...) en una transacción
+  con `lock_timeout`. Si no obtienen el bloqueo a tiempo se reintentan con espera creciente,
+  en lugar de quedar en la cola de bloqueos frenando a todas las sesiones detrás.
+* Indice: CREATE INDEX CONCURRENTLY (no bloquea escrituras). Si un intento anterior dejó el
+  índice inválido, se elimina con DROP INDEX CONCURRENTLY y se vuelve a crear.
+* Restriccion: claves foráneas y CHECK agregados NOT VALID y validados después, con un
+  bloqueo que no detiene lecturas ni escrituras.
+* Relleno: UPDATE por rangos de id en transacciones cortas, con pausa entre lotes
+  proporcional a lo que tardó cada uno (CARGA_MAXIMA), para no saturar una base ocupada.
+
+Una migración no es atómica (CONCURRENTLY no puede ir en una transacción): si se interrumpe,
+se vuelve a ejecutar completa y los pasos ya hechos no cambian nada. Un advisory lock impide
+que dos procesos migren a la vez.
+
+    python migraciones.py estado
+    python migraciones.py aplicar [--hasta 3] [--lock-timeout 2s] [--lote 5000]
+    python migraciones.py marcar 1 2   # Base donde esos cambios ya se aplicaron a mano
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from database import MigracionEsquema, codigo_sqlstate, obtener_engine
+
+LOCK_TIMEOUT = '2s'
+REINTENTOS = 8
+ESPERA_MAXIMA_REINTENTO = 30
+TAMANO_LOTE = 5000
+CARGA_MAXIMA = 0.5 # Fracción del tiempo que un relleno ocupa la base (0.5: pausa igual a lo que tardó el lote)
+PAUSA_MINIMA = 0.05
+CODIGOS_REINTENTABLES = {'55P03', '40P01'} # lock_not_available, deadlock_detected
+CLAVE_ADVISORY_LOCK = 4501 # Arbitraria, compartida por todos los procesos que migran
+
+class Migrador:
+    """Ejecuta pasos de migración con lock_timeout, reintentos y pausas entre lotes."""
+
+    def __init__(self, engine=None, lock_timeout=LOCK_TIMEOUT, reintentos=REINTENTOS,
+                 tamano_lote=TAMANO_LOTE, carga_maxima=CARGA_MAXIMA):
+        self.engine = engine or obtener_engine()
+        self.lock_timeout = lock_timeout
+        self.reintentos = reintentos
+        self.tamano_lote = tamano_lote
+        self.carga_maxima = carga_maxima
+
+    def con_reintentos(self, descripcion, funcion):
+        """Ejecuta funcion() reintentando si no obtuvo un bloqueo a tiempo o hubo un deadlock."""
+        for intento in range(1, self.reintentos + 1):
+            try:
+                return funcion()
+            except DBAPIError as e:
+                codigo = codigo_sqlstate(e.orig)
+                if codigo not in CODIGOS_REINTENTABLES or intento == self.reintentos:
+                    raise
+                espera = min(2 ** intento * 0.25, ESPERA_MAXIMA_REINTENTO) * random.uniform(0.5, 1.5)
+                print(f"  ⚠️ {descripcion}: bloqueo no disponible (intento {intento}/{self.reintentos}), reintentando en {espera:.1f} s")
+                time.sleep(espera)
+
+    def transaccion(self, sentencia, parametros=None):
+        """Ejecuta la sentencia en una transacción propia con lock_timeout. Retorna las filas afectadas."""
+        with self.engine.begin() as conn:
+            conn.execute(text("SELECT set_config('lock_timeout', :valor, true)"), {'valor': self.lock_timeout})
+            return conn.execute(text(sentencia), parametros or {}).rowcount
+
+    def fuera_de_transaccion(self, sentencia):
+        """Ejecuta la sentencia en autocommit (necesario para CONCURRENTLY)."""
+        with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text("SELECT set_config('lock_timeout', :valor, false)"), {'valor': self.lock_timeout})
+            try:
+                conn.execute(text(sentencia))
+            finally:
+                conn.execute(text("RESET lock_timeout")) # La conexión vuelve al pool
+
+    def consultar(self, sentencia, parametros=None):
+        with self.engine.connect() as conn:
+            return conn.execute(text(sentencia), parametros or {}).first()
+
+# --- Pasos ---
+
+class Sql:
+    """Sentencias DDL/DML cortas en una sola transacción con lock_timeout."""
+
+    def __init__(self, descripcion, sentencia):
+        self.descripcion, self.sentencia = descripcion, sentencia
+
+    def ejecutar(self, migrador):
+        migrador.con_reintentos(self.descripcion, lambda: migrador.transaccion(self.sentencia))
+
+class Indice:
+    """CREATE INDEX CONCURRENTLY; `definicion` es lo que va después de 'ON' (tabla y columnas)."""
+
+    def __init__(self, nombre, definicion, unico=False):
+        self.nombre, self.definicion, self.unico = nombre, definicion, unico
+        self.descripcion = f"índice {nombre}"
+
+    def ejecutar(self, migrador):
+        fila = migrador.consultar("""
+            SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+            WHERE c.relname = :nombre AND c.relnamespace = 'public'::regnamespace
+        """, {'nombre': self.nombre})
+        if fila is not None and fila.indisvalid:
+            return
+        if fila is not None:
+            print(f"  ⚠️ {self.nombre} quedó inválido en un intento anterior; se vuelve a crear.")
+            migrador.con_reintentos(self.descripcion, lambda: migrador.fuera_de_transaccion(f"DROP INDEX CONCURRENTLY IF EXISTS {self.nombre}"))
+        unico = 'UNIQUE ' if self.unico else ''
+        migrador.con_reintentos(self.descripcion, lambda: migrador.fuera_de_transaccion(
+            f"CREATE {unico}INDEX CONCURRENTLY IF NOT EXISTS {self.nombre} ON {self.definicion}"))
+
+class Restriccion:
+    """
+    Restricción agregada NOT VALID (solo un bloqueo breve) y validada en un segundo paso,
+    que recorre la tabla con SHARE UPDATE EXCLUSIVE: lecturas y escrituras siguen.
+    """
+
+    def __init__(self, tabla, nombre, definicion):
+        self.tabla, self.nombre, self.definicion = tabla, nombre, definicion
+        self.descripcion = f"restricción {nombre}"
+
+    def ejecutar(self, migrador):
+        fila = migrador.consultar("""
+            SELECT convalidated FROM pg_constraint WHERE conname = :nombre AND conrelid = CAST(:tabla AS regclass)
+        """, {'nombre': self.nombre, 'tabla': self.tabla})
+        if fila is None:
+            migrador.con_reintentos(self.descripcion, lambda: migrador.transaccion(
+                f"ALTER TABLE {self.tabla} ADD CONSTRAINT {self.nombre} {self.definicion} NOT VALID"))
+        if fila is None or not fila.convalidated:
+            migrador.con_reintentos(self.descripcion, lambda: migrador.transaccion(
+                f"ALTER TABLE {self.tabla} VALIDATE CONSTRAINT {self.nombre}"))
+
+class Relleno:
+    """
+    UPDATE por lotes de ids. `sentencia` debe filtrar `<alias>.id >= :desde AND <alias>.id < :hasta`
+    y excluir las filas ya completas, para poder retomarse.
+    """
+
+    def __init__(self, descripcion, tabla, sentencia):
+        self.descripcion, self.tabla, self.sentencia = descripcion, tabla, sentencia
+
+    def ejecutar(self, migrador):
+        minimo, maximo = migrador.consultar(f"SELECT MIN(id), MAX(id) FROM {self.tabla}")
+        if minimo is None:
+            return
+        total, desde, ultimo_aviso = 0, minimo, time.monotonic()
+        while desde <= maximo:
+            hasta = desde + migrador.tamano_lote
+            inicio = time.monotonic()
+            total += migrador.con_reintentos(self.descripcion, lambda: migrador.transaccion(self.sentencia, {'desde': desde, 'hasta': hasta}))
+            duracion = time.monotonic() - inicio
+            desde = hasta
+            if time.monotonic() - ultimo_aviso >= 10:
+                print(f"  {self.descripcion}: {min(desde, maximo + 1) - minimo:,} de {maximo - minimo + 1:,} ids revisados, {total:,} filas actualizadas")
+                ultimo_aviso = time.monotonic()
+            # Pausa proporcional: si el lote tardó más (base ocupada), se espera más
+            time.sleep(max(PAUSA_MINIMA, duracion * (1 - migrador.carga_maxima) / migrador.carga_maxima))
+        print(f"  {self.descripcion}: {total:,} filas actualizadas")
+
+# --- Migraciones ---
+# (versión, nombre, pasos). Nunca cambiar una migración ya publicada: agregar una nueva.
+
+MIGRACIONES = [
+    (1, 'sucursal_en_movimientos_inventario', [
+        Sql("columna movimientos_inventario.sucursal_id",
+            "ALTER TABLE movimientos_inventario ADD COLUMN IF NOT EXISTS sucursal_id INTEGER"),
+        Restriccion('movimientos_inventario', 'movimientos_inventario_sucursal_id_fkey',
+                    'FOREIGN KEY (sucursal_id) REFERENCES sucursales(id)'),
+        # Los movimientos de ventas toman la sucursal de la venta del motivo; las compras siempre
+        # entraron a SUC001 (o a la primera sucursal)
+        Relleno("sucursal de movimientos por venta", 'movimientos_inventario', """
+            UPDATE movimientos_inventario m
+            SET sucursal_id = v.sucursal_id
+            FROM ventas v
+            WHERE m.id >= :desde AND m.id < :hasta
+              AND m.sucursal_id IS NULL
+              AND m.motivo LIKE 'Venta (Venta ID: %'
+              AND v.id = substring(m.motivo FROM 'Venta ID: ([0-9]+)')::int
+        """),
+        Relleno("sucursal de movimientos por compra", 'movimientos_inventario', """
+            UPDATE movimientos_inventario m
+            SET sucursal_id = COALESCE(
+                (SELECT id FROM sucursales WHERE codigo = 'SUC001' LIMIT 1),
+                (SELECT id FROM sucursales ORDER BY id LIMIT 1))
+            WHERE m.id >= :desde AND m.id < :hasta
+              AND m.sucursal_id IS NULL AND m.motivo LIKE 'Compra (Compra ID: %'
+        """),
+    ]),
+    # Monto pagado de cada factura (lo mantiene trg_sync_factura_monto_pagado; los pagos
+    # anteriores se concilian con `python cuentas_por_cobrar.py conciliar --completo`).
+    # Con un DEFAULT constante, PostgreSQL 11+ agrega la columna sin reescribir la tabla.
+    (2, 'monto_pagado_en_facturas', [
+        Sql("columna facturas.monto_pagado",
+            "ALTER TABLE facturas ADD COLUMN IF NOT EXISTS monto_pagado NUMERIC(12, 2) NOT NULL DEFAULT 0"),
+    ]),
+    # Sucursal en cada detalle de venta, para analítica por sucursal sin unir con ventas.
+    # Primero el trigger (las filas nuevas ya llegan completas), después el relleno de las
+    # anteriores, el índice y la obligatoriedad (CHECK validado, sin bloquear la tabla).
+    (3, 'sucursal_en_detalle_ventas', [
+        Sql("columna detalle_ventas.sucursal_id",
+            "ALTER TABLE detalle_ventas ADD COLUMN IF NOT EXISTS sucursal_id INTEGER"),
+        Sql("trigger de sucursal en detalle_ventas", """
+            CREATE OR REPLACE FUNCTION completar_sucursal_detalle_venta()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                IF NEW.sucursal_id IS NULL THEN
+                    SELECT sucursal_id INTO NEW.sucursal_id FROM ventas WHERE id = NEW.venta_id;
+                END IF;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS trg_completar_sucursal_detalle_venta ON detalle_ventas;
+            CREATE TRIGGER trg_completar_sucursal_detalle_venta
+            BEFORE INSERT OR UPDATE OF venta_id ON detalle_ventas
+            FOR EACH ROW
+            EXECUTE FUNCTION completar_sucursal_detalle_venta();
+        """),
+        Relleno("sucursal de detalle_ventas", 'detalle_ventas', """
+            UPDATE detalle_ventas d
+            SET sucursal_id = v.sucursal_id
+            FROM ventas v
+            WHERE d.id >= :desde AND d.id < :hasta
+              AND d.sucursal_id IS NULL AND v.id = d.venta_id
+        """),
+        Restriccion('detalle_ventas', 'detalle_ventas_sucursal_id_fkey', 'FOREIGN KEY (sucursal_id) REFERENCES sucursales(id)'),
+        Restriccion('detalle_ventas', 'detalle_ventas_sucursal_id_not_null', 'CHECK (sucursal_id IS NOT NULL)'),
+        Indice('idx_detalle_ventas_sucursal_producto', 'detalle_ventas (sucursal_id, producto_id)'),
+    ]),
+    # Pedido de origen de ventas y facturas generadas por conversion_pedidos.py. El índice
+    # único es la clave de idempotencia (ON CONFLICT (pedido_id) DO NOTHING) y lleva el mismo
+    # nombre que la restricción UNIQUE que create_all crea en una base nueva.
+    (4, 'pedido_en_ventas_y_facturas', [
+        Sql("columna ventas.pedido_id", "ALTER TABLE ventas ADD COLUMN IF NOT EXISTS pedido_id INTEGER"),
+        Sql("columna facturas.pedido_id", "ALTER TABLE facturas ADD COLUMN IF NOT EXISTS pedido_id INTEGER"),
+        Indice('ventas_pedido_id_key', 'ventas (pedido_id)', unico=True),
+        Indice('facturas_pedido_id_key', 'facturas (pedido_id)', unico=True),
+        Restriccion('ventas', 'ventas_pedido_id_fkey', 'FOREIGN KEY (pedido_id) REFERENCES pedidos(id)'),
+        Restriccion('facturas', 'facturas_pedido_id_fkey', 'FOREIGN KEY (pedido_id) REFERENCES pedidos(id)'),
+    ]),
+]
+
+# --- Ejecución ---
+
+def versiones_aplicadas(engine=None):
+    """Retorna {versión: (nombre, aplicada_en, duración)} de las migraciones registradas."""
+    engine = engine or obtener_engine()
+    MigracionEsquema.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return {fila.version: (fila.nombre, fila.aplicada_en, fila.duracion_segundos) for fila in conn.execute(
+            text("SELECT version, nombre, aplicada_en, duracion_segundos FROM schema_migraciones"))}
+
+def _registrar(engine, version, nombre, duracion):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO schema_migraciones (version, nombre, aplicada_en, duracion_segundos)
+            VALUES (:version, :nombre, :ahora, :duracion)
+            ON CONFLICT (version) DO NOTHING
+        """), {'version': version, 'nombre': nombre, 'ahora': datetime.now(), 'duracion': duracion})
+
+def aplicar(hasta=None, migrador=None):
+    """
+    Aplica en orden las migraciones pendientes (hasta la versión indicada, inclusive).
+    Retorna la lista de versiones aplicadas, o None si hubo un error.
+    """
+    migrador = migrador or Migrador()
+    bloqueo = migrador.engine.connect()
+    try:
+        if not bloqueo.execute(text("SELECT pg_try_advisory_lock(:clave)"), {'clave': CLAVE_ADVISORY_LOCK}).scalar():
+            print("❌ Otro proceso está aplicando migraciones.")
+            return None
+        bloqueo.commit()
+        aplicadas = versiones_aplicadas(migrador.engine)
+        pendientes = [m for m in MIGRACIONES if m[0] not in aplicadas and (hasta is None or m[0] <= hasta)]
+        if not pendientes:
+            print("✅ El esquema está al día.")
+            return []
+        hechas = []
+        for version, nombre, pasos in pendientes:
+            print(f"\n--- Migración {version}: {nombre} ---")
+            inicio = time.monotonic()
+            for paso in pasos:
+                print(f"  {paso.descripcion}...")
+                paso.ejecutar(migrador)
+            duracion = round(time.monotonic() - inicio, 2)
+            _registrar(migrador.engine, version, nombre, duracion)
+            hechas.append(version)
+            print(f"✅ Migración {version} aplicada en {duracion:.1f} s.")
+        return hechas
+    except Exception as e:
+        print(f"❌ Error al aplicar migraciones: {e}")
+        print("   Los pasos son idempotentes: corregida la causa, vuelva a ejecutar 'aplicar'.")
+        return None
+    finally:
+        try:
+            bloqueo.execute(text("SELECT pg_advisory_unlock(:clave)"), {'clave': CLAVE_ADVISORY_LOCK})
+        except Exception:
+            pass
+        bloqueo.close()
+
+def marcar(versiones):
+    """Registra versiones como aplicadas sin ejecutarlas (bases migradas a mano)."""
+    engine = obtener_engine()
+    nombres = {version: nombre for version, nombre, _ in MIGRACIONES}
+    try:
+        versiones_aplicadas(engine)
+        for version in versiones:
+            if version not in nombres:
+                print(f"❌ No existe la migración {version}.")
+                return False
+            _registrar(engine, version, nombres[version], None)
+        print(f"✅ Migraciones marcadas como aplicadas: {', '.join(map(str, versiones))}")
+        return True
+    except Exception as e:
+        print(f"❌ Error al marcar migraciones: {e}")
+        return False
+
+def mostrar_estado():
+    try:
+        aplicadas = versiones_aplicadas()
+    except Exception as e:
+        print(f"❌ Error al leer schema_migraciones: {e}")
+        return False
+    print(f"{'Versión':>7}  {'Nombre':<40} {'Estado'}")
+    for version, nombre, _ in MIGRACIONES:
+        if version in aplicadas:
+            _, fecha, duracion = aplicadas[version]
+            estado = f"aplicada {fecha:%Y-%m-%d %H:%M}" + (f" ({duracion} s)" if duracion is not None else " (marcada)")
+        else:
+            estado = "pendiente"
+        print(f"{version:>7}  {nombre:<40} {estado}")
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Migraciones de esquema versionadas y seguras sobre una base en uso.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    subparsers.add_parser('estado', help="Lista las migraciones aplicadas y pendientes.")
+    aplicacion = subparsers.add_parser('aplicar', help="Aplica las migraciones pendientes.")
+    aplicacion.add_argument('--hasta', type=int, metavar='VERSION')
+    aplicacion.add_argument('--lock-timeout', dest='lock_timeout', default=LOCK_TIMEOUT, help="Espera máxima por cada bloqueo (ej. 2s, 500ms).")
+    aplicacion.add_argument('--reintentos', type=int, default=REINTENTOS)
+    aplicacion.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Ids por lote en los rellenos.")
+    aplicacion.add_argument('--carga', type=float, default=CARGA_MAXIMA, help="Fracción del tiempo que los rellenos ocupan la base (0-1].")
+    marcado = subparsers.add_parser('marcar', help="Registra migraciones como aplicadas sin ejecutarlas.")
+    marcado.add_argument('versiones', type=int, nargs='+')
+    args = parser.parse_args()
+
+    if args.comando == 'estado':
+        ok = mostrar_estado()
+    elif args.comando == 'aplicar':
+        if not 0 < args.carga <= 1:
+            parser.error("--carga debe estar entre 0 (exclusivo) y 1")
+        ok = aplicar(args.hasta, Migrador(lock_timeout=args.lock_timeout, reintentos=args.reintentos,
+                                          tamano_lote=args.lote, carga_maxima=args.carga)) is not None
+    else:
+        ok = marcar(args.versiones)
+    raise SystemExit(0 if ok else 1)
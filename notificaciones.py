@@ -0,0 +1,176 @@
+"""
+Invalidación de cachés entre procesos con LISTEN/NOTIFY de PostgreSQL.
+
+Los triggers por sentencia trg_notificar_cambio_* (ver queries.py) publican en el canal
+'cambios_tablas' un evento compacto 'tabla:operación' (I, U, D o T) cuando otro proceso
+(app.py, inserts.py, importacion.py, un cargador) escribe en productos, categorías,
+inventario, clientes, empleados, sucursales, puestos o departamentos.
+
+Cada proceso de larga duración que lo necesite (los menús de app.py y reports.py) abre una
+sola conexión de escucha en un hilo de fondo; las ejecuciones cortas no la abren. Los
+eventos se agrupan durante VENTANA_SEGUNDOS desde el primero que llega y se despachan una
+vez por tabla, así que una carga masiva produce una sola invalidación por ventana. Si la
+conexión se pierde se reintenta con espera exponencial y, al volver a escuchar, se avisa un
+cambio 'R' (reconexión) en todas las tablas suscritas, porque pudieron perderse eventos.
+
+    notificaciones.suscribir({'categorias', 'sucursales'}, lambda cambios: cache.invalidar())
+    notificaciones.iniciar()
+
+    python notificaciones.py escuchar   # Imprime los cambios agrupados (diagnóstico)
+"""
+import argparse
+import os
+import select
+import threading
+import time
+from collections import defaultdict
+
+from database import obtener_engine
+
+CANAL = 'cambios_tablas'
+VENTANA_SEGUNDOS = 0.5 # Eventos que llegan dentro de la ventana se despachan juntos
+ESPERA_MAXIMA_RECONEXION = 30
+# Permite desactivar la escucha también en los procesos que la inician (ESCUCHAR_CAMBIOS=0)
+ESCUCHAR_CAMBIOS = os.environ.get('ESCUCHAR_CAMBIOS', '1') != '0'
+
+_suscriptores = [] # (conjunto de tablas o None para todas, función)
+_suscriptores_lock = threading.Lock()
+
+def suscribir(tablas, funcion):
+    """
+    Registra funcion(cambios), con cambios = {tabla: {operaciones}}, para las tablas indicadas
+    (None = todas). Se llama desde el hilo de escucha: debe ser rápida y segura entre hilos.
+    """
+    with _suscriptores_lock:
+        _suscriptores.append((frozenset(tablas) if tablas is not None else None, funcion))
+
+def _tablas_suscritas():
+    from queries import TABLAS_NOTIFICADAS
+    with _suscriptores_lock:
+        tablas = set()
+        for filtro, _ in _suscriptores:
+            tablas |= filtro if filtro is not None else set(TABLAS_NOTIFICADAS)
+    return tablas
+
+def despachar(cambios):
+    """Entrega a cada suscriptor los cambios de sus tablas."""
+    with _suscriptores_lock:
+        suscriptores = list(_suscriptores)
+    for filtro, funcion in suscriptores:
+        relevantes = {tabla: operaciones for tabla, operaciones in cambios.items() if filtro is None or tabla in filtro}
+        if relevantes:
+            try:
+                funcion(relevantes)
+            except Exception as e:
+                print(f"⚠️ Error en el suscriptor de cambios {getattr(funcion, '__name__', funcion)}: {e}")
+
+class Escucha:
+    """Hilo de fondo con una conexión dedicada en LISTEN sobre CANAL."""
+
+    def __init__(self, ventana=VENTANA_SEGUNDOS, engine=None):
+        self.ventana = ventana
+        self.engine = engine or obtener_engine()
+        self.recibidas = 0 # Notificaciones recibidas
+        self.despachos = 0 # Grupos despachados tras la ventana
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._bucle, name='escucha-cambios', daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join()
+
+    def _conectar(self):
+        # Conexión fuera del pool: queda abierta en LISTEN durante toda la vida del proceso
+        conexion = self.engine.raw_connection()
+        conexion.detach()
+        dbapi = conexion.dbapi_connection
+        dbapi.autocommit = True
+        with dbapi.cursor() as cursor:
+            cursor.execute(f"LISTEN {CANAL}")
+        return conexion, dbapi
+
+    def _pendientes(self, dbapi):
+        if hasattr(dbapi, 'poll'): # psycopg2
+            dbapi.poll()
+            while dbapi.notifies:
+                yield dbapi.notifies.pop(0)
+        else: # psycopg 3: solo las que ya llegaron, sin bloquear
+            yield from dbapi.notifies(timeout=0)
+
+    def _acumular(self, dbapi, cambios):
+        for notificacion in self._pendientes(dbapi):
+            tabla, _, operacion = notificacion.payload.partition(':')
+            cambios[tabla].add(operacion or '?')
+            self.recibidas += 1
+
+    def _esperar(self, dbapi, segundos):
+        return bool(select.select([dbapi], [], [], segundos)[0])
+
+    def _bucle(self):
+        espera = 1
+        while not self._detener.is_set():
+            conexion = None
+            try:
+                conexion, dbapi = self._conectar()
+                espera = 1
+                # Lo que cambió antes del LISTEN (o durante una desconexión) no se notificó
+                despachar({tabla: {'R'} for tabla in _tablas_suscritas()})
+                while not self._detener.is_set():
+                    if not self._esperar(dbapi, 1.0):
+                        continue
+                    cambios = defaultdict(set)
+                    self._acumular(dbapi, cambios)
+                    limite = time.monotonic() + self.ventana
+                    while (restante := limite - time.monotonic()) > 0:
+                        if self._esperar(dbapi, restante):
+                            self._acumular(dbapi, cambios)
+                    if cambios:
+                        self.despachos += 1
+                        despachar(dict(cambios))
+            except Exception as e:
+                print(f"⚠️ Escucha de cambios desconectada ({e}); reintentando en {espera} s.")
+                self._detener.wait(espera)
+                espera = min(espera * 2, ESPERA_MAXIMA_RECONEXION)
+            finally:
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except Exception:
+                        pass
+
+_escucha = None
+_escucha_lock = threading.Lock()
+
+def iniciar():
+    """Inicia (una sola vez por proceso) el hilo de escucha. Retorna la Escucha, o None si está desactivada."""
+    global _escucha
+    if not ESCUCHAR_CAMBIOS:
+        return None
+    with _escucha_lock:
+        if _escucha is None:
+            _escucha = Escucha().iniciar()
+        return _escucha
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Escucha los cambios notificados por los triggers de queries.py.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    escuchar = subparsers.add_parser('escuchar', help="Imprime los cambios agrupados por ventana.")
+    escuchar.add_argument('--ventana', type=float, default=VENTANA_SEGUNDOS, help="Segundos de agrupación.")
+    args = parser.parse_args()
+
+    suscribir(None, lambda cambios: print(f"[{time.strftime('%H:%M:%S')}] " + ", ".join(
+        f"{tabla} ({''.join(sorted(operaciones))})" for tabla, operaciones in sorted(cambios.items()))))
+    escucha = Escucha(args.ventana).iniciar()
+    print(f"Escuchando el canal '{CANAL}' (Ctrl+C para terminar)...")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        escucha.detener()
+        print(f"\n{escucha.recibidas} notificaciones recibidas en {escucha.despachos} grupos.")
@@ -1,14 +1,17 @@
-import psycopg2
-from psycopg2 import OperationalError
-from database import DATABASE_URL #conexión a la base de datos
+import importlib
+from database import DATABASE_URL, DB_DRIVER #conexión a la base de datos
+
+# psycopg2 o psycopg (3) según DB_DRIVER; ambos exponen connect() y OperationalError
+driver = importlib.import_module(DB_DRIVER)
+OperationalError = driver.OperationalError
 
 def execute_sql_command(sql_command, commit=False):
     """Ejecuta un comando SQL y maneja la conexión."""
     conn = None
     try:
-        conn = psycopg2.connect(
+        conn = driver.connect(
             host="localhost",
-            database="institucion", 
+            dbname="institucion",
             user="postgres",
             password="datos2025"
         )
@@ -107,12 +110,14 @@ def create_sql_functions():
         v_cantidad_vendida := NEW.cantidad;
 
         -- Registrar movimiento de inventario (salida)
-        INSERT INTO movimientos_inventario (fecha, tipo, cantidad, motivo, producto_id, empleado_id)
-        VALUES (NOW(), 'salida', v_cantidad_vendida, 'Venta (Venta ID: ' || NEW.venta_id || ')', v_producto_id, v_empleado_id);
+        INSERT INTO movimientos_inventario (fecha, tipo, cantidad, motivo, producto_id, empleado_id, sucursal_id)
+        VALUES (NOW(), 'salida', v_cantidad_vendida, 'Venta (Venta ID: ' || NEW.venta_id || ')', v_producto_id, v_empleado_id, v_sucursal_id);
 
         -- Ajustar stock en la tabla de inventario por sucursal
+        -- (fecha_actualizacion se mantiene al día para la exportación incremental)
         UPDATE inventario
-        SET cantidad = cantidad - v_cantidad_vendida
+        SET cantidad = cantidad - v_cantidad_vendida,
+            fecha_actualizacion = NOW()
         WHERE producto_id = v_producto_id AND sucursal_id = v_sucursal_id;
 
         RETURN NEW;
@@ -152,13 +157,15 @@ def create_sql_functions():
         END IF;
 
         -- Registrar movimiento de inventario (entrada)
-        INSERT INTO movimientos_inventario (fecha, tipo, cantidad, motivo, producto_id, empleado_id)
-        VALUES (NOW(), 'entrada', v_cantidad_comprada, 'Compra (Compra ID: ' || NEW.compra_id || ')', v_producto_id, v_empleado_id);
+        INSERT INTO movimientos_inventario (fecha, tipo, cantidad, motivo, producto_id, empleado_id, sucursal_id)
+        VALUES (NOW(), 'entrada', v_cantidad_comprada, 'Compra (Compra ID: ' || NEW.compra_id || ')', v_producto_id, v_empleado_id, v_sucursal_destino);
 
         -- Ajustar stock en la tabla de inventario por sucursal
-        INSERT INTO inventario (producto_id, sucursal_id, cantidad, ubicacion)
-        VALUES (v_producto_id, v_sucursal_destino, v_cantidad_comprada, 'AUTOMATICO') -- Ubicación por defecto
-        ON CONFLICT (producto_id, sucursal_id) DO UPDATE SET cantidad = inventario.cantidad + EXCLUDED.cantidad;
+        INSERT INTO inventario (producto_id, sucursal_id, cantidad, ubicacion, fecha_actualizacion)
+        VALUES (v_producto_id, v_sucursal_destino, v_cantidad_comprada, 'AUTOMATICO', NOW()) -- Ubicación por defecto
+        ON CONFLICT (producto_id, sucursal_id) DO UPDATE
+        SET cantidad = inventario.cantidad + EXCLUDED.cantidad,
+            fecha_actualizacion = NOW();
 
         RETURN NEW;
     END;
@@ -182,9 +189,130 @@ def create_sql_functions():
     $$ LANGUAGE plpgsql;
     """, commit=True)
 
+    # Función para mantener la cola de alertas de stock cuando cambia el inventario de una sucursal
+    execute_sql_command("""
+    CREATE OR REPLACE FUNCTION sync_alerta_stock_inventario()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        v_stock_minimo INT;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM alertas_stock WHERE producto_id = OLD.producto_id AND sucursal_id = OLD.sucursal_id;
+            RETURN OLD;
+        END IF;
+
+        SELECT stock_minimo INTO v_stock_minimo FROM productos WHERE id = NEW.producto_id;
+
+        IF COALESCE(NEW.cantidad, 0) < v_stock_minimo THEN
+            INSERT INTO alertas_stock (producto_id, sucursal_id, cantidad, stock_minimo, fecha_alerta, fecha_actualizacion)
+            VALUES (NEW.producto_id, NEW.sucursal_id, COALESCE(NEW.cantidad, 0), v_stock_minimo, NOW(), NOW())
+            ON CONFLICT (producto_id, sucursal_id) DO UPDATE
+            SET cantidad = EXCLUDED.cantidad,
+                stock_minimo = EXCLUDED.stock_minimo,
+                fecha_actualizacion = NOW();
+        ELSIF TG_OP = 'UPDATE' AND COALESCE(OLD.cantidad, 0) < v_stock_minimo THEN
+            -- Solo se borra si antes estaba en alerta: la mayoría de las actualizaciones no tocan la cola
+            DELETE FROM alertas_stock WHERE producto_id = NEW.producto_id AND sucursal_id = NEW.sucursal_id;
+        END IF;
+
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """, commit=True)
+
+    # Función para mantener facturas.monto_pagado y el estado de la factura al registrar,
+    # modificar o eliminar pagos. El plazo de 30 días coincide con PLAZO_PAGO_DIAS de cuentas_por_cobrar.py.
+    execute_sql_command("""
+    CREATE OR REPLACE FUNCTION sync_factura_monto_pagado()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE facturas
+            SET monto_pagado = monto_pagado - OLD.monto,
+                estado = CASE
+                    WHEN estado = 'anulada' THEN estado
+                    WHEN monto_pagado - OLD.monto >= total THEN 'pagada'
+                    WHEN fecha < NOW() - INTERVAL '30 days' THEN 'vencida'
+                    ELSE 'pendiente'
+                END
+            WHERE id = OLD.factura_id;
+        END IF;
+
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE facturas
+            SET monto_pagado = monto_pagado + NEW.monto,
+                estado = CASE
+                    WHEN estado = 'anulada' THEN estado
+                    WHEN monto_pagado + NEW.monto >= total THEN 'pagada'
+                    WHEN fecha < NOW() - INTERVAL '30 days' THEN 'vencida'
+                    ELSE 'pendiente'
+                END
+            WHERE id = NEW.factura_id;
+            RETURN NEW;
+        END IF;
+
+        RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """, commit=True)
+
+    # Función para recalcular las alertas de un producto cuando cambia su stock mínimo
+    execute_sql_command("""
+    CREATE OR REPLACE FUNCTION sync_alertas_stock_producto()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        DELETE FROM alertas_stock a
+        USING inventario i
+        WHERE a.producto_id = NEW.id
+          AND i.producto_id = a.producto_id AND i.sucursal_id = a.sucursal_id
+          AND COALESCE(i.cantidad, 0) >= NEW.stock_minimo;
+
+        INSERT INTO alertas_stock (producto_id, sucursal_id, cantidad, stock_minimo, fecha_alerta, fecha_actualizacion)
+        SELECT producto_id, sucursal_id, COALESCE(cantidad, 0), NEW.stock_minimo, NOW(), NOW()
+        FROM inventario
+        WHERE producto_id = NEW.id AND COALESCE(cantidad, 0) < NEW.stock_minimo
+        ON CONFLICT (producto_id, sucursal_id) DO UPDATE
+        SET stock_minimo = EXCLUDED.stock_minimo,
+            fecha_actualizacion = NOW();
+
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """, commit=True)
+
+    # Función de los triggers de notificación (ver notificaciones.py): un evento 'tabla:operación'
+    # por sentencia. PostgreSQL descarta los payloads repetidos dentro de una transacción, así que una
+    # carga masiva notifica una vez por tabla y operación. Con el argumento 'directo' se omiten las
+    # escrituras hechas desde otro trigger (la cascada de cada venta sobre inventario y productos):
+    # NOTIFY serializa los commits que notifican, y el stock no se cachea.
+    execute_sql_command("""
+    CREATE OR REPLACE FUNCTION notificar_cambio_tabla()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_NARGS > 0 AND TG_ARGV[0] = 'directo' AND pg_trigger_depth() > 1 THEN
+            RETURN NULL;
+        END IF;
+        PERFORM pg_notify('cambios_tablas', TG_TABLE_NAME || ':' || left(TG_OP, 1));
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """, commit=True)
+
 
     print("\n--- Funciones SQL creadas/actualizadas exitosamente. ---")
 
+# Tablas con trigger de notificación de cambios -> argumento de notificar_cambio_tabla()
+TABLAS_NOTIFICADAS = {
+    'productos': "'directo'",
+    'inventario': "'directo'",
+    'categorias': '',
+    'clientes': '',
+    'empleados': '',
+    'sucursales': '',
+    'puestos': '',
+    'departamentos': '',
+}
+
 def create_triggers():
     """Crea triggers en la base de datos."""
     print("\n--- Creando/Actualizando Triggers ---")
@@ -235,6 +363,43 @@ def create_triggers():
     EXECUTE FUNCTION update_producto_total_stock();
     """, commit=True)
 
+    # Trigger para mantener el monto pagado y el estado de las facturas a partir de los pagos
+    execute_sql_command("""
+    DROP TRIGGER IF EXISTS trg_sync_factura_monto_pagado ON pagos;
+    CREATE TRIGGER trg_sync_factura_monto_pagado
+    AFTER INSERT OR DELETE OR UPDATE OF monto, factura_id ON pagos
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_factura_monto_pagado();
+    """, commit=True)
+
+    # Triggers para la cola de alertas de stock: cambios de cantidad por sucursal y de stock mínimo.
+    # El de productos filtra por columna y con WHEN para no dispararse con cada recálculo de `stock`.
+    execute_sql_command("""
+    DROP TRIGGER IF EXISTS trg_sync_alerta_stock_inventario ON inventario;
+    CREATE TRIGGER trg_sync_alerta_stock_inventario
+    AFTER INSERT OR DELETE OR UPDATE OF cantidad ON inventario
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_alerta_stock_inventario();
+
+    DROP TRIGGER IF EXISTS trg_sync_alertas_stock_producto ON productos;
+    CREATE TRIGGER trg_sync_alertas_stock_producto
+    AFTER UPDATE OF stock_minimo ON productos
+    FOR EACH ROW
+    WHEN (OLD.stock_minimo IS DISTINCT FROM NEW.stock_minimo)
+    EXECUTE FUNCTION sync_alertas_stock_producto();
+    """, commit=True)
+
+    # Triggers de notificación de cambios por sentencia (no por fila) para invalidar cachés en
+    # otros procesos; inventario y productos solo notifican escrituras directas
+    for tabla, argumento in TABLAS_NOTIFICADAS.items():
+        execute_sql_command(f"""
+        DROP TRIGGER IF EXISTS trg_notificar_cambio_{tabla} ON {tabla};
+        CREATE TRIGGER trg_notificar_cambio_{tabla}
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabla}
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION notificar_cambio_tabla({argumento});
+        """, commit=True)
+
     print("\n--- Triggers creados/actualizados exitosamente. ---")
 
 def create_views():
@@ -297,11 +462,71 @@ def create_views():
 
     print("\n--- Vistas SQL creadas/actualizadas exitosamente. ---")
 
+def apply_schema_changes():
+    """
+    Aplica a una base existente los cambios de esquema posteriores a su creación. Son las
+    migraciones versionadas de migraciones.py (lock_timeout, reintentos y rellenos por lotes).
+    """
+    print("\n--- Aplicando Cambios de Esquema ---")
+    import migraciones
+    if migraciones.aplicar() is None:
+        print("❌ Quedaron migraciones sin aplicar; ver `python migraciones.py estado`.")
+        return
+    print("\n--- Cambios de esquema aplicados. ---")
+
+def create_indexes():
+    """Crea índices de apoyo para consultas frecuentes."""
+    print("\n--- Creando Índices ---")
+
+    # Índices para la exportación incremental por marca de agua (fecha, id)
+    execute_sql_command("""
+    CREATE INDEX IF NOT EXISTS idx_ventas_fecha_id ON ventas (fecha, id);
+    CREATE INDEX IF NOT EXISTS idx_inventario_fecha_actualizacion_id ON inventario (fecha_actualizacion, id);
+    """, commit=True)
+
+    # Stock en una fecha: snapshot más cercano + cola de movimientos del mismo producto y sucursal
+    execute_sql_command("""
+    CREATE INDEX IF NOT EXISTS idx_movimientos_producto_sucursal_id ON movimientos_inventario (producto_id, sucursal_id, id);
+    CREATE INDEX IF NOT EXISTS idx_movimientos_fecha ON movimientos_inventario (fecha);
+    CREATE INDEX IF NOT EXISTS idx_snapshots_producto_sucursal_fecha ON snapshots_inventario (producto_id, sucursal_id, fecha);
+    """, commit=True)
+
+    # Alertas de stock: índice parcial con solo los productos por debajo del mínimo en total, y
+    # acceso a los detalles de las ventas recientes para calcular la velocidad de venta
+    execute_sql_command("""
+    CREATE INDEX IF NOT EXISTS idx_productos_bajo_minimo ON productos (id) INCLUDE (stock, stock_minimo) WHERE stock < stock_minimo;
+    CREATE INDEX IF NOT EXISTS idx_detalle_ventas_venta_producto ON detalle_ventas (venta_id, producto_id);
+    """, commit=True)
+
+    # Analítica de clientes: actividad reciente por fecha, recálculo por cliente y consultas top-N
+    execute_sql_command("""
+    CREATE INDEX IF NOT EXISTS idx_pedidos_cliente ON pedidos (cliente_id);
+    CREATE INDEX IF NOT EXISTS idx_pedidos_fecha ON pedidos (fecha);
+    CREATE INDEX IF NOT EXISTS idx_facturas_cliente ON facturas (cliente_id);
+    CREATE INDEX IF NOT EXISTS idx_facturas_fecha ON facturas (fecha);
+    CREATE INDEX IF NOT EXISTS idx_pagos_factura ON pagos (factura_id);
+    CREATE INDEX IF NOT EXISTS idx_pagos_fecha ON pagos (fecha);
+    CREATE INDEX IF NOT EXISTS idx_resumen_clientes_ltv ON resumen_clientes (ltv DESC NULLS LAST);
+    CREATE INDEX IF NOT EXISTS idx_resumen_clientes_monto ON resumen_clientes (monto_pedidos DESC);
+    CREATE INDEX IF NOT EXISTS idx_resumen_clientes_segmento ON resumen_clientes (segmento, ltv DESC NULLS LAST);
+    """, commit=True)
+
+    # Cuentas por cobrar: índice parcial solo con las facturas abiertas, para la antigüedad de
+    # saldos y el paso diario de pendiente a vencida
+    execute_sql_command("""
+    CREATE INDEX IF NOT EXISTS idx_facturas_abiertas ON facturas (fecha) INCLUDE (cliente_id, total, monto_pagado)
+    WHERE estado IN ('pendiente', 'vencida');
+    """, commit=True)
+
+    print("\n--- Índices creados exitosamente. ---")
+
 def main_queries():
     print("Iniciando creación de funciones, triggers y vistas SQL...")
     create_sql_functions()
     create_triggers()
     create_views()
+    apply_schema_changes()
+    create_indexes()
     print("\nProceso de queries completado.")
 
 if __name__ == '__main__':
@@ -1,13 +1,84 @@
+import argparse
 import csv
-from database import Session, engine, Categoria, Producto, Proveedor, Cliente, Pedido, DetallePedido, Servicio, Empleado, Departamento, Puesto, Factura, Pago, Venta, DetalleVenta, Sucursal, Inventario, MovimientoInventario, Compra, DetalleCompra
-from sqlalchemy import func, extract, distinct, cast, String
-from datetime import datetime, date, timedelta
+import json
+import sys
+from datetime import datetime
+
+FORMATOS_SALIDA = ('csv', 'json', 'parquet', 'xlsx')
+
+def _fecha(valor):
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+def _agregar_opciones_salida(parser):
+    parser.add_argument('--format', dest='formato', choices=FORMATOS_SALIDA, default='csv', help="Formato del archivo exportado (csv por defecto).")
+    parser.add_argument('--out', dest='salida', metavar='ARCHIVO', help="Ruta del archivo exportado (por defecto, nombre con fecha y hora).")
+    parser.add_argument('--copy', dest='export_copy', action='store_true', help="Exporta con COPY TO STDOUT (solo csv, más rápido para reportes grandes).")
+    parser.add_argument('--mostrar', action='store_true', help="Imprime además la tabla en pantalla.")
+    parser.add_argument('--motor', choices=('postgresql', 'duckdb'), default='postgresql', help="Motor de consulta: duckdb lee el snapshot analítico (ver analitico_duckdb.py).")
+
+def construir_parser():
+    """Construye el parser de argumentos de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        prog='reports',
+        description="Reportes de ventas, inventario y pedidos. Sin argumentos abre el menú interactivo.",
+    )
+    parser.add_argument('--metricas', metavar='ARCHIVO.prom', help="Al terminar, escribe las métricas de la ejecución (formato Prometheus).")
+    subparsers = parser.add_subparsers(dest='reporte')
+
+    ventas = subparsers.add_parser('ventas', help="Reporte de ventas detalladas.")
+    ventas.add_argument('--desde', dest='start_date', type=_fecha, metavar='YYYY-MM-DD', help="Fecha de inicio (YYYY-MM-DD).")
+    ventas.add_argument('--hasta', dest='end_date', type=_fecha, metavar='YYYY-MM-DD', help="Fecha de fin (YYYY-MM-DD).")
+    ventas.add_argument('--empleado', dest='empleado_id', type=int, metavar='ID', help="ID del empleado.")
+    ventas.add_argument('--sucursal', dest='sucursal_id', type=int, metavar='ID', help="ID de la sucursal.")
+    ventas.add_argument('--min-total', dest='min_total_venta', type=float, metavar='MONTO', help="Total de venta mínimo.")
+    ventas.add_argument('--max-total', dest='max_total_venta', type=float, metavar='MONTO', help="Total de venta máximo.")
+    ventas.add_argument('--archivo', dest='incluir_archivo', action='store_true', help="Incluye las ventas archivadas en Parquet (ver archivo.py).")
+    ventas.add_argument('--vista-previa', dest='vista_previa', type=float, nargs='?', const=0, metavar='PORCENTAJE', help="Estimaciones por sucursal sobre una muestra (sin PORCENTAJE, automático).")
+    _agregar_opciones_salida(ventas)
+
+    inventario = subparsers.add_parser('inventario', help="Reporte de inventario general.")
+    inventario.add_argument('--categoria', dest='categoria_id', type=int, metavar='ID', help="ID de la categoría.")
+    inventario.add_argument('--min-stock', dest='min_stock', type=int, metavar='N', help="Stock total mínimo.")
+    inventario.add_argument('--max-stock', dest='max_stock', type=int, metavar='N', help="Stock total máximo.")
+    inventario.add_argument('--min-stock-minimo', dest='min_stock_minimo', type=int, metavar='N', help="Umbral de stock mínimo, desde.")
+    inventario.add_argument('--max-stock-minimo', dest='max_stock_minimo', type=int, metavar='N', help="Umbral de stock mínimo, hasta.")
+    inventario.add_argument('--sucursal', dest='en_sucursal_id', type=int, metavar='ID', help="ID de la sucursal.")
+    _agregar_opciones_salida(inventario)
+
+    pedidos = subparsers.add_parser('pedidos', help="Reporte de pedidos por cliente.")
+    pedidos.add_argument('--cliente', dest='cliente_id', type=int, metavar='ID', help="ID del cliente.")
+    pedidos.add_argument('--empleado', dest='empleado_id', type=int, metavar='ID', help="ID del empleado responsable.")
+    pedidos.add_argument('--estado', dest='estado_pedido', metavar='ESTADO', help="Estado del pedido (ej. completado, pendiente).")
+    pedidos.add_argument('--min-total', dest='min_total_pedido', type=float, metavar='MONTO', help="Total de pedido mínimo.")
+    pedidos.add_argument('--max-total', dest='max_total_pedido', type=float, metavar='MONTO', help="Total de pedido máximo.")
+    pedidos.add_argument('--desde', dest='start_date', type=_fecha, metavar='YYYY-MM-DD', help="Fecha de inicio (YYYY-MM-DD).")
+    pedidos.add_argument('--hasta', dest='end_date', type=_fecha, metavar='YYYY-MM-DD', help="Fecha de fin (YYYY-MM-DD).")
+    pedidos.add_argument('--archivo', dest='incluir_archivo', action='store_true', help="Incluye los pedidos archivados en Parquet (ver archivo.py).")
+    pedidos.add_argument('--vista-previa', dest='vista_previa', type=float, nargs='?', const=0, metavar='PORCENTAJE', help="Estimaciones por estado sobre una muestra (sin PORCENTAJE, automático).")
+    _agregar_opciones_salida(pedidos)
+
+    lote = subparsers.add_parser('lote', help="Ejecuta varios reportes desde un archivo de trabajos YAML o JSON.")
+    lote.add_argument('archivo', help="Archivo .yaml/.yml/.json con una lista 'trabajos'.")
+    return parser
+
+# Los argumentos se analizan antes de importar SQLAlchemy y los modelos: `--help` o un
+# error de uso responden sin pagar ese costo de arranque.
+if __name__ == '__main__':
+    _ARGUMENTOS = construir_parser().parse_args()
+
+import archivo
+import cache_referencia
+import metricas
+import notificaciones
+from database import obtener_session_lectura, estadisticas_cache_compilacion, Categoria, Producto, Cliente, Pedido, Empleado, Venta, DetalleVenta, Sucursal, Inventario
+from filas import FilaVenta, FilaInventario, FilaPedido, leer_filas
+from sqlalchemy import func, lambda_stmt, select
 
 # --- Configuración y Utilidades ---
 
 def get_session():
-    """Retorna una nueva sesión de SQLAlchemy."""
-    return Session()
+    """Retorna una sesión de solo lectura (réplica si hay una disponible, si no el primario)."""
+    return obtener_session_lectura()
 
 def print_header(title):
     """Imprime un encabezado formateado para los reportes."""
@@ -27,11 +98,271 @@ def export_to_csv(filename, header, data):
                 # Asegurarse de que cada elemento de la fila sea una cadena para evitar errores de escritura
                 writer.writerow([str(item) if item is not None else '' for item in row])
         print(f"\n✅ Reporte exportado exitosamente a '{filename}'")
+        return True
     except Exception as e:
         print(f"❌ Error al exportar a CSV '{filename}': {e}")
+        return False
+
+def nombre_archivo_reporte(prefijo, formato='csv'):
+    """Nombre por defecto del archivo exportado: prefijo + fecha y hora + extensión."""
+    return f"{prefijo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+
+def escribir_resultado(filename, header, data, formato='csv'):
+    """
+    Escribe el resultado de un reporte en el formato indicado (csv, json, parquet o xlsx).
+    pandas (y pyarrow/openpyxl) solo se importan cuando se pide parquet o xlsx.
+    """
+    if formato == 'csv':
+        return export_to_csv(filename, header, data)
+    try:
+        if formato == 'json':
+            with open(filename, 'w', encoding='utf-8') as jsonfile:
+                json.dump([dict(zip(header, row)) for row in data], jsonfile, ensure_ascii=False, indent=2, default=str)
+        elif formato in ('parquet', 'xlsx'):
+            import pandas as pd
+            df = pd.DataFrame(data, columns=header)
+            if formato == 'parquet':
+                df.to_parquet(filename, index=False)
+            else:
+                df.to_excel(filename, index=False)
+        else:
+            raise ValueError(f"Formato no soportado: {formato}")
+        print(f"\n✅ Reporte exportado exitosamente a '{filename}'")
+        return True
+    except Exception as e:
+        print(f"❌ Error al exportar a {formato.upper()} '{filename}': {e}")
+        return False
+
+def export_copy_csv(session, statement, filename):
+    """
+    Exporta el resultado de una consulta con COPY (...) TO STDOUT WITH CSV HEADER.
+    Las filas se escriben directo al archivo desde PostgreSQL, sin hidratarlas en Python,
+    así que la memoria del cliente no crece con el tamaño del reporte.
+    """
+    try:
+        conn = session.connection()
+        compiled = statement.compile(dialect=conn.dialect)
+        dbapi = conn.connection.dbapi_connection
+        if conn.dialect.driver == 'psycopg':
+            import psycopg
+            # psycopg 3 envía los parámetros aparte; ClientCursor los incrusta como psycopg2
+            cursor = psycopg.ClientCursor(dbapi)
+            sql = cursor.mogrify(str(compiled), compiled.params)
+            with open(filename, 'wb') as csvfile, cursor.copy(f"COPY ({sql}) TO STDOUT WITH (FORMAT CSV, HEADER, ENCODING 'UTF8')") as copia:
+                for bloque in copia:
+                    csvfile.write(bloque)
+        else:
+            cursor = dbapi.cursor()
+            # mogrify incrusta los parámetros de los filtros con el escape del propio driver
+            sql = cursor.mogrify(str(compiled), compiled.params).decode('utf-8')
+            with open(filename, 'wb') as csvfile:
+                cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT CSV, HEADER, ENCODING 'UTF8')", csvfile)
+        filas = cursor.rowcount
+        print(f"\n✅ Reporte exportado con COPY a '{filename}' ({filas} filas)")
+        cursor.close()
+        return filas
+    except Exception as e:
+        print(f"❌ Error al exportar con COPY a '{filename}': {e}")
+        return None
+
+# --- Consultas base y filtros de cada reporte ---
+# Las consultas se arman con lambda_stmt: SQLAlchemy guarda el SQL compilado por cada
+# combinación de filtros usada y los valores de los filtros viajan como parámetros, así
+# que ejecutar de nuevo un reporte no vuelve a construir ni a compilar la consulta.
+# Las columnas "COPY" dan formato en SQL (to_char) con los mismos encabezados del CSV normal,
+# para que la exportación con COPY produzca el mismo archivo sin hidratar filas en Python.
+
+FORMATO_MONEDA_SQL = 'FM999,999,999,990.00' # Equivalente a f"{valor:,.2f}"
+FORMATO_FECHA_SQL = 'YYYY-MM-DD HH24:MI:SS' # Equivalente a strftime('%Y-%m-%d %H:%M:%S')
+
+_COLUMNAS_VENTAS = (
+    Venta.id.label('VentaID'),
+    Venta.fecha.label('FechaVenta'),
+    Venta.total.label('TotalVenta'),
+    Sucursal.nombre.label('Sucursal'),
+    Empleado.nombre.label('EmpleadoNombre'),
+    Empleado.apellido.label('EmpleadoApellido'),
+    Producto.nombre.label('Producto'),
+    DetalleVenta.cantidad.label('Cantidad'),
+    DetalleVenta.precio_unitario.label('PrecioUnitario'),
+    DetalleVenta.subtotal.label('SubtotalDetalle')
+)
+
+_COLUMNAS_COPY_VENTAS = (
+    Venta.id.label('Venta ID'),
+    func.to_char(Venta.fecha, FORMATO_FECHA_SQL).label('Fecha Venta'),
+    func.to_char(Venta.total, FORMATO_MONEDA_SQL).label('Total Venta'),
+    Sucursal.nombre.label('Sucursal'),
+    func.concat(Empleado.nombre, ' ', Empleado.apellido).label('Empleado'),
+    Producto.nombre.label('Producto'),
+    DetalleVenta.cantidad.label('Cantidad'),
+    func.to_char(DetalleVenta.precio_unitario, FORMATO_MONEDA_SQL).label('Precio Unitario'),
+    func.to_char(DetalleVenta.subtotal, FORMATO_MONEDA_SQL).label('Subtotal Detalle')
+)
+
+def _consulta_ventas(columnas):
+    """Consulta base de Ventas con sus Detalles, Empleado, Sucursal y Producto."""
+    return lambda_stmt(lambda: select(*columnas)
+        .join(Empleado, Venta.empleado_id == Empleado.id)
+        .join(Sucursal, Venta.sucursal_id == Sucursal.id)
+        .join(DetalleVenta, Venta.id == DetalleVenta.venta_id)
+        .join(Producto, DetalleVenta.producto_id == Producto.id), track_on=[columnas])
+
+def _filtrar_ventas(session, query, start_date, end_date, empleado_id, sucursal_id, min_total_venta, max_total_venta):
+    """Aplica (e imprime) los filtros del reporte de ventas detalladas."""
+    if start_date:
+        query += lambda q: q.where(Venta.fecha >= start_date)
+        print(f"Filtro: Fecha de inicio >= {start_date}")
+    if end_date:
+        query += lambda q: q.where(Venta.fecha <= end_date)
+        print(f"Filtro: Fecha de fin <= {end_date}")
+    if empleado_id:
+        query += lambda q: q.where(Venta.empleado_id == empleado_id)
+        emp = session.get(Empleado, empleado_id)
+        if emp: print(f"Filtro: Empleado = {emp.nombre} {emp.apellido}")
+    # Aunque Cliente no está directamente en Venta, podríamos filtrar por Cliente a través de Pedidos si la Venta viene de un Pedido.
+    # Por simplicidad aquí, si la Venta es directa, no hay Cliente directo. Si necesitas esto, deberías modelar Venta a Cliente.
+    # Para este reporte, no hay un `cliente_id` directo en `Venta`. Si la `Venta` es una `VentaDirecta`, el `cliente_id`
+    # no aplica. Si la `Venta` proviene de un `Pedido`, el filtro debería ir a `Pedido` y luego `Cliente`.
+    # Para cumplir con 5 filtros sin asumir una relación directa Venta-Cliente, usaré `min_total_venta` y `max_total_venta`.
+    # Si tu Venta puede tener Cliente, lo añadirías así:
+    # if cliente_id:
+    #    query = query.join(Pedido, Venta.pedido_id == Pedido.id).filter(Pedido.cliente_id == cliente_id)
+    #    cli = session.get(Cliente, cliente_id)
+    #    if cli: print(f"Filtro: Cliente = {cli.nombre} {cli.apellido}")
+
+    if sucursal_id:
+        query += lambda q: q.where(Venta.sucursal_id == sucursal_id)
+        suc = cache_referencia.obtener('sucursales', sucursal_id)
+        if suc: print(f"Filtro: Sucursal = {suc.nombre}")
+    if min_total_venta is not None:
+        query += lambda q: q.where(Venta.total >= min_total_venta)
+        print(f"Filtro: Total de Venta >= {min_total_venta}")
+    if max_total_venta is not None:
+        query += lambda q: q.where(Venta.total <= max_total_venta)
+        print(f"Filtro: Total de Venta <= {max_total_venta}")
+    return query
+
+_COLUMNAS_INVENTARIO = (
+    Producto.codigo.label('CodigoProducto'),
+    Producto.nombre.label('NombreProducto'),
+    Categoria.nombre.label('Categoria'),
+    Inventario.cantidad.label('CantidadInventario'),
+    Producto.stock.label('StockTotalProducto'),
+    Producto.stock_minimo.label('StockMinimoProducto'),
+    Sucursal.nombre.label('Sucursal'),
+    Inventario.ubicacion.label('Ubicacion')
+)
+
+_COLUMNAS_COPY_INVENTARIO = (
+    Producto.codigo.label('Código Producto'),
+    Producto.nombre.label('Nombre Producto'),
+    Categoria.nombre.label('Categoría'),
+    func.coalesce(Inventario.cantidad, 0).label('Cantidad en Inventario'),
+    Producto.stock.label('Stock Total Producto'),
+    Producto.stock_minimo.label('Stock Mínimo'),
+    func.coalesce(Sucursal.nombre, 'N/A').label('Sucursal'),
+    func.coalesce(Inventario.ubicacion, 'N/A').label('Ubicación')
+)
+
+def _consulta_inventario(columnas):
+    """Consulta base de Productos con su Categoría e Inventario por Sucursal."""
+    return lambda_stmt(lambda: select(*columnas)
+        .select_from(Producto)
+        .join(Categoria, Producto.categoria_id == Categoria.id)
+        .outerjoin(Inventario, Producto.id == Inventario.producto_id)
+        .outerjoin(Sucursal, Inventario.sucursal_id == Sucursal.id), track_on=[columnas])
+
+def _filtrar_inventario(session, query, categoria_id, min_stock, max_stock, min_stock_minimo, max_stock_minimo, en_sucursal_id):
+    """Aplica (e imprime) los filtros del reporte de inventario general."""
+    if categoria_id:
+        query += lambda q: q.where(Producto.categoria_id == categoria_id)
+        cat = cache_referencia.obtener('categorias', categoria_id)
+        if cat: print(f"Filtro: Categoría = {cat.nombre}")
+    if min_stock is not None:
+        query += lambda q: q.where(Producto.stock >= min_stock)
+        print(f"Filtro: Stock Total >= {min_stock}")
+    if max_stock is not None:
+        query += lambda q: q.where(Producto.stock <= max_stock)
+        print(f"Filtro: Stock Total <= {max_stock}")
+    if min_stock_minimo is not None:
+        query += lambda q: q.where(Producto.stock_minimo >= min_stock_minimo)
+        print(f"Filtro: Stock Mínimo Producto >= {min_stock_minimo}")
+    if max_stock_minimo is not None:
+        query += lambda q: q.where(Producto.stock_minimo <= max_stock_minimo)
+        print(f"Filtro: Stock Mínimo Producto <= {max_stock_minimo}")
+    if en_sucursal_id:
+        query += lambda q: q.where(Inventario.sucursal_id == en_sucursal_id)
+        suc = cache_referencia.obtener('sucursales', en_sucursal_id)
+        if suc: print(f"Filtro: En Sucursal = {suc.nombre}")
+    return query
+
+_COLUMNAS_PEDIDOS = (
+    Pedido.numero.label('NumeroPedido'),
+    Pedido.fecha.label('FechaPedido'),
+    Pedido.total.label('TotalPedido'),
+    Pedido.estado.label('EstadoPedido'),
+    Cliente.nombre.label('NombreCliente'),
+    Cliente.apellido.label('ApellidoCliente'),
+    Cliente.email.label('EmailCliente'),
+    Empleado.nombre.label('NombreEmpleado'),
+    Empleado.apellido.label('ApellidoEmpleado')
+)
+
+_COLUMNAS_COPY_PEDIDOS = (
+    Pedido.numero.label('Número Pedido'),
+    func.to_char(Pedido.fecha, FORMATO_FECHA_SQL).label('Fecha Pedido'),
+    func.to_char(Pedido.total, FORMATO_MONEDA_SQL).label('Total Pedido'),
+    Pedido.estado.label('Estado'),
+    func.concat(Cliente.nombre, ' ', Cliente.apellido).label('Cliente'),
+    Cliente.email.label('Email Cliente'),
+    func.concat(Empleado.nombre, ' ', Empleado.apellido).label('Empleado Responsable')
+)
+
+def _consulta_pedidos(columnas):
+    """Consulta base de Pedidos con su Cliente y Empleado."""
+    return lambda_stmt(lambda: select(*columnas)
+        .select_from(Pedido)
+        .join(Cliente, Pedido.cliente_id == Cliente.id)
+        .join(Empleado, Pedido.empleado_id == Empleado.id), track_on=[columnas])
+
+def _filtrar_pedidos(session, query, cliente_id, empleado_id, estado_pedido, min_total_pedido, max_total_pedido, start_date, end_date):
+    """Aplica (e imprime) los filtros del reporte de pedidos por cliente."""
+    if cliente_id:
+        query += lambda q: q.where(Pedido.cliente_id == cliente_id)
+        cli = session.get(Cliente, cliente_id)
+        if cli: print(f"Filtro: Cliente = {cli.nombre} {cli.apellido}")
+    if empleado_id:
+        query += lambda q: q.where(Pedido.empleado_id == empleado_id)
+        emp = session.get(Empleado, empleado_id)
+        if emp: print(f"Filtro: Empleado = {emp.nombre} {emp.apellido}")
+    if estado_pedido:
+        query += lambda q: q.where(Pedido.estado == estado_pedido)
+        print(f"Filtro: Estado = {estado_pedido}")
+    if min_total_pedido is not None:
+        query += lambda q: q.where(Pedido.total >= min_total_pedido)
+        print(f"Filtro: Total de Pedido >= {min_total_pedido}")
+    if max_total_pedido is not None:
+        query += lambda q: q.where(Pedido.total <= max_total_pedido)
+        print(f"Filtro: Total de Pedido <= {max_total_pedido}")
+    if start_date:
+        query += lambda q: q.where(Pedido.fecha >= start_date)
+        print(f"Filtro: Fecha de inicio >= {start_date}")
+    if end_date:
+        query += lambda q: q.where(Pedido.fecha <= end_date)
+        print(f"Filtro: Fecha de fin <= {end_date}")
+    return query
+
+def _leer(session, query, clase, motor):
+    """Lee las filas del reporte en PostgreSQL o, con motor='duckdb', en el snapshot analítico."""
+    if motor == 'duckdb':
+        import analitico_duckdb # duckdb solo se carga si se pide el motor analítico
+        return analitico_duckdb.leer_filas(query, clase)
+    return leer_filas(session, query, clase)
 
 # --- REPORTES CON FILTROS Y EXPORTACIÓN CSV ---
 
+@metricas.medir_reporte('ventas')
 def report_ventas_detalladas(
     start_date=None,
     end_date=None,
@@ -40,7 +371,14 @@ def report_ventas_detalladas(
     sucursal_id=None,
     min_total_venta=None,
     max_total_venta=None,
-    export_csv=False
+    export_csv=False,
+    export_copy=False, # Exporta con COPY TO STDOUT, sin mostrar el reporte en pantalla
+    formato=None, # csv, json, parquet o xlsx; implica exportar
+    salida=None, # Ruta del archivo exportado (por defecto, nombre con fecha y hora)
+    mostrar=True, # Imprime la tabla en pantalla
+    incluir_archivo=False, # Une las ventas archivadas en Parquet si el rango llega al archivo
+    motor='postgresql', # 'duckdb' lee el snapshot analítico (ver analitico_duckdb.py)
+    vista_previa=None # Porcentaje de muestra (0 = automático): solo estimaciones, ver vista_previa.py
 ):
     """
     Reporte 1: Ventas Detalladas con múltiples filtros.
@@ -51,62 +389,29 @@ def report_ventas_detalladas(
     print_header(report_title)
 
     try:
-        # Construir la consulta base para Ventas y sus Detalles
-        query = session.query(
-            Venta.id.label('VentaID'),
-            Venta.fecha.label('FechaVenta'),
-            Venta.total.label('TotalVenta'),
-            Sucursal.nombre.label('Sucursal'),
-            Empleado.nombre.label('EmpleadoNombre'),
-            Empleado.apellido.label('EmpleadoApellido'),
-            Producto.nombre.label('Producto'),
-            DetalleVenta.cantidad.label('Cantidad'),
-            DetalleVenta.precio_unitario.label('PrecioUnitario'),
-            DetalleVenta.subtotal.label('SubtotalDetalle')
-        ).join(Empleado, Venta.empleado_id == Empleado.id)\
-         .join(Sucursal, Venta.sucursal_id == Sucursal.id)\
-         .join(DetalleVenta, Venta.id == DetalleVenta.venta_id)\
-         .join(Producto, DetalleVenta.producto_id == Producto.id)
-
-        # Aplicar filtros
-        if start_date:
-            query = query.filter(Venta.fecha >= start_date)
-            print(f"Filtro: Fecha de inicio >= {start_date}")
-        if end_date:
-            query = query.filter(Venta.fecha <= end_date)
-            print(f"Filtro: Fecha de fin <= {end_date}")
-        if empleado_id:
-            query = query.filter(Venta.empleado_id == empleado_id)
-            emp = session.query(Empleado).filter_by(id=empleado_id).first()
-            if emp: print(f"Filtro: Empleado = {emp.nombre} {emp.apellido}")
-        # Aunque Cliente no está directamente en Venta, podríamos filtrar por Cliente a través de Pedidos si la Venta viene de un Pedido.
-        # Por simplicidad aquí, si la Venta es directa, no hay Cliente directo. Si necesitas esto, deberías modelar Venta a Cliente.
-        # Para este reporte, no hay un `cliente_id` directo en `Venta`. Si la `Venta` es una `VentaDirecta`, el `cliente_id`
-        # no aplica. Si la `Venta` proviene de un `Pedido`, el filtro debería ir a `Pedido` y luego `Cliente`.
-        # Para cumplir con 5 filtros sin asumir una relación directa Venta-Cliente, usaré `min_total_venta` y `max_total_venta`.
-        # Si tu Venta puede tener Cliente, lo añadirías así:
-        # if cliente_id:
-        #    query = query.join(Pedido, Venta.pedido_id == Pedido.id).filter(Pedido.cliente_id == cliente_id)
-        #    cli = session.query(Cliente).filter_by(id=cliente_id).first()
-        #    if cli: print(f"Filtro: Cliente = {cli.nombre} {cli.apellido}")
-
-        if sucursal_id:
-            query = query.filter(Venta.sucursal_id == sucursal_id)
-            suc = session.query(Sucursal).filter_by(id=sucursal_id).first()
-            if suc: print(f"Filtro: Sucursal = {suc.nombre}")
-        if min_total_venta is not None:
-            query = query.filter(Venta.total >= min_total_venta)
-            print(f"Filtro: Total de Venta >= {min_total_venta}")
-        if max_total_venta is not None:
-            query = query.filter(Venta.total <= max_total_venta)
-            print(f"Filtro: Total de Venta <= {max_total_venta}")
-
-
-        results = query.order_by(Venta.fecha.desc()).all()
+        if vista_previa is not None:
+            import vista_previa as previa
+            return previa.ventas(session, start_date, end_date, empleado_id, sucursal_id, min_total_venta, max_total_venta, vista_previa or None)
+
+        if export_copy:
+            # Exportación rápida: el formato se hace en SQL y las filas no pasan por Python
+            query = _filtrar_ventas(session, _consulta_ventas(_COLUMNAS_COPY_VENTAS), start_date, end_date, empleado_id, sucursal_id, min_total_venta, max_total_venta)
+            query += lambda q: q.order_by(Venta.fecha.desc(), Venta.id, DetalleVenta.id)
+            return export_copy_csv(session, query, salida or nombre_archivo_reporte('reporte_ventas_detalladas'))
+
+        # Construir la consulta base para Ventas y sus Detalles y aplicar filtros
+        query = _filtrar_ventas(session, _consulta_ventas(_COLUMNAS_VENTAS), start_date, end_date, empleado_id, sucursal_id, min_total_venta, max_total_venta)
+
+        query += lambda q: q.order_by(Venta.fecha.desc(), Venta.id, DetalleVenta.id)
+        results = _leer(session, query, FilaVenta, motor)
+        if incluir_archivo and archivo.necesita_archivo('ventas', start_date):
+            archivadas = archivo.ventas_archivadas(session, start_date, end_date, empleado_id, sucursal_id, min_total_venta, max_total_venta)
+            print(f"Incluye {len(archivadas)} líneas de ventas archivadas.")
+            results = archivo.combinar(results, archivadas, 'VentaID', 'FechaVenta')
 
         if not results:
             print("No se encontraron ventas con los filtros aplicados.")
-            return
+            return 0
 
         # Preparar datos para visualización y exportación
         header = ['Venta ID', 'Fecha Venta', 'Total Venta', 'Sucursal', 'Empleado', 'Producto', 'Cantidad', 'Precio Unitario', 'Subtotal Detalle']
@@ -125,18 +430,21 @@ def report_ventas_detalladas(
             ))
 
         # Visualización
-        print("-" * 120)
-        print(f"{'Venta ID':<10} {'Fecha':<19} {'Total Venta':<15} {'Sucursal':<20} {'Empleado':<20} {'Producto':<25} {'Cant':<7} {'Precio Unit.':<15} {'Subtotal':<15}")
-        print("-" * 180) # Ajustado para la cantidad de columnas
-        for row in data:
-            print(f"{row[0]:<10} {row[1]:<19} {row[2]:<15} {row[3]:<20} {row[4]:<20} {row[5]:<25} {row[6]:<7} {row[7]:<15} {row[8]:<15}")
-        print("-" * 180)
+        if mostrar:
+            print("-" * 120)
+            print(f"{'Venta ID':<10} {'Fecha':<19} {'Total Venta':<15} {'Sucursal':<20} {'Empleado':<20} {'Producto':<25} {'Cant':<7} {'Precio Unit.':<15} {'Subtotal':<15}")
+            print("-" * 180) # Ajustado para la cantidad de columnas
+            for row in data:
+                print(f"{row[0]:<10} {row[1]:<19} {row[2]:<15} {row[3]:<20} {row[4]:<20} {row[5]:<25} {row[6]:<7} {row[7]:<15} {row[8]:<15}")
+            print("-" * 180)
 
 
-        # Exportación a CSV
-        if export_csv:
-            csv_filename = f"reporte_ventas_detalladas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            export_to_csv(csv_filename, header, data)
+        # Exportación a CSV (u otro formato)
+        if export_csv or formato:
+            formato = formato or 'csv'
+            if not escribir_resultado(salida or nombre_archivo_reporte('reporte_ventas_detalladas', formato), header, data, formato):
+                return None
+        return len(data)
 
     except Exception as e:
         print(f"❌ Error al generar el reporte de ventas detalladas: {e}")
@@ -144,6 +452,7 @@ def report_ventas_detalladas(
         session.close()
 
 
+@metricas.medir_reporte('inventario')
 def report_inventario_general(
     categoria_id=None,
     min_stock=None,
@@ -151,7 +460,12 @@ def report_inventario_general(
     min_stock_minimo=None, # Nuevo filtro: stock mínimo
     max_stock_minimo=None, # Nuevo filtro: stock máximo
     en_sucursal_id=None, # Nuevo filtro: inventario en una sucursal específica
-    export_csv=False
+    export_csv=False,
+    export_copy=False, # Exporta con COPY TO STDOUT, sin mostrar el reporte en pantalla
+    formato=None, # csv, json, parquet o xlsx; implica exportar
+    salida=None, # Ruta del archivo exportado (por defecto, nombre con fecha y hora)
+    mostrar=True, # Imprime la tabla en pantalla
+    motor='postgresql' # 'duckdb' lee el snapshot analítico (ver analitico_duckdb.py)
 ):
     """
     Reporte 2: Inventario General con múltiples filtros.
@@ -162,46 +476,20 @@ def report_inventario_general(
     print_header(report_title)
 
     try:
-        query = session.query(
-            Producto.codigo.label('CodigoProducto'),
-            Producto.nombre.label('NombreProducto'),
-            Categoria.nombre.label('Categoria'),
-            Inventario.cantidad.label('CantidadInventario'),
-            Producto.stock.label('StockTotalProducto'),
-            Producto.stock_minimo.label('StockMinimoProducto'),
-            Sucursal.nombre.label('Sucursal'),
-            Inventario.ubicacion.label('Ubicacion')
-        ).join(Categoria, Producto.categoria_id == Categoria.id)\
-         .outerjoin(Inventario, Producto.id == Inventario.producto_id)\
-         .outerjoin(Sucursal, Inventario.sucursal_id == Sucursal.id)
-        
-        # Aplicar filtros
-        if categoria_id:
-            query = query.filter(Producto.categoria_id == categoria_id)
-            cat = session.query(Categoria).filter_by(id=categoria_id).first()
-            if cat: print(f"Filtro: Categoría = {cat.nombre}")
-        if min_stock is not None:
-            query = query.filter(Producto.stock >= min_stock)
-            print(f"Filtro: Stock Total >= {min_stock}")
-        if max_stock is not None:
-            query = query.filter(Producto.stock <= max_stock)
-            print(f"Filtro: Stock Total <= {max_stock}")
-        if min_stock_minimo is not None:
-            query = query.filter(Producto.stock_minimo >= min_stock_minimo)
-            print(f"Filtro: Stock Mínimo Producto >= {min_stock_minimo}")
-        if max_stock_minimo is not None:
-            query = query.filter(Producto.stock_minimo <= max_stock_minimo)
-            print(f"Filtro: Stock Mínimo Producto <= {max_stock_minimo}")
-        if en_sucursal_id:
-            query = query.filter(Inventario.sucursal_id == en_sucursal_id)
-            suc = session.query(Sucursal).filter_by(id=en_sucursal_id).first()
-            if suc: print(f"Filtro: En Sucursal = {suc.nombre}")
-
-        results = query.order_by(Producto.nombre, Sucursal.nombre).all()
+        if export_copy:
+            # Exportación rápida: el formato se hace en SQL y las filas no pasan por Python
+            query = _filtrar_inventario(session, _consulta_inventario(_COLUMNAS_COPY_INVENTARIO), categoria_id, min_stock, max_stock, min_stock_minimo, max_stock_minimo, en_sucursal_id)
+            query += lambda q: q.order_by(Producto.nombre, Sucursal.nombre, Producto.id, Inventario.id)
+            return export_copy_csv(session, query, salida or nombre_archivo_reporte('reporte_inventario_general'))
+
+        query = _filtrar_inventario(session, _consulta_inventario(_COLUMNAS_INVENTARIO), categoria_id, min_stock, max_stock, min_stock_minimo, max_stock_minimo, en_sucursal_id)
+
+        query += lambda q: q.order_by(Producto.nombre, Sucursal.nombre, Producto.id, Inventario.id)
+        results = _leer(session, query, FilaInventario, motor)
 
         if not results:
             print("No se encontraron productos en inventario con los filtros aplicados.")
-            return
+            return 0
 
         # Preparar datos para visualización y exportación
         header = ['Código Producto', 'Nombre Producto', 'Categoría', 'Cantidad en Inventario', 'Stock Total Producto', 'Stock Mínimo', 'Sucursal', 'Ubicación']
@@ -219,17 +507,20 @@ def report_inventario_general(
             ))
 
         # Visualización
-        print("-" * 120)
-        print(f"{'Cod. Prod':<12} {'Producto':<35} {'Categoría':<20} {'Cant. Inv.':<12} {'Stock Total':<12} {'Stock Mín.':<12} {'Sucursal':<20} {'Ubicación':<15}")
-        print("-" * 180)
-        for row in data:
-            print(f"{row[0]:<12} {row[1]:<35} {row[2]:<20} {row[3]:<12} {row[4]:<12} {row[5]:<12} {row[6]:<20} {row[7]:<15}")
-        print("-" * 180)
-
-        # Exportación a CSV
-        if export_csv:
-            csv_filename = f"reporte_inventario_general_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            export_to_csv(csv_filename, header, data)
+        if mostrar:
+            print("-" * 120)
+            print(f"{'Cod. Prod':<12} {'Producto':<35} {'Categoría':<20} {'Cant. Inv.':<12} {'Stock Total':<12} {'Stock Mín.':<12} {'Sucursal':<20} {'Ubicación':<15}")
+            print("-" * 180)
+            for row in data:
+                print(f"{row[0]:<12} {row[1]:<35} {row[2]:<20} {row[3]:<12} {row[4]:<12} {row[5]:<12} {row[6]:<20} {row[7]:<15}")
+            print("-" * 180)
+
+        # Exportación a CSV (u otro formato)
+        if export_csv or formato:
+            formato = formato or 'csv'
+            if not escribir_resultado(salida or nombre_archivo_reporte('reporte_inventario_general', formato), header, data, formato):
+                return None
+        return len(data)
 
     except Exception as e:
         print(f"❌ Error al generar el reporte de inventario general: {e}")
@@ -237,6 +528,7 @@ def report_inventario_general(
         session.close()
 
 
+@metricas.medir_reporte('pedidos')
 def report_pedidos_por_cliente(
     cliente_id=None,
     empleado_id=None,
@@ -245,7 +537,14 @@ def report_pedidos_por_cliente(
     max_total_pedido=None,
     start_date=None,
     end_date=None,
-    export_csv=False
+    export_csv=False,
+    export_copy=False, # Exporta con COPY TO STDOUT, sin mostrar el reporte en pantalla
+    formato=None, # csv, json, parquet o xlsx; implica exportar
+    salida=None, # Ruta del archivo exportado (por defecto, nombre con fecha y hora)
+    mostrar=True, # Imprime la tabla en pantalla
+    incluir_archivo=False, # Une los pedidos archivados en Parquet si el rango llega al archivo
+    motor='postgresql', # 'duckdb' lee el snapshot analítico (ver analitico_duckdb.py)
+    vista_previa=None # Porcentaje de muestra (0 = automático): solo estimaciones, ver vista_previa.py
 ):
     """
     Reporte 3: Pedidos por Cliente con múltiples filtros.
@@ -256,50 +555,28 @@ def report_pedidos_por_cliente(
     print_header(report_title)
 
     try:
-        query = session.query(
-            Pedido.numero.label('NumeroPedido'),
-            Pedido.fecha.label('FechaPedido'),
-            Pedido.total.label('TotalPedido'),
-            Pedido.estado.label('EstadoPedido'),
-            Cliente.nombre.label('NombreCliente'),
-            Cliente.apellido.label('ApellidoCliente'),
-            Cliente.email.label('EmailCliente'),
-            Empleado.nombre.label('NombreEmpleado'),
-            Empleado.apellido.label('ApellidoEmpleado')
-        ).join(Cliente, Pedido.cliente_id == Cliente.id)\
-         .join(Empleado, Pedido.empleado_id == Empleado.id)
-
-        # Aplicar filtros
-        if cliente_id:
-            query = query.filter(Pedido.cliente_id == cliente_id)
-            cli = session.query(Cliente).filter_by(id=cliente_id).first()
-            if cli: print(f"Filtro: Cliente = {cli.nombre} {cli.apellido}")
-        if empleado_id:
-            query = query.filter(Pedido.empleado_id == empleado_id)
-            emp = session.query(Empleado).filter_by(id=empleado_id).first()
-            if emp: print(f"Filtro: Empleado = {emp.nombre} {emp.apellido}")
-        if estado_pedido:
-            query = query.filter(Pedido.estado == estado_pedido)
-            print(f"Filtro: Estado = {estado_pedido}")
-        if min_total_pedido is not None:
-            query = query.filter(Pedido.total >= min_total_pedido)
-            print(f"Filtro: Total de Pedido >= {min_total_pedido}")
-        if max_total_pedido is not None:
-            query = query.filter(Pedido.total <= max_total_pedido)
-            print(f"Filtro: Total de Pedido <= {max_total_pedido}")
-        if start_date:
-            query = query.filter(Pedido.fecha >= start_date)
-            print(f"Filtro: Fecha de inicio >= {start_date}")
-        if end_date:
-            query = query.filter(Pedido.fecha <= end_date)
-            print(f"Filtro: Fecha de fin <= {end_date}")
-
-
-        results = query.order_by(Pedido.fecha.desc()).all()
+        if vista_previa is not None:
+            import vista_previa as previa
+            return previa.pedidos(session, cliente_id, empleado_id, estado_pedido, min_total_pedido, max_total_pedido, start_date, end_date, vista_previa or None)
+
+        if export_copy:
+            # Exportación rápida: el formato se hace en SQL y las filas no pasan por Python
+            query = _filtrar_pedidos(session, _consulta_pedidos(_COLUMNAS_COPY_PEDIDOS), cliente_id, empleado_id, estado_pedido, min_total_pedido, max_total_pedido, start_date, end_date)
+            query += lambda q: q.order_by(Pedido.fecha.desc(), Pedido.id)
+            return export_copy_csv(session, query, salida or nombre_archivo_reporte('reporte_pedidos_cliente'))
+
+        query = _filtrar_pedidos(session, _consulta_pedidos(_COLUMNAS_PEDIDOS), cliente_id, empleado_id, estado_pedido, min_total_pedido, max_total_pedido, start_date, end_date)
+
+        query += lambda q: q.order_by(Pedido.fecha.desc(), Pedido.id)
+        results = _leer(session, query, FilaPedido, motor)
+        if incluir_archivo and archivo.necesita_archivo('pedidos', start_date):
+            archivados = archivo.pedidos_archivados(session, cliente_id, empleado_id, estado_pedido, min_total_pedido, max_total_pedido, start_date, end_date)
+            print(f"Incluye {len(archivados)} pedidos archivados.")
+            results = archivo.combinar(results, archivados, 'NumeroPedido', 'FechaPedido')
 
         if not results:
             print("No se encontraron pedidos con los filtros aplicados.")
-            return
+            return 0
 
         # Preparar datos para visualización y exportación
         header = ['Número Pedido', 'Fecha Pedido', 'Total Pedido', 'Estado', 'Cliente', 'Email Cliente', 'Empleado Responsable']
@@ -316,17 +593,20 @@ def report_pedidos_por_cliente(
             ))
 
         # Visualización
-        print("-" * 120)
-        print(f"{'No. Pedido':<15} {'Fecha':<19} {'Total':<15} {'Estado':<12} {'Cliente':<30} {'Email Cliente':<30} {'Empleado':<25}")
-        print("-" * 180)
-        for row in data:
-            print(f"{row[0]:<15} {row[1]:<19} {row[2]:<15} {row[3]:<12} {row[4]:<30} {row[5]:<30} {row[6]:<25}")
-        print("-" * 180)
-
-        # Exportación a CSV
-        if export_csv:
-            csv_filename = f"reporte_pedidos_cliente_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            export_to_csv(csv_filename, header, data)
+        if mostrar:
+            print("-" * 120)
+            print(f"{'No. Pedido':<15} {'Fecha':<19} {'Total':<15} {'Estado':<12} {'Cliente':<30} {'Email Cliente':<30} {'Empleado':<25}")
+            print("-" * 180)
+            for row in data:
+                print(f"{row[0]:<15} {row[1]:<19} {row[2]:<15} {row[3]:<12} {row[4]:<30} {row[5]:<30} {row[6]:<25}")
+            print("-" * 180)
+
+        # Exportación a CSV (u otro formato)
+        if export_csv or formato:
+            formato = formato or 'csv'
+            if not escribir_resultado(salida or nombre_archivo_reporte('reporte_pedidos_cliente', formato), header, data, formato):
+                return None
+        return len(data)
 
     except Exception as e:
         print(f"❌ Error al generar el reporte de pedidos por cliente: {e}")
@@ -359,6 +639,7 @@ def main_menu():
             min_total_venta_str = input("Monto mínimo de venta (dejar vacío para omitir): ")
             max_total_venta_str = input("Monto máximo de venta (dejar vacío para omitir): ")
             export = input("¿Exportar a CSV? (s/n): ").lower() == 's'
+            export_copy = export and input("¿Usar exportación rápida con COPY (no muestra el reporte en pantalla)? (s/n): ").lower() == 's'
 
             # Convertir inputs
             start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else None
@@ -375,7 +656,8 @@ def main_menu():
                 sucursal_id=sucursal_id,
                 min_total_venta=min_total_venta,
                 max_total_venta=max_total_venta,
-                export_csv=export
+                export_csv=export,
+                export_copy=export_copy
             )
         elif choice == '2':
             print("\n--- Configuración Reporte de Inventario General ---")
@@ -386,6 +668,7 @@ def main_menu():
             max_stock_minimo_str = input("Stock máximo (umbral) de producto (dejar vacío para omitir): ")
             en_sucursal_id_str = input("ID de Sucursal (para ver inventario en esa sucursal, dejar vacío para omitir): ")
             export = input("¿Exportar a CSV? (s/n): ").lower() == 's'
+            export_copy = export and input("¿Usar exportación rápida con COPY (no muestra el reporte en pantalla)? (s/n): ").lower() == 's'
 
             # Convertir inputs
             categoria_id = int(categoria_id_str) if categoria_id_str.isdigit() else None
@@ -402,7 +685,8 @@ def main_menu():
                 min_stock_minimo=min_stock_minimo,
                 max_stock_minimo=max_stock_minimo,
                 en_sucursal_id=en_sucursal_id,
-                export_csv=export
+                export_csv=export,
+                export_copy=export_copy
             )
         elif choice == '3':
             print("\n--- Configuración Reporte de Pedidos por Cliente ---")
@@ -414,6 +698,7 @@ def main_menu():
             start_date_str = input("Fecha de inicio del pedido (YYYY-MM-DD, dejar vacío para omitir): ")
             end_date_str = input("Fecha de fin del pedido (YYYY-MM-DD, dejar vacío para omitir): ")
             export = input("¿Exportar a CSV? (s/n): ").lower() == 's'
+            export_copy = export and input("¿Usar exportación rápida con COPY (no muestra el reporte en pantalla)? (s/n): ").lower() == 's'
 
             # Convertir inputs
             cliente_id = int(cliente_id_str) if cliente_id_str.isdigit() else None
@@ -432,7 +717,8 @@ def main_menu():
                 max_total_pedido=max_total_pedido,
                 start_date=start_date,
                 end_date=end_date,
-                export_csv=export
+                export_csv=export,
+                export_copy=export_copy
             )
         elif choice == '0':
             print("Saliendo del programa de reportes. ¡Hasta luego!")
@@ -440,6 +726,98 @@ def main_menu():
         else:
             print("Opción no válida. Por favor, intente de nuevo.")
 
+# --- Ejecución no interactiva ---
+
+def ejecutar_reporte(argumentos):
+    """
+    Ejecuta el reporte indicado por los argumentos ya analizados.
+    Retorna el número de filas reportadas, o None si hubo un error.
+    """
+    parametros = {clave: valor for clave, valor in vars(argumentos).items() if clave not in ('reporte', 'metricas')}
+    if parametros['export_copy'] and parametros['formato'] != 'csv':
+        print("❌ --copy solo está disponible con --format csv.")
+        return None
+    if parametros['export_copy'] and parametros.get('incluir_archivo'):
+        print("❌ --copy no incluye datos archivados; use --archivo sin --copy.")
+        return None
+    if parametros.get('vista_previa') is not None and (parametros['export_copy'] or parametros['motor'] == 'duckdb' or parametros.get('incluir_archivo')):
+        print("❌ --vista-previa solo estima sobre PostgreSQL; no se combina con --copy, --motor duckdb ni --archivo.")
+        return None
+    if parametros.get('vista_previa') is not None and not 0 <= parametros['vista_previa'] <= 100:
+        print("❌ El porcentaje de --vista-previa debe estar entre 0 y 100.")
+        return None
+    if parametros['export_copy'] and parametros['motor'] == 'duckdb':
+        print("❌ --copy exporta desde PostgreSQL; no se combina con --motor duckdb.")
+        return None
+    return REPORTES[argumentos.reporte](**parametros)
+
+def _argv_de_trabajo(trabajo):
+    """Convierte un trabajo del archivo de lote ({'reporte': 'ventas', 'desde': ...}) en argumentos de la CLI."""
+    trabajo = dict(trabajo)
+    argv = [str(trabajo.pop('reporte'))]
+    for clave, valor in trabajo.items():
+        opcion = '--' + clave.replace('_', '-')
+        if valor is True:
+            argv.append(opcion)
+        elif valor not in (None, False):
+            argv.extend([opcion, str(valor)])
+    return argv
+
+def ejecutar_lote(ruta_lote, parser):
+    """
+    Ejecuta en este mismo proceso todos los trabajos de un archivo YAML o JSON, por ejemplo:
+
+        trabajos:
+          - {reporte: ventas, desde: 2025-01-01, sucursal: 3, format: parquet, out: ventas_s3.parquet}
+          - {reporte: inventario, categoria: 2, out: inventario_cat2.csv}
+
+    Todos comparten el mismo engine y pool de conexiones. Retorna True si todos terminaron bien.
+    """
+    with open(ruta_lote, encoding='utf-8') as f:
+        if ruta_lote.endswith(('.yaml', '.yml')):
+            import yaml # Solo se carga si el lote está en YAML
+            contenido = yaml.safe_load(f)
+        else:
+            contenido = json.load(f)
+    trabajos = contenido.get('trabajos', []) if isinstance(contenido, dict) else contenido
+
+    fallidos = 0
+    for i, trabajo in enumerate(trabajos, start=1):
+        try:
+            argumentos = parser.parse_args(_argv_de_trabajo(trabajo))
+        except SystemExit:
+            print(f"❌ Trabajo {i}: argumentos inválidos {trabajo}")
+            fallidos += 1
+            continue
+        if argumentos.reporte == 'lote':
+            print(f"❌ Trabajo {i}: un lote no puede contener otro lote.")
+            fallidos += 1
+            continue
+        if ejecutar_reporte(argumentos) is None:
+            fallidos += 1
+    print(f"\n{'✅' if not fallidos else '⚠️'} Lote terminado: {len(trabajos) - fallidos} de {len(trabajos)} trabajos correctos.")
+    estadisticas = estadisticas_cache_compilacion()
+    print(f"Caché de compilación: {estadisticas.get('CACHE_HIT', 0)} aciertos, {estadisticas.get('CACHE_MISS', 0)} compilaciones ({estadisticas['tasa_aciertos']:.0%} de aciertos)")
+    return fallidos == 0
+
+REPORTES = {
+    'ventas': report_ventas_detalladas,
+    'inventario': report_inventario_general,
+    'pedidos': report_pedidos_por_cliente,
+}
+
 if __name__ == '__main__':
-    print("Asegúrese de haber ejecutado 'database.py', 'queries.py' e 'inserts.py' para tener la base de datos y los datos listos.")
-    main_menu()
\ No newline at end of file
+    if _ARGUMENTOS.metricas:
+        metricas.instrumentar()
+    codigo = 0
+    if _ARGUMENTOS.reporte is None:
+        print("Asegúrese de haber ejecutado 'database.py', 'queries.py' e 'inserts.py' para tener la base de datos y los datos listos.")
+        notificaciones.iniciar()
+        main_menu()
+    elif _ARGUMENTOS.reporte == 'lote':
+        codigo = 0 if ejecutar_lote(_ARGUMENTOS.archivo, construir_parser()) else 1
+    else:
+        codigo = 0 if ejecutar_reporte(_ARGUMENTOS) is not None else 1
+    if _ARGUMENTOS.metricas:
+        metricas.escribir_archivo(_ARGUMENTOS.metricas)
+    sys.exit(codigo)
@@ -0,0 +1,231 @@
+"""
+Snapshots de inventario y compactación del libro de movimientos.
+
+* tomar_snapshot(): copia la cantidad actual de cada producto en cada sucursal a
+  snapshots_inventario, junto con el ID del último movimiento ya reflejado en ella.
+* stock_en_fecha(): stock de un producto en una sucursal en cualquier fecha, a partir del
+  snapshot anterior más cercano más la cola de movimientos posteriores (acotada por la
+  frecuencia de los snapshots), en lugar de recorrer todo el libro.
+* compactar_movimientos(): resume por mes, producto, sucursal y tipo los movimientos ya
+  cubiertos por un snapshot anterior a una fecha de corte y los elimina del libro.
+
+Pensado para ejecutarse desde cron, por ejemplo un snapshot diario y una compactación mensual:
+    python snapshots_inventario.py snapshot
+    python snapshots_inventario.py compactar --antes-de 2025-01-01
+    python snapshots_inventario.py stock --producto 10 --sucursal 2 --fecha "2025-03-15 18:00"
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import obtener_session
+
+TAMANO_LOTE_COMPACTACION = 50000
+
+# Cantidad con signo de un movimiento: los triggers registran las salidas con cantidad positiva
+_CANTIDAD_CON_SIGNO = """
+    CASE tipo WHEN 'salida' THEN -ABS(cantidad) WHEN 'entrada' THEN ABS(cantidad) ELSE cantidad END
+"""
+
+# --- Snapshots ---
+
+def tomar_snapshot():
+    """
+    Guarda el stock actual de todas las combinaciones producto/sucursal.
+    Retorna la fecha del snapshot, o None si hubo un error.
+    """
+    session = obtener_session()
+    try:
+        # El bloqueo SHARE espera a que terminen las transacciones que escriben inventario o
+        # movimientos y frena las nuevas mientras se copia: así la cantidad copiada incluye
+        # exactamente los movimientos con ID <= ultimo_movimiento_id.
+        session.execute(text("LOCK TABLE inventario, movimientos_inventario IN SHARE MODE"))
+        fecha, ultimo_movimiento_id = session.execute(text("""
+            SELECT clock_timestamp()::timestamp, COALESCE(MAX(id), 0) FROM movimientos_inventario
+        """)).one()
+        filas = session.execute(text("""
+            INSERT INTO snapshots_inventario (fecha, producto_id, sucursal_id, cantidad, ultimo_movimiento_id)
+            SELECT :fecha, producto_id, sucursal_id, COALESCE(cantidad, 0), :ultimo
+            FROM inventario
+        """), {'fecha': fecha, 'ultimo': ultimo_movimiento_id}).rowcount
+        session.commit()
+        print(f"✅ Snapshot de inventario del {fecha:%Y-%m-%d %H:%M:%S}: {filas} combinaciones producto/sucursal.")
+        return fecha
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error al tomar el snapshot de inventario: {e}")
+        return None
+    finally:
+        session.close()
+
+# --- Consulta de stock en una fecha ---
+
+def _horizonte_compactado(session):
+    """ID del último movimiento eliminado por la compactación (0 si nunca se compactó)."""
+    return session.execute(text("SELECT COALESCE(MAX(ultimo_movimiento_id), 0) FROM resumen_movimientos_archivados")).scalar()
+
+def stock_en_fecha(producto_id, sucursal_id, fecha):
+    """
+    Retorna el stock del producto en la sucursal en la fecha indicada, o None si hubo un error.
+
+    Parte del snapshot más cercano anterior a la fecha y suma los movimientos posteriores a
+    él. Si no hay ninguno anterior, parte del siguiente (o del inventario actual) y descuenta
+    los movimientos hacia atrás. Si movimientos del producto y la sucursal posteriores a la
+    fecha ya fueron compactados, el resultado es el del snapshot disponible, y se avisa.
+    """
+    session = obtener_session()
+    try:
+        parametros = {'producto': producto_id, 'sucursal': sucursal_id, 'fecha': fecha}
+        horizonte = _horizonte_compactado(session)
+
+        anterior = session.execute(text("""
+            SELECT fecha, cantidad, ultimo_movimiento_id
+            FROM snapshots_inventario
+            WHERE producto_id = :producto AND sucursal_id = :sucursal AND fecha <= :fecha
+            ORDER BY fecha DESC
+            LIMIT 1
+        """), parametros).first()
+
+        if anterior:
+            if anterior.ultimo_movimiento_id < horizonte:
+                print(f"⚠️ Los movimientos posteriores al snapshot del {anterior.fecha:%Y-%m-%d %H:%M} ya fueron compactados; se usa ese snapshot.")
+                return anterior.cantidad
+            cola = session.execute(text(f"""
+                SELECT COALESCE(SUM({_CANTIDAD_CON_SIGNO}), 0)
+                FROM movimientos_inventario
+                WHERE producto_id = :producto AND sucursal_id = :sucursal
+                  AND id > :ultimo AND fecha <= :fecha
+            """), dict(parametros, ultimo=anterior.ultimo_movimiento_id)).scalar()
+            return anterior.cantidad + cola
+
+        # Sin snapshot anterior: partir del siguiente, o del inventario actual, y retroceder
+        siguiente = session.execute(text("""
+            SELECT fecha, cantidad, ultimo_movimiento_id
+            FROM snapshots_inventario
+            WHERE producto_id = :producto AND sucursal_id = :sucursal AND fecha > :fecha
+            ORDER BY fecha
+            LIMIT 1
+        """), parametros).first()
+        if siguiente is None:
+            siguiente = session.execute(text("""
+                SELECT NOW()::timestamp AS fecha, COALESCE(i.cantidad, 0) AS cantidad,
+                       (SELECT COALESCE(MAX(id), 0) FROM movimientos_inventario) AS ultimo_movimiento_id
+                FROM (SELECT 1) AS uno
+                LEFT JOIN inventario i ON i.producto_id = :producto AND i.sucursal_id = :sucursal
+            """), parametros).one()
+        # Retroceder solo es exacto si no se compactó ningún movimiento del par posterior a la fecha
+        compactados = horizonte and session.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM resumen_movimientos_archivados
+                WHERE producto_id = :producto AND sucursal_id = :sucursal AND fecha_hasta > :fecha
+            )
+        """), parametros).scalar()
+        if compactados:
+            print(f"⚠️ La fecha es anterior al historial compactado; se usa el stock del {siguiente.fecha:%Y-%m-%d %H:%M}.")
+            return siguiente.cantidad
+        posteriores = session.execute(text(f"""
+            SELECT COALESCE(SUM({_CANTIDAD_CON_SIGNO}), 0)
+            FROM movimientos_inventario
+            WHERE producto_id = :producto AND sucursal_id = :sucursal
+              AND id <= :ultimo AND fecha > :fecha
+        """), dict(parametros, ultimo=siguiente.ultimo_movimiento_id)).scalar()
+        return siguiente.cantidad - posteriores
+    except Exception as e:
+        print(f"❌ Error al calcular el stock en fecha: {e}")
+        return None
+    finally:
+        session.close()
+
+# --- Compactación ---
+
+def compactar_movimientos(antes_de, tamano_lote=TAMANO_LOTE_COMPACTACION, depurar_snapshots=True):
+    """
+    Resume y elimina los movimientos ya incluidos en el último snapshot anterior a `antes_de`.
+    Cada lote de IDs se resume y se borra en la misma transacción, así que una compactación
+    interrumpida puede volver a ejecutarse sin contar nada dos veces.
+    Retorna la cantidad de movimientos compactados, o None si hubo un error.
+    """
+    session = obtener_session()
+    try:
+        corte = session.execute(text("""
+            SELECT fecha, MAX(ultimo_movimiento_id) AS ultimo_movimiento_id
+            FROM snapshots_inventario
+            WHERE fecha <= :antes_de
+            GROUP BY fecha
+            ORDER BY fecha DESC
+            LIMIT 1
+        """), {'antes_de': antes_de}).first()
+        if corte is None:
+            print(f"⚠️ No hay snapshots anteriores al {antes_de:%Y-%m-%d}; tome uno antes de compactar.")
+            return 0
+
+        total = 0
+        desde = session.execute(text("SELECT COALESCE(MIN(id), 0) FROM movimientos_inventario")).scalar()
+        while desde and desde <= corte.ultimo_movimiento_id:
+            hasta = min(desde + tamano_lote - 1, corte.ultimo_movimiento_id)
+            rango = {'desde': desde, 'hasta': hasta}
+            session.execute(text(f"""
+                INSERT INTO resumen_movimientos_archivados
+                    (periodo, producto_id, sucursal_id, tipo, cantidad_neta, movimientos,
+                     fecha_desde, fecha_hasta, ultimo_movimiento_id, fecha_compactacion)
+                SELECT date_trunc('month', fecha)::date, producto_id, sucursal_id, tipo,
+                       SUM({_CANTIDAD_CON_SIGNO}), COUNT(*), MIN(fecha), MAX(fecha), MAX(id), NOW()
+                FROM movimientos_inventario
+                WHERE id BETWEEN :desde AND :hasta
+                GROUP BY 1, 2, 3, 4
+            """), rango)
+            total += session.execute(text("DELETE FROM movimientos_inventario WHERE id BETWEEN :desde AND :hasta"), rango).rowcount
+            session.commit()
+            desde = hasta + 1
+            print(f"  ... {total} movimientos compactados")
+
+        if depurar_snapshots:
+            # Antes del corte ya no hay cola de movimientos: basta un snapshot por mes
+            borrados = session.execute(text("""
+                DELETE FROM snapshots_inventario
+                WHERE fecha < :corte
+                  AND fecha NOT IN (
+                      SELECT MAX(fecha) FROM snapshots_inventario
+                      WHERE fecha < :corte
+                      GROUP BY date_trunc('month', fecha)
+                  )
+            """), {'corte': corte.fecha}).rowcount
+            session.commit()
+            if borrados:
+                print(f"  ... {borrados} filas de snapshots intermedios eliminadas")
+
+        print(f"✅ Compactación terminada: {total} movimientos resumidos hasta el snapshot del {corte.fecha:%Y-%m-%d %H:%M}.")
+        return total
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error al compactar movimientos de inventario: {e}")
+        return None
+    finally:
+        session.close()
+
+def _fecha_hora(valor):
+    return datetime.fromisoformat(valor)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Snapshots de inventario, stock en fecha y compactación de movimientos.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    subparsers.add_parser('snapshot', help="Toma un snapshot del inventario actual.")
+    stock = subparsers.add_parser('stock', help="Stock de un producto en una sucursal en una fecha.")
+    stock.add_argument('--producto', type=int, required=True, metavar='ID')
+    stock.add_argument('--sucursal', type=int, required=True, metavar='ID')
+    stock.add_argument('--fecha', type=_fecha_hora, default=datetime.now(), metavar='"YYYY-MM-DD[ HH:MM]"')
+    compactar = subparsers.add_parser('compactar', help="Resume y elimina movimientos anteriores a una fecha.")
+    compactar.add_argument('--antes-de', dest='antes_de', type=_fecha_hora, required=True, metavar='YYYY-MM-DD')
+    compactar.add_argument('--lote', type=int, default=TAMANO_LOTE_COMPACTACION, metavar='N', help="Movimientos por transacción.")
+    compactar.add_argument('--conservar-snapshots', action='store_true', help="No elimina los snapshots intermedios anteriores al corte.")
+    args = parser.parse_args()
+
+    if args.comando == 'snapshot':
+        tomar_snapshot()
+    elif args.comando == 'stock':
+        cantidad = stock_en_fecha(args.producto, args.sucursal, args.fecha)
+        if cantidad is not None:
+            print(f"Stock del producto {args.producto} en la sucursal {args.sucursal} al {args.fecha:%Y-%m-%d %H:%M}: {cantidad}")
+    else:
+        compactar_movimientos(args.antes_de, args.lote, not args.conservar_snapshots)
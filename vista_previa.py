@@ -0,0 +1,336 @@
+"""
+Vista previa aproximada de los reportes: muestras TABLESAMPLE y sketches HyperLogLog.
+
+Antes de correr el reporte completo de ventas o de pedidos, la vista previa responde en
+milisegundos con estimaciones y su intervalo de confianza del 95 %:
+
+  * Cantidades y montos por sucursal (ventas) o por estado (pedidos) se estiman sobre
+    `TABLESAMPLE SYSTEM (p) REPEATABLE (semilla)`, que toma cada página de la tabla con
+    probabilidad p. Cada total muestral se escala por 1/p (Horvitz-Thompson) y su varianza
+    se calcula por página, (1 - p) / p² · Σ y², porque las filas de una misma página no son
+    independientes. Por defecto p se elige para leer unas FILAS_OBJETIVO filas; con tablas
+    chicas p llega a 100 % y el resultado es exacto.
+  * Los distintos (productos vendidos, clientes con pedidos) no se pueden escalar desde una
+    muestra: salen de sketches HyperLogLog de 2^PRECISION_HLL registros (error estándar
+    ≈ 1,6 %) guardados por día y sucursal en sketches_diarios. Los sketches de varios días
+    o sucursales se unen con el máximo por registro; los días posteriores al último
+    sketch guardado se calculan al vuelo desde el detalle.
+
+    python reports.py ventas --desde 2025-01-01 --vista-previa        # p automático
+    python reports.py pedidos --estado completado --vista-previa 0.5  # 0,5 % de las páginas
+    python vista_previa.py refrescar                                   # sketches hasta ayer
+"""
+import argparse
+import math
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select, text
+
+import cache_referencia
+from database import SketchDiario, obtener_session
+
+PRECISION_HLL = 12
+REGISTROS_HLL = 1 << PRECISION_HLL
+ERROR_RELATIVO_HLL = 1.04 / math.sqrt(REGISTROS_HLL)
+FILAS_OBJETIVO = 20000 # Filas aproximadas que lee la muestra con p automático
+SEMILLA = 42 # REPEATABLE: la misma vista previa devuelve la misma muestra
+Z_95 = 1.96
+DIAS_POR_LOTE_SKETCHES = 31
+
+# Valores distintos con sketch: consulta con (fecha, sucursal_id, valor)
+METRICAS_DISTINTAS = {
+    'productos_vendidos': """
+        SELECT v.fecha, COALESCE(v.sucursal_id, 0) AS sucursal_id, dv.producto_id AS valor
+        FROM detalle_ventas dv JOIN ventas v ON v.id = dv.venta_id
+    """,
+    'clientes_pedidos': "SELECT p.fecha, 0 AS sucursal_id, p.cliente_id AS valor FROM pedidos p",
+}
+
+# --- HyperLogLog ---
+
+class SketchHLL:
+    """Registros de un HyperLogLog (un byte cada uno); se unen con el máximo por registro."""
+
+    def __init__(self, registros=None):
+        if registros is None:
+            self.registros = np.zeros(REGISTROS_HLL, dtype=np.uint8)
+        else:
+            self.registros = np.frombuffer(registros, dtype=np.uint8).copy()
+
+    def unir(self, otro):
+        np.maximum(self.registros, otro.registros, out=self.registros)
+        return self
+
+    def estimar(self):
+        m = REGISTROS_HLL
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimacion = alfa * m * m / np.sum(np.ldexp(1.0, -self.registros.astype(np.int64)))
+        ceros = int(np.count_nonzero(self.registros == 0))
+        if estimacion <= 2.5 * m and ceros:
+            estimacion = m * math.log(m / ceros) # Conteo lineal: más preciso con pocos valores
+        return estimacion
+
+    def a_bytes(self):
+        return self.registros.tobytes()
+
+def _sql_registros(metrica, con_sucursal):
+    """
+    Índice y rango de cada valor, agregados por día, sucursal y registro. El hash de 64 bits
+    (hashtextextended) aporta PRECISION_HLL bits de índice y el rango es la posición del
+    primer 1 en los 52 bits restantes.
+    """
+    bits = 64 - PRECISION_HLL
+    return text(f"""
+        SELECT dia, sucursal_id, (h & {REGISTROS_HLL - 1})::int AS registro,
+               MAX({bits + 1} - length(ltrim(((h >> {PRECISION_HLL}) & {(1 << bits) - 1})::bit({bits})::text, '0'))) AS rango
+        FROM (
+            SELECT f.fecha::date AS dia, f.sucursal_id, hashtextextended(f.valor::text, 0) AS h
+            FROM ({METRICAS_DISTINTAS[metrica]}) f
+            WHERE f.fecha >= :desde AND f.fecha < :hasta AND f.valor IS NOT NULL
+            {'AND f.sucursal_id = :sucursal' if con_sucursal else ''}
+        ) s
+        GROUP BY 1, 2, 3
+    """)
+
+def _sketches_calculados(session, metrica, desde, hasta, sucursal_id=None):
+    """{(día, sucursal): SketchHLL} calculados desde el detalle, para fechas en [desde, hasta)."""
+    parametros = {'desde': desde, 'hasta': hasta, 'sucursal': sucursal_id}
+    registros = {}
+    for dia, sucursal, registro, rango in session.execute(_sql_registros(metrica, sucursal_id is not None), parametros):
+        # La consulta ya trae el máximo por registro: cada fila fija un registro
+        indices, rangos = registros.setdefault((dia, sucursal), ([], []))
+        indices.append(registro)
+        rangos.append(rango)
+    sketches = {}
+    for clave, (indices, rangos) in registros.items():
+        sketch = sketches[clave] = SketchHLL()
+        sketch.registros[indices] = rangos
+    return sketches
+
+def _dia_sin_sketch(session, metrica):
+    ultimo = session.execute(select(func.max(SketchDiario.dia)).where(SketchDiario.metrica == metrica)).scalar()
+    return ultimo + timedelta(days=1) if ultimo else None
+
+def refrescar_sketches(metrica, desde=None, hasta=None, dias_por_lote=DIAS_POR_LOTE_SKETCHES):
+    """
+    Recalcula los sketches de la métrica para los días entre `desde` y `hasta` (inclusivos).
+    Por defecto continúa desde el día siguiente al último sketch hasta ayer. Cada lote de días
+    se borra y se vuelve a insertar en una transacción. Retorna los sketches guardados, o
+    None si hubo un error.
+    """
+    session = obtener_session()
+    try:
+        siguiente = _dia_sin_sketch(session, metrica)
+        if siguiente is None:
+            siguiente = session.execute(text(f"SELECT MIN(fecha)::date FROM ({METRICAS_DISTINTAS[metrica]}) f")).scalar()
+            if siguiente is None:
+                print(f"⚠️ No hay datos para los sketches de {metrica}.")
+                return 0
+        if desde is None:
+            desde = siguiente
+        elif desde > siguiente:
+            # distintos() solo calcula al vuelo los días posteriores al último sketch: un hueco
+            # dejaría esos días fuera de la estimación
+            print(f"❌ Los sketches de {metrica} no cubren desde el {siguiente}; refresque desde esa fecha o antes.")
+            return None
+        ayer = date.today() - timedelta(days=1)
+        if hasta is None or hasta > ayer:
+            # El día en curso lo calcula distintos() al vuelo; un sketch parcial de hoy lo taparía
+            if hasta is not None:
+                print(f"⚠️ Los sketches llegan hasta ayer ({ayer}); se ignora --hasta {hasta}.")
+            hasta = ayer
+
+        total = 0
+        inicio = desde
+        while inicio <= hasta:
+            fin = min(inicio + timedelta(days=dias_por_lote - 1), hasta)
+            session.execute(delete(SketchDiario).where(SketchDiario.metrica == metrica, SketchDiario.dia.between(inicio, fin)))
+            sketches = _sketches_calculados(session, metrica, inicio, fin + timedelta(days=1))
+            if sketches:
+                session.execute(insert(SketchDiario), [
+                    {'dia': dia, 'sucursal_id': sucursal, 'metrica': metrica, 'registros': sketch.a_bytes()}
+                    for (dia, sucursal), sketch in sketches.items()
+                ])
+            session.commit()
+            total += len(sketches)
+            print(f"  ... {metrica} {inicio} a {fin}: {total} sketches")
+            inicio = fin + timedelta(days=1)
+
+        print(f"✅ Sketches de {metrica} actualizados del {desde} al {hasta} ({total} sketches).")
+        return total
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error al refrescar los sketches de {metrica}: {e}")
+        return None
+    finally:
+        session.close()
+
+def _como_dia(valor):
+    return valor.date() if isinstance(valor, datetime) else valor
+
+def distintos(session, metrica, desde=None, hasta=None, sucursal_id=None):
+    """
+    Estimación de valores distintos para los días entre `desde` y `hasta` (inclusivos).
+    Retorna ({sucursal: estimación}, estimación total).
+    """
+    desde, hasta = _como_dia(desde), _como_dia(hasta)
+    corte = _dia_sin_sketch(session, metrica)
+    consulta = select(SketchDiario.sucursal_id, SketchDiario.registros).where(SketchDiario.metrica == metrica)
+    if desde is not None:
+        consulta = consulta.where(SketchDiario.dia >= desde)
+    if hasta is not None:
+        consulta = consulta.where(SketchDiario.dia <= hasta)
+    if sucursal_id is not None:
+        consulta = consulta.where(SketchDiario.sucursal_id == sucursal_id)
+    por_sucursal = {}
+    for sucursal, registros in session.execute(consulta):
+        por_sucursal.setdefault(sucursal, SketchHLL()).unir(SketchHLL(registros))
+
+    # Días sin sketch guardado (incluye hoy): se calculan desde el detalle
+    inicio_cola = max(corte or date.min, desde or date.min)
+    fin_cola = (hasta or date.today()) + timedelta(days=1)
+    if inicio_cola < fin_cola:
+        calculados = _sketches_calculados(session, metrica, inicio_cola, fin_cola, sucursal_id)
+        for (_, sucursal), sketch in calculados.items():
+            por_sucursal.setdefault(sucursal, SketchHLL()).unir(sketch)
+
+    total = SketchHLL()
+    for sketch in por_sucursal.values():
+        total.unir(sketch)
+    return {sucursal: sketch.estimar() for sucursal, sketch in por_sucursal.items()}, total.estimar()
+
+# --- Muestras ---
+
+def porcentaje_automatico(session, tabla):
+    """Porcentaje de páginas que lee unas FILAS_OBJETIVO filas según las estadísticas de la tabla."""
+    filas = session.execute(text("SELECT reltuples FROM pg_class WHERE oid = CAST(:tabla AS regclass)"), {'tabla': tabla}).scalar()
+    if not filas or filas <= FILAS_OBJETIVO:
+        return 100.0 # Sin estadísticas (nunca analizada) o tabla chica: se lee completa
+    return round(min(100.0, 100.0 * FILAS_OBJETIVO / filas), 4)
+
+def estimar_totales(session, tabla, grupo, monto, condiciones, parametros, porcentaje=None, semilla=SEMILLA):
+    """
+    Estima por grupo y en total la cantidad de filas, la suma de `monto` y su promedio sobre
+    una muestra TABLESAMPLE SYSTEM. Cada valor es (estimación, semiancho del IC 95 %).
+    Retorna ({grupo: estimaciones}, estimaciones del total o None si la muestra está vacía,
+    porcentaje usado).
+    """
+    porcentaje = porcentaje or porcentaje_automatico(session, tabla)
+    f = porcentaje / 100.0
+    filtro = ' AND '.join(condiciones) or 'TRUE'
+    filas = session.execute(text(f"""
+        WITH muestra AS (
+            SELECT (t.ctid::text::point)[0]::bigint AS pagina, t.{grupo} AS grupo, t.{monto} AS monto
+            FROM {tabla} t TABLESAMPLE SYSTEM (:porcentaje) REPEATABLE (:semilla)
+            WHERE {filtro}
+        ), por_pagina AS (
+            SELECT GROUPING(grupo) = 1 AS es_total, grupo, COUNT(*) AS n, COALESCE(SUM(monto), 0) AS m
+            FROM muestra
+            GROUP BY GROUPING SETS ((grupo, pagina), (pagina))
+        )
+        SELECT es_total, grupo, SUM(n), SUM(n * n), SUM(m), SUM(m * m), SUM(n * m)
+        FROM por_pagina
+        GROUP BY es_total, grupo
+    """), dict(parametros, porcentaje=porcentaje, semilla=semilla)).all()
+
+    factor = (1 - f) / (f * f)
+    por_grupo, total = {}, None
+    for es_total, clave, n, n2, m, m2, nm in filas:
+        n, n2, m, m2, nm = (float(valor) for valor in (n, n2, m, m2, nm))
+        cantidad, suma = n / f, m / f
+        promedio = m / n if n else 0.0
+        # Promedio como razón de dos totales: varianza por linealización (método delta)
+        varianza_promedio = factor * (m2 - 2 * promedio * nm + promedio * promedio * n2) / (cantidad * cantidad) if n else 0.0
+        estimaciones = {
+            'filas': (cantidad, Z_95 * math.sqrt(factor * n2)),
+            'monto': (suma, Z_95 * math.sqrt(factor * m2)),
+            'promedio': (promedio, Z_95 * math.sqrt(max(varianza_promedio, 0.0))),
+        }
+        if es_total:
+            total = estimaciones
+        else:
+            por_grupo[clave] = estimaciones
+    return por_grupo, total, porcentaje
+
+# --- Vistas previas de los reportes ---
+
+def _mostrar(titulo_grupo, por_grupo, total, nombres, distintos_por_grupo, distintos_total, titulo_distintos):
+    print("-" * 120)
+    print(f"{titulo_grupo:<22} {'Filas (est.)':>14} {'± IC 95%':>10} {'Monto (est.)':>18} {'± IC 95%':>14} "
+          f"{'Promedio':>12} {'± IC 95%':>10} {titulo_distintos:>16}")
+    print("-" * 120)
+    filas = sorted(((str(nombres(clave)), r, distintos_por_grupo.get(clave)) for clave, r in por_grupo.items()), key=lambda fila: fila[0])
+    for nombre, r, distintos_grupo in filas + [('TOTAL', total, distintos_total)]:
+        print(f"{nombre[:22]:<22} {r['filas'][0]:>14,.0f} {r['filas'][1]:>10,.0f} {r['monto'][0]:>18,.2f} {r['monto'][1]:>14,.2f} "
+              f"{r['promedio'][0]:>12,.2f} {r['promedio'][1]:>10,.2f} "
+              f"{'' if distintos_grupo is None else format(distintos_grupo, ',.0f'):>16}")
+    print("-" * 120)
+    print(f"Distintos por HyperLogLog: ± {Z_95 * ERROR_RELATIVO_HLL:.1%} (IC 95 %).")
+
+def ventas(session, start_date=None, end_date=None, empleado_id=None, sucursal_id=None,
+           min_total_venta=None, max_total_venta=None, porcentaje=None, semilla=SEMILLA):
+    """Vista previa del reporte de ventas: ventas, monto y ticket promedio por sucursal, y productos distintos."""
+    condiciones, parametros = [], {}
+    for condicion, nombre, valor in (
+        ('t.fecha >= :desde', 'desde', start_date), ('t.fecha <= :hasta', 'hasta', end_date),
+        ('t.empleado_id = :empleado', 'empleado', empleado_id), ('t.sucursal_id = :sucursal', 'sucursal', sucursal_id),
+        ('t.total >= :min_total', 'min_total', min_total_venta), ('t.total <= :max_total', 'max_total', max_total_venta),
+    ):
+        if valor not in (None, ''):
+            condiciones.append(condicion)
+            parametros[nombre] = valor
+    por_sucursal, total, porcentaje = estimar_totales(session, 'ventas', 'sucursal_id', 'total', condiciones, parametros, porcentaje, semilla)
+    print(f"Vista previa aproximada: muestra del {porcentaje:g} % de las páginas de ventas (semilla {semilla}).")
+    if total is None:
+        print("La muestra no contiene ventas con los filtros aplicados; pruebe con un porcentaje mayor.")
+        return 0
+    productos, productos_total = distintos(session, 'productos_vendidos', start_date, end_date, sucursal_id)
+    if empleado_id or min_total_venta is not None or max_total_venta is not None:
+        print("⚠️ Los productos distintos solo aplican los filtros de fecha y sucursal.")
+
+    def nombre_sucursal(clave):
+        sucursal = cache_referencia.obtener('sucursales', clave)
+        return sucursal.nombre if sucursal else clave
+    _mostrar('Sucursal', por_sucursal, total, nombre_sucursal, productos, productos_total, 'Productos dist.')
+    return len(por_sucursal)
+
+def pedidos(session, cliente_id=None, empleado_id=None, estado_pedido=None, min_total_pedido=None,
+            max_total_pedido=None, start_date=None, end_date=None, porcentaje=None, semilla=SEMILLA):
+    """Vista previa del reporte de pedidos: pedidos, monto y promedio por estado, y clientes distintos."""
+    condiciones, parametros = [], {}
+    for condicion, nombre, valor in (
+        ('t.cliente_id = :cliente', 'cliente', cliente_id), ('t.empleado_id = :empleado', 'empleado', empleado_id),
+        ('t.estado = :estado', 'estado', estado_pedido),
+        ('t.total >= :min_total', 'min_total', min_total_pedido), ('t.total <= :max_total', 'max_total', max_total_pedido),
+        ('t.fecha >= :desde', 'desde', start_date), ('t.fecha <= :hasta', 'hasta', end_date),
+    ):
+        if valor not in (None, ''):
+            condiciones.append(condicion)
+            parametros[nombre] = valor
+    por_estado, total, porcentaje = estimar_totales(session, 'pedidos', 'estado', 'total', condiciones, parametros, porcentaje, semilla)
+    print(f"Vista previa aproximada: muestra del {porcentaje:g} % de las páginas de pedidos (semilla {semilla}).")
+    if total is None:
+        print("La muestra no contiene pedidos con los filtros aplicados; pruebe con un porcentaje mayor.")
+        return 0
+    _, clientes = distintos(session, 'clientes_pedidos', start_date, end_date)
+    if cliente_id or empleado_id or estado_pedido or min_total_pedido is not None or max_total_pedido is not None:
+        print("⚠️ Los clientes distintos solo aplican el filtro de fechas.")
+    _mostrar('Estado', por_estado, total, lambda clave: clave, {}, clientes, 'Clientes dist.')
+    return len(por_estado)
+
+def _fecha(valor):
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sketches HyperLogLog para la vista previa de los reportes.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    refrescar = subparsers.add_parser('refrescar', help="Actualiza los sketches diarios (por defecto hasta ayer).")
+    refrescar.add_argument('--metrica', choices=list(METRICAS_DISTINTAS), action='append', help="Por defecto, todas.")
+    refrescar.add_argument('--desde', type=_fecha, metavar='YYYY-MM-DD')
+    refrescar.add_argument('--hasta', type=_fecha, metavar='YYYY-MM-DD')
+    refrescar.add_argument('--lote', type=int, default=DIAS_POR_LOTE_SKETCHES, metavar='DIAS', help="Días por transacción.")
+    args = parser.parse_args()
+
+    resultados = [refrescar_sketches(metrica, args.desde, args.hasta, args.lote) for metrica in args.metrica or METRICAS_DISTINTAS]
+    raise SystemExit(0 if all(resultado is not None for resultado in resultados) else 1)